@@ -1,46 +1,72 @@
 """
 Benchmarking API endpoints - Compare XGBoost vs MLP models
 """
-from fastapi import APIRouter, HTTPException, UploadFile, File, Query
-import pandas as pd
-from io import BytesIO
+from fastapi import APIRouter, HTTPException, UploadFile, File, Query, Header
+from typing import Optional
 
 from benchmarking.services import get_benchmarking_service
+from model_management.health import get_health_monitor
+from common.ingestion import read_upload, upload_format, UPLOAD_SUFFIXES
 from common.logger import logger
+from common.serialization import FastJSONResponse
+from common.columnar import negotiate_format, columnar_response
+from monitoring.metrics import stage
+from monitoring.middleware import TimedRoute
 
-router = APIRouter(prefix="/benchmark", tags=["benchmarking"])
+router = APIRouter(prefix="/benchmark", tags=["benchmarking"], route_class=TimedRoute)
 
 
 @router.post("/compare")
 async def compare_models_endpoint(
     file: UploadFile = File(...),
-    sample_size: int = Query(1000, ge=1, le=10000, description="Number of samples to analyze (max 10000)")
+    sample_size: int = Query(1000, ge=1, le=10000, description="Number of samples to analyze (max 10000)"),
+    result_format: Optional[str] = Query(
+        None,
+        alias="format",
+        description="Result format: json, arrow, parquet or npz (default: from the Accept header, else json)"
+    ),
+    accept: Optional[str] = Header(None)
 ):
     """
-    Compare XGBoost and MLP models on uploaded CSV data
+    Compare XGBoost and MLP models on uploaded data
     
     Args:
-        file: CSV file with network traffic data
+        file: CSV (optionally gzip, bz2, xz or zstd compressed), Parquet or
+            Arrow IPC file with network traffic data
         sample_size: Number of samples to analyze (max 1000)
+        result_format: Binary formats carry every row of both models as
+            columns, with the rest of the result stored as table metadata
     
     Returns:
         Comparison results from both models
     """
     try:
-        # Validate file type
-        if not file.filename.endswith('.csv'):
-            raise HTTPException(
-                status_code=400,
-                detail="Invalid file format. Please upload a CSV file."
-            )
+        fmt = negotiate_format(accept, result_format)
+    except ValueError as e:
+        raise HTTPException(status_code=406, detail=str(e))
+    
+    # Validate file type
+    if upload_format(file.filename) is None:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid file format. Accepted: {', '.join(UPLOAD_SUFFIXES)}"
+        )
+    
+    try:
+        benchmarking_service = get_benchmarking_service()
         
-        # Read CSV
-        contents = await file.read()
-        df = pd.read_csv(BytesIO(contents))
+        # Read only the columns the models use, straight from the spooled upload
+        with stage("benchmark_compare", "parse"):
+            try:
+                df = read_upload(file.file, file.filename, columns=benchmarking_service.input_columns())
+            except ValueError as e:
+                logger.error(f"Upload parsing error: {e}")
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Failed to parse {file.filename}: {str(e)}"
+                )
         
-        logger.info(
-            f"Benchmarking: Loaded {len(df)} rows from {file.filename}"
-        )
+        logger.info("Benchmarking: Loaded %d rows from %s", len(df), file.filename)
         
         # Validate dataset
         if df.empty:
@@ -57,8 +83,8 @@ async def compare_models_endpoint(
             df_sample = df
         
         # Run comparison
-        benchmarking_service = get_benchmarking_service()
-        result = benchmarking_service.compare_models(df_sample)
+        columns = None if fmt == "json" else {}
+        result = benchmarking_service.compare_models(df_sample, columns)
         
         # Add file info
         result['file_info'] = {
@@ -71,14 +97,15 @@ async def compare_models_endpoint(
             f"Benchmarking complete: {result['comparison']['agreement_rate']:.2f}% agreement"
         )
         
-        return result
+        if columns is not None:
+            for model in ("xgboost", "mlp"):
+                del result[model]["results"]
+            return columnar_response(columns, fmt, result, "benchmark")
         
-    except pd.errors.ParserError as e:
-        logger.error(f"CSV parsing error: {e}")
-        raise HTTPException(
-            status_code=400,
-            detail=f"Failed to parse CSV file: {str(e)}"
-        )
+        return FastJSONResponse(result)
+        
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Benchmarking error: {e}")
         raise HTTPException(
@@ -116,16 +143,16 @@ def get_models_info():
 @router.get("/health")
 def benchmark_health_check():
     """
-    Check health status of both models
+    Check health status of both models (cached deep checks)
     
     Returns:
         Health status of XGBoost and MLP models
     """
     try:
-        benchmarking_service = get_benchmarking_service()
+        health_monitor = get_health_monitor()
         
-        xgboost_health = benchmarking_service.xgboost_loader.health_check()
-        mlp_health = benchmarking_service.mlp_loader.health_check()
+        xgboost_health = health_monitor.deep("xgboost")
+        mlp_health = health_monitor.deep("mlp")
         
         both_healthy = (
             xgboost_health['status'] == 'healthy' and 
@@ -4,14 +4,16 @@ Benchmarking services - Compare XGBoost and MLP models
 import time
 import pandas as pd
 import numpy as np
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from datetime import datetime
 
 from model_management.services import get_model_loader
 from model_management.mlp_loader import get_mlp_model_loader
-from common.preprocessing import preprocess_dataframe
+from common.preprocessing import preprocess_array, input_columns
 from common.constants import THREAT_TYPES
 from common.logger import logger
+from monitoring.services import get_live_metrics
+from monitoring.metrics import stage, observe_stage, count_rows
 
 
 class BenchmarkingService:
@@ -21,12 +23,25 @@ class BenchmarkingService:
         self.xgboost_loader = get_model_loader()
         self.mlp_loader = get_mlp_model_loader()
     
-    def compare_models(self, df: pd.DataFrame) -> Dict[str, Any]:
+    def input_columns(self) -> Optional[List[str]]:
+        """Columns either model reads from an upload (None: read every column)"""
+        columns = ['Label']
+        for loader in (self.xgboost_loader, self.mlp_loader):
+            model_columns = input_columns(loader.encoder, loader.scaler)
+            if model_columns is None:
+                return None
+            columns += model_columns
+        return columns
+    
+    def compare_models(self, df: pd.DataFrame, columns: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Compare XGBoost and MLP models on the same data
         
         Args:
             df: DataFrame with features
+            columns: If given, filled with per-row result columns of both
+                models for binary result formats (the per-row "results" and
+                the disagreement list are skipped)
         
         Returns:
             Dictionary with comparison results from both models
@@ -35,24 +50,30 @@ class BenchmarkingService:
             logger.info(f"Starting model comparison on {len(df)} samples")
             
             # Store original labels if available
-            original_labels = df['Label'].tolist() if 'Label' in df.columns else None
+            original_labels = df['Label'].tolist() if 'Label' in df.columns and columns is None else None
             
             # XGBoost predictions
             xgboost_start = time.time()
-            xgboost_results = self._predict_xgboost(df)
+            xgboost_results = self._predict_xgboost(df, columns)
             xgboost_time = time.time() - xgboost_start
             
             # MLP predictions
             mlp_start = time.time()
-            mlp_results = self._predict_mlp(df)
+            mlp_results = self._predict_mlp(df, columns)
             mlp_time = time.time() - mlp_start
             
             # Compare predictions
-            comparison = self._compare_predictions(
-                xgboost_results, 
-                mlp_results, 
-                original_labels
-            )
+            with stage("benchmark", "compare"):
+                if columns is None:
+                    comparison = self._compare_predictions(
+                        xgboost_results, 
+                        mlp_results, 
+                        original_labels
+                    )
+                else:
+                    if 'Label' in df.columns:
+                        columns["label"] = pd.Categorical(df['Label'])
+                    comparison = self._compare_columns(columns)
             
             logger.info(
                 f"Comparison complete: XGBoost={xgboost_time:.3f}s, "
@@ -80,84 +101,140 @@ class BenchmarkingService:
             logger.error(f"Error in compare_models: {e}")
             raise
     
-    def _predict_xgboost(self, df: pd.DataFrame) -> List[Dict[str, Any]]:
+    def _predict_xgboost(self, df: pd.DataFrame, columns: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         """Make predictions using XGBoost model"""
         try:
             # Preprocess
-            X = preprocess_dataframe(
-                df.copy(),
-                self.xgboost_loader.encoder,
-                self.xgboost_loader.scaler,
-                self.xgboost_loader.feature_columns
-            )
+            with stage("benchmark_xgboost", "preprocess"):
+                X = preprocess_array(
+                    df.copy(),
+                    self.xgboost_loader.encoder,
+                    self.xgboost_loader.scaler,
+                    self.xgboost_loader.feature_columns,
+                    scale=self.xgboost_loader.input_scaled
+                )
             
             # Predict
-            model = self.xgboost_loader.model
-            y_pred = model.predict(X)
-            y_proba = model.predict_proba(X)
+            with stage("benchmark_xgboost", "infer"):
+                y_proba = self.xgboost_loader.predict_proba(X)
+            count_rows("xgboost", X.shape[0])
+            build_start = time.perf_counter()
+            y_pred = self.xgboost_loader.classes_[np.argmax(y_proba, axis=1)]
             
             # Decode predictions
             y_pred_labels = self.xgboost_loader.encoder.inverse_transform(y_pred)
+            labels, counts = np.unique(y_pred_labels, return_counts=True)
+            get_live_metrics().record_batch(
+                "benchmark", len(y_pred_labels), dict(zip(labels.tolist(), counts.tolist()))
+            )
             
             # Build results
-            results = []
-            for i, (pred, pred_label, proba_row) in enumerate(zip(y_pred, y_pred_labels, y_proba)):
-                confidence = float(np.max(proba_row))
-                threat_type = THREAT_TYPES.get(pred_label, "Unknown")
-                
-                results.append({
-                    "id": i,
-                    "prediction": str(pred),
-                    "prediction_label": pred_label,
-                    "confidence": confidence,
-                    "threat_type": threat_type if pred_label != 'BENIGN' else 'Normal',
-                    "is_malicious": pred_label != 'BENIGN'
-                })
-            
+            if columns is not None:
+                self._fill_columns(columns, "xgboost", y_pred, y_proba, self.xgboost_loader.encoder.classes_)
+                results = []
+            else:
+                results = self._build_results(y_pred, y_pred_labels, y_proba)
+            observe_stage("benchmark_xgboost", "build", time.perf_counter() - build_start)
             return results
         except Exception as e:
             logger.error(f"Error in XGBoost prediction: {e}")
             raise
     
-    def _predict_mlp(self, df: pd.DataFrame) -> List[Dict[str, Any]]:
+    def _predict_mlp(self, df: pd.DataFrame, columns: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         """Make predictions using MLP model"""
         try:
             # Preprocess
-            X = preprocess_dataframe(
-                df.copy(),
-                self.mlp_loader.encoder,
-                self.mlp_loader.scaler,
-                None  # MLP doesn't use feature_columns file
-            )
+            with stage("benchmark_mlp", "preprocess"):
+                X = preprocess_array(
+                    df.copy(),
+                    self.mlp_loader.encoder,
+                    self.mlp_loader.scaler,
+                    None,  # MLP doesn't use feature_columns file
+                    scale=self.mlp_loader.input_scaled
+                )
             
             # Predict
-            model = self.mlp_loader.model
-            y_proba = model.predict(X, verbose=0)
+            with stage("benchmark_mlp", "infer"):
+                y_proba = self.mlp_loader.predict_proba(X)
+            count_rows("mlp", X.shape[0])
+            build_start = time.perf_counter()
             y_pred = np.argmax(y_proba, axis=1)
             
             # Decode predictions
             y_pred_labels = self.mlp_loader.encoder.inverse_transform(y_pred)
             
             # Build results
-            results = []
-            for i, (pred, pred_label, proba_row) in enumerate(zip(y_pred, y_pred_labels, y_proba)):
-                confidence = float(np.max(proba_row))
-                threat_type = THREAT_TYPES.get(pred_label, "Unknown")
-                
-                results.append({
-                    "id": i,
-                    "prediction": str(pred),
-                    "prediction_label": pred_label,
-                    "confidence": confidence,
-                    "threat_type": threat_type if pred_label != 'BENIGN' else 'Normal',
-                    "is_malicious": pred_label != 'BENIGN'
-                })
-            
+            if columns is not None:
+                self._fill_columns(columns, "mlp", y_pred, y_proba, self.mlp_loader.encoder.classes_)
+                results = []
+            else:
+                results = self._build_results(y_pred, y_pred_labels, y_proba)
+            observe_stage("benchmark_mlp", "build", time.perf_counter() - build_start)
             return results
         except Exception as e:
             logger.error(f"Error in MLP prediction: {e}")
             raise
     
+    def _build_results(
+        self,
+        y_pred: np.ndarray,
+        y_pred_labels: np.ndarray,
+        y_proba: np.ndarray
+    ) -> List[Dict[str, Any]]:
+        """Per-row results, with each column converted to Python values once"""
+        labels = y_pred_labels.tolist()
+        confidences = y_proba.max(axis=1).tolist()
+        threat_types = {label: THREAT_TYPES.get(label, "Unknown") for label in set(labels)}
+        threat_types['BENIGN'] = 'Normal'
+        
+        return [
+            {
+                "id": i,
+                "prediction": str(pred),
+                "prediction_label": label,
+                "confidence": confidence,
+                "threat_type": threat_types[label],
+                "is_malicious": label != 'BENIGN'
+            }
+            for i, (pred, label, confidence) in enumerate(zip(y_pred.tolist(), labels, confidences))
+        ]
+    
+    def _fill_columns(
+        self,
+        columns: Dict[str, Any],
+        model: str,
+        y_pred: np.ndarray,
+        y_proba: np.ndarray,
+        label_names: np.ndarray
+    ) -> None:
+        """Result columns of one model (labels as categoricals: codes + class names)"""
+        columns[f"{model}_prediction"] = y_pred
+        columns[f"{model}_prediction_label"] = pd.Categorical.from_codes(y_pred, categories=label_names)
+        columns[f"{model}_confidence"] = y_proba.max(axis=1)
+    
+    def _compare_columns(self, columns: Dict[str, Any]) -> Dict[str, Any]:
+        """Agreement statistics from result columns; adds a per-row "agree" column"""
+        xgb_labels = columns["xgboost_prediction_label"]
+        mlp_labels = columns["mlp_prediction_label"]
+        # Compare label names: the two encoders need not number classes alike
+        xgb_names = np.asarray(xgb_labels.categories, dtype=str)[xgb_labels.codes]
+        mlp_names = np.asarray(mlp_labels.categories, dtype=str)[mlp_labels.codes]
+        agree = xgb_names == mlp_names
+        columns["agree"] = agree
+        
+        total_samples = len(agree)
+        agreements = int(agree.sum())
+        agreement_rate = (agreements / total_samples * 100) if total_samples > 0 else 0
+        return {
+            "total_samples": total_samples,
+            "agreements": agreements,
+            "disagreements_count": total_samples - agreements,
+            "agreement_rate": agreement_rate,
+            "disagreement_rate": 100 - agreement_rate,
+            "xgboost_malicious_count": int((xgb_names != 'BENIGN').sum()),
+            "mlp_malicious_count": int((mlp_names != 'BENIGN').sum())
+        }
+    
     def _compare_predictions(
         self,
         xgboost_results: List[Dict[str, Any]],
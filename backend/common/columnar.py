@@ -0,0 +1,139 @@
+"""
+Columnar result formats - batch results written as Arrow IPC streams,
+Parquet or NumPy .npz straight from the result arrays
+"""
+import io
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from fastapi.responses import Response
+
+from common.serialization import dumps
+from monitoring.metrics import stage
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+
+# Format name -> media type
+FORMATS = {
+    "json": "application/json",
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+    "npz": "application/x-npz"
+}
+_MEDIA_TYPES = {media_type: name for name, media_type in FORMATS.items()}
+_MEDIA_TYPES.update({
+    "application/x-parquet": "parquet",
+    "application/*": "json",
+    "*/*": "json"
+})
+_EXTENSIONS = {"arrow": "arrows", "parquet": "parquet", "npz": "npz"}
+_NEEDS_PYARROW = {"arrow", "parquet"}
+
+
+def available_formats() -> List[str]:
+    """Result formats this server can write"""
+    return [name for name in FORMATS if pa is not None or name not in _NEEDS_PYARROW]
+
+
+def _accepted(accept: str) -> List[str]:
+    """Media types of an Accept header, most preferred first (q=0 dropped)"""
+    ranked = []
+    for position, item in enumerate(accept.split(",")):
+        media_type, *params = [part.strip() for part in item.split(";")]
+        q = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if media_type and q > 0:
+            ranked.append((-q, position, media_type.lower()))
+    return [media_type for _, _, media_type in sorted(ranked)]
+
+
+def negotiate_format(accept: Optional[str], requested: Optional[str] = None) -> str:
+    """
+    Pick the result format from a ?format= value or the Accept header
+
+    An explicit format wins over the header. Headers naming none of the
+    known media types (browsers, curl) get JSON, as before.
+
+    Raises:
+        ValueError: If the requested format is unknown or needs pyarrow,
+            which is not installed
+    """
+    if requested:
+        name = requested.lower()
+        if name not in FORMATS:
+            raise ValueError(f"Unknown result format '{requested}' (available: {', '.join(available_formats())})")
+    else:
+        name = next((_MEDIA_TYPES[m] for m in _accepted(accept or "") if m in _MEDIA_TYPES), "json")
+    if name not in available_formats():
+        raise ValueError(f"{name} results require pyarrow, which is not installed on the server")
+    return name
+
+
+def _categorical_strings(values: pd.Categorical) -> np.ndarray:
+    """Fixed-width string array of a categorical (missing values as '')"""
+    categories = np.append(np.asarray(values.categories, dtype=str), "")
+    return categories[values.codes]
+
+
+def _to_arrow(columns: Dict[str, Any], metadata: Dict[str, Any]) -> "pa.Table":
+    # Numeric arrays are wrapped without copying; categoricals become
+    # dictionary arrays (codes + the few distinct labels)
+    table = pa.table({name: pa.array(values) for name, values in columns.items()})
+    return table.replace_schema_metadata({"summary": dumps(metadata)})
+
+
+def encode_columns(columns: Dict[str, Any], fmt: str, metadata: Dict[str, Any]) -> bytes:
+    """
+    Write equal-length result columns in a binary format
+
+    Args:
+        columns: Column name -> 1-D NumPy array or pandas Categorical
+        fmt: "arrow", "parquet" or "npz"
+        metadata: JSON summary stored with the table (Arrow/Parquet schema
+            metadata under "summary", or the "summary" entry of the .npz)
+
+    Returns:
+        Encoded bytes
+    """
+    if fmt == "npz":
+        arrays = {
+            name: _categorical_strings(values) if isinstance(values, pd.Categorical) else values
+            for name, values in columns.items()
+        }
+        arrays["summary"] = np.array(dumps(metadata).decode("utf-8"))
+        buffer = io.BytesIO()
+        np.savez(buffer, **arrays)
+        return buffer.getvalue()
+
+    table = _to_arrow(columns, metadata)
+    if fmt == "parquet":
+        buffer = io.BytesIO()
+        pq.write_table(table, buffer)
+        return buffer.getvalue()
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def columnar_response(columns: Dict[str, Any], fmt: str, metadata: Dict[str, Any], filename: str) -> Response:
+    """Binary result response offered as a download named `filename`.<ext>"""
+    with stage("response", "serialize"):
+        body = encode_columns(columns, fmt, metadata)
+    return Response(
+        content=body,
+        media_type=FORMATS[fmt],
+        headers={"content-disposition": f'attachment; filename="{filename}.{_EXTENSIONS[fmt]}"'}
+    )
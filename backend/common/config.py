@@ -18,10 +18,158 @@ ENCODER_PATH = os.path.join(XGBOOST_DIR, "encoder_xgb2.pkl")
 SCALER_PATH = os.path.join(XGBOOST_DIR, "scaler_xgb2.pkl")
 FEATURE_COLUMNS_PATH = os.path.join(XGBOOST_DIR, "feature_columns.json")
 
+# XGBoost inference backend: "native" (Booster.inplace_predict on float32
+# arrays), "sklearn" (XGBClassifier.predict_proba) or "onnx" (ONNX Runtime
+# session over the model exported to XGB_ONNX_PATH)
+XGB_BACKEND = os.getenv("XGB_BACKEND", "native")
+# Threads used by each worker for XGBoost inference (0 = xgboost default)
+XGB_NTHREAD = int(os.getenv("XGB_NTHREAD", "0"))
+
+# Requests with at most this many rows are scored by the array-backed forest
+# evaluator instead of the xgboost wrapper (0 disables it)
+XGB_FOREST_MAX_ROWS = int(os.getenv("XGB_FOREST_MAX_ROWS", "4"))
+
+# Keep one-hot encoded features sparse: batches are assembled as CSR
+# matrices aligned to feature_columns and scored by a booster copy whose
+# missing-value directions follow the zero branch (so absent entries are
+# read as 0, exactly like the dense path)
+SPARSE_PREPROCESSING = os.getenv("SPARSE_PREPROCESSING", "0") == "1"
+
+# Values written over NaN, +inf and -inf in numeric features before scaling
+# (replacement counts per feature are reported in batch summaries)
+SANITIZE_NAN_VALUE = float(os.getenv("SANITIZE_NAN_VALUE", "0"))
+SANITIZE_POSINF_VALUE = float(os.getenv("SANITIZE_POSINF_VALUE", "0"))
+SANITIZE_NEGINF_VALUE = float(os.getenv("SANITIZE_NEGINF_VALUE", "0"))
+
+# float32 end to end: uploads are parsed into float32 columns and features
+# are cleaned and scaled in float32 (precomputed scaler parameters), so no
+# float64 copy is made and the models get their input dtype directly.
+# Raw values above 2**24 (e.g. long flow durations) lose their last digits.
+FLOAT32_PIPELINE = os.getenv("FLOAT32_PIPELINE", "0") == "1"
+
+# Score identical preprocessed rows once per batch and copy the result to
+# every duplicate (batch summaries report the dedup ratio). Skipped when the
+# cascade is on: rows XGBoost sees as identical may differ in MLP inputs.
+DEDUP_MODE = os.getenv("DEDUP_MODE", "1") == "1"
+
+# Tiered "fast mode": score with the first XGB_FAST_MODE_ITERATIONS boosting
+# rounds and re-score rows whose top-2 probability margin is below
+# XGB_FAST_MODE_MARGIN with the full ensemble. Tuned values written by
+# test/benchmarking/tune_fast_mode.py to FAST_MODE_CONFIG_PATH take precedence.
+XGB_FAST_MODE = os.getenv("XGB_FAST_MODE", "0") == "1"
+XGB_FAST_MODE_ITERATIONS = int(os.getenv("XGB_FAST_MODE_ITERATIONS", "100"))
+XGB_FAST_MODE_MARGIN = float(os.getenv("XGB_FAST_MODE_MARGIN", "0.5"))
+FAST_MODE_CONFIG_PATH = os.path.join(XGBOOST_DIR, "fast_mode.json")
+
+# Binary benign/malicious gate: rows the gate scores below GATE_THRESHOLD are
+# reported as BENIGN without running the multi-class model. Trained (with its
+# tuned threshold in GATE_META_PATH) by test/benchmarking/train_gate.py.
+GATE_MODE = os.getenv("GATE_MODE", "0") == "1"
+GATE_MODEL_PATH = os.path.join(XGBOOST_DIR, "gate_xgb.json")
+GATE_META_PATH = os.path.join(XGBOOST_DIR, "gate_xgb_meta.json")
+GATE_THRESHOLD = float(os.getenv("GATE_THRESHOLD", "0.01"))
+
+# Cascade mode: rows XGBoost scores below CASCADE_CONFIDENCE_THRESHOLD, or
+# predicts as one of CASCADE_CLASSES (comma-separated labels), get a second
+# opinion from the MLP; probabilities are blended with weight CASCADE_MLP_WEIGHT
+CASCADE_MODE = os.getenv("CASCADE_MODE", "0") == "1"
+CASCADE_CONFIDENCE_THRESHOLD = float(os.getenv("CASCADE_CONFIDENCE_THRESHOLD", "0.9"))
+CASCADE_CLASSES = [c.strip() for c in os.getenv("CASCADE_CLASSES", "").split(",") if c.strip()]
+CASCADE_MLP_WEIGHT = float(os.getenv("CASCADE_MLP_WEIGHT", "0.5"))
+
+# LRU cache for /predict/one keyed by a hash of the normalized feature dict,
+# the inference options and the model version (0 entries disables it).
+# Entries expire after PREDICTION_CACHE_TTL seconds (0 = only on eviction).
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "10000"))
+PREDICTION_CACHE_MAX_MB = float(os.getenv("PREDICTION_CACHE_MAX_MB", "64"))
+PREDICTION_CACHE_TTL = float(os.getenv("PREDICTION_CACHE_TTL", "0"))
+
+# Most rows /predict/bulk scores per request (larger sets belong in an
+# uploaded file for /predict/csv). Bodies over BULK_MAX_BYTES are refused
+# before they are decoded; the default leaves room for BULK_MAX_ROWS records
+# of the full CIC-IDS feature set.
+BULK_MAX_ROWS = int(os.getenv("BULK_MAX_ROWS", "10000"))
+BULK_MAX_BYTES = int(os.getenv("BULK_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Server-Timing response header with the per-stage breakdown of each request
+# (parse/preprocess/infer/build/serialize durations and rows per model). Only
+# servers started with SERVER_TIMING_DEBUG=1 honour ?debug_timing=true, which
+# also adds the breakdown to JSON bodies as "timing".
+SERVER_TIMING = os.getenv("SERVER_TIMING", "1") == "1"
+SERVER_TIMING_DEBUG = os.getenv("SERVER_TIMING_DEBUG", "0") == "1"
+
+# Compress responses of at least RESPONSE_GZIP_MIN_SIZE bytes for clients
+# that accept gzip (0 disables), at RESPONSE_GZIP_LEVEL (1 = fastest, 9 = smallest)
+RESPONSE_GZIP_MIN_SIZE = int(os.getenv("RESPONSE_GZIP_MIN_SIZE", "262144"))
+RESPONSE_GZIP_LEVEL = int(os.getenv("RESPONSE_GZIP_LEVEL", "5"))
+
+# Deep health checks (a real inference per model) are cached this many
+# seconds and refreshed in the background; /model/live and /model/ready
+# never run inference
+HEALTH_CHECK_TTL = float(os.getenv("HEALTH_CHECK_TTL", "30"))
+
+# Logging: LOG_ASYNC hands records to a background thread through a bounded
+# queue (LOG_QUEUE_SIZE records, overflow is dropped rather than blocking),
+# where they are formatted and written. Below WARNING, each call site may log
+# LOG_RATE_LIMIT records per second (0 = unlimited), or the rate a record
+# carries as extra={"rate_limit": r}. Per-request messages go through
+# log_hot_path(), which allows each call site LOG_HOT_PATH_RATE messages per
+# second and drops the rest before a record is even created.
+LOG_ASYNC = os.getenv("LOG_ASYNC", "1") == "1"
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_RATE_LIMIT = float(os.getenv("LOG_RATE_LIMIT", "0"))
+LOG_HOT_PATH_RATE = float(os.getenv("LOG_HOT_PATH_RATE", "1"))
+
+# Token required (X-Admin-Token header) by the /admin endpoints, such as the
+# sampling profiler; empty disables them
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+# Sampling profiler: default seconds between stack samples, the cap on the
+# fraction of wall time the sampler may use (the interval is stretched to
+# respect it) and the longest allowed profile
+PROFILER_INTERVAL = float(os.getenv("PROFILER_INTERVAL", "0.005"))
+PROFILER_MAX_OVERHEAD = float(os.getenv("PROFILER_MAX_OVERHEAD", "0.02"))
+PROFILER_MAX_SECONDS = float(os.getenv("PROFILER_MAX_SECONDS", "120"))
+
 # MLP Model file paths
 MLP_MODEL_PATH = os.path.join(MLP_DIR, "mlp_cicids2017_v2_optimized.keras")
 MLP_ENCODER_PATH = os.path.join(MLP_DIR, "label_encoder_mlp_optimized.pkl")
 MLP_SCALER_PATH = os.path.join(MLP_DIR, "scaler_mlp_optimized.pkl")
+MLP_FOLDED_MODEL_PATH = os.path.join(MLP_DIR, "mlp_cicids2017_v2_folded.keras")
+MLP_NPZ_PATH = os.path.join(MLP_DIR, "mlp_cicids2017_v2_optimized.npz")
+MLP_NPZ_FP16_PATH = os.path.join(MLP_DIR, "mlp_cicids2017_v2_optimized_fp16.npz")
+
+# MLP inference backend: "keras" (TensorFlow), "numpy" (exported .npz weights)
+# or "onnx" (ONNX Runtime session over the model exported to MLP_ONNX_PATH)
+MLP_BACKEND = os.getenv("MLP_BACKEND", "keras")
+
+# MLP weight precision: "float32", "float16" (half-precision weights stored
+# in MLP_NPZ_FP16_PATH, numpy backend) or "int8" (dynamically quantized
+# graph in MLP_ONNX_INT8_PATH, onnx backend). Measure the accuracy cost per
+# attack class with test/benchmarking/quantization_accuracy.py first.
+MLP_PRECISION = os.getenv("MLP_PRECISION", "float32")
+
+# Keras MLP batch buckets: one graph is traced per size at load time and
+# requests are padded/split onto them, so serving never retraces (empty
+# disables bucketing and falls back to model.predict)
+MLP_BATCH_BUCKETS = [int(b) for b in os.getenv("MLP_BATCH_BUCKETS", "1,8,64,512,4096").split(",") if b.strip()]
+
+# Load both models and run every MLP bucket once when the app starts
+MODEL_WARMUP = os.getenv("MODEL_WARMUP", "1") == "1"
+
+# Fold the MLP input scaler into the first Dense layer at load time, so the
+# MLP consumes raw cleaned features without a separate scaling pass
+MLP_FOLD_SCALER = os.getenv("MLP_FOLD_SCALER", "1") == "1"
+
+# ONNX exports (written by python -m model_management.onnx_export)
+XGB_ONNX_PATH = os.path.join(XGBOOST_DIR, "xgb_model_train_optimized2.onnx")
+MLP_ONNX_PATH = os.path.join(MLP_DIR, "mlp_cicids2017_v2_optimized.onnx")
+MLP_ONNX_INT8_PATH = os.path.join(MLP_DIR, "mlp_cicids2017_v2_optimized_int8.onnx")
+
+# ONNX Runtime session options: intra-op threads (0 = runtime default) and
+# graph optimization level ("disabled", "basic", "extended" or "all")
+ONNX_INTRA_OP_THREADS = int(os.getenv("ONNX_INTRA_OP_THREADS", "0"))
+ONNX_GRAPH_OPTIMIZATION = os.getenv("ONNX_GRAPH_OPTIMIZATION", "all")
 
 # CORS origins
 CORS_ORIGINS = [
@@ -0,0 +1,56 @@
+"""
+Row deduplication utilities - score each distinct feature vector once
+"""
+import numpy as np
+from typing import Tuple
+
+from common.logger import logger
+
+
+# 64-bit FNV-1a parameters, applied per float32 word instead of per byte
+_FNV_OFFSET = np.uint64(0xcbf29ce484222325)
+_FNV_PRIME = np.uint64(0x100000001b3)
+
+
+def row_hashes(X: np.ndarray) -> np.ndarray:
+    """
+    64-bit hash of every row's float32 bytes
+
+    Args:
+        X: 2-D feature matrix
+
+    Returns:
+        uint64 array of shape (n_samples,)
+    """
+    words = np.ascontiguousarray(X, dtype=np.float32).view(np.uint32)
+    hashes = np.full(words.shape[0], _FNV_OFFSET, dtype=np.uint64)
+    for j in range(words.shape[1]):
+        hashes ^= words[:, j]
+        hashes *= _FNV_PRIME
+    return hashes
+
+
+def deduplicate(X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Find the distinct rows of a feature matrix
+
+    Rows are grouped by hash, and every row that was matched to an earlier
+    one is compared with it, so a hash collision can never merge two
+    different vectors (the exact, slower grouping is used instead).
+
+    Args:
+        X: 2-D feature matrix
+
+    Returns:
+        Tuple (index, inverse) such that X[index] holds each distinct row
+        once and X[index][inverse] == X
+    """
+    _, index, inverse = np.unique(row_hashes(X), return_index=True, return_inverse=True)
+    inverse = inverse.reshape(-1)
+
+    duplicates = np.flatnonzero(index[inverse] != np.arange(X.shape[0]))
+    if duplicates.size and not np.array_equal(X[duplicates], X[index[inverse[duplicates]]]):
+        logger.warning("Row hash collision detected, deduplicating by exact comparison")
+        _, index, inverse = np.unique(X, axis=0, return_index=True, return_inverse=True)
+        inverse = inverse.reshape(-1)
+    return index, inverse
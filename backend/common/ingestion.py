@@ -0,0 +1,261 @@
+"""
+Dataset ingestion utilities - parse uploaded or on-disk CSV (plain or
+compressed), Parquet and Arrow IPC files
+"""
+import os
+import importlib.util
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+from typing import Callable, Iterable, List, Optional
+
+from common.config import FLOAT32_PIPELINE
+from common.logger import logger
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+
+# Rows read to decide which columns are numeric before the float32 parse
+_SNIFF_ROWS = 1000
+
+# Compressed CSV suffix -> pandas compression (decompressed as a stream)
+CSV_COMPRESSION = {".gz": "gzip", ".bz2": "bz2", ".xz": "xz", ".zst": "zstd"}
+# Columnar file suffix -> format
+COLUMNAR_SUFFIXES = {
+    ".parquet": "parquet",
+    ".pq": "parquet",
+    ".arrow": "arrow",
+    ".arrows": "arrow",
+    ".feather": "arrow",
+    ".ipc": "arrow"
+}
+UPLOAD_SUFFIXES = [".csv"] + [f".csv{ext}" for ext in CSV_COMPRESSION] + list(COLUMNAR_SUFFIXES)
+
+
+def _rewind(source) -> None:
+    """Move a file-like source back to its start (paths need nothing)"""
+    if hasattr(source, "seek"):
+        source.seek(0)
+
+
+def _column_filter(columns: Optional[Iterable[str]]) -> Optional[Callable[[str], bool]]:
+    """Case-insensitive column name test for a projection (None: every column)"""
+    if columns is None:
+        return None
+    wanted = {c.lower() for c in columns}
+    return lambda name: name.lower() in wanted
+
+
+def _downcast(df: pd.DataFrame) -> pd.DataFrame:
+    """Numeric (non-bool) columns to float32"""
+    numeric = [
+        c for c in df.columns
+        if pd.api.types.is_numeric_dtype(df[c]) and not pd.api.types.is_bool_dtype(df[c])
+    ]
+    return df.astype({c: np.float32 for c in numeric})
+
+
+def read_csv(
+    source,
+    float32: Optional[bool] = None,
+    columns: Optional[Iterable[str]] = None,
+    compression: Optional[str] = None
+) -> pd.DataFrame:
+    """
+    Read a CSV file, optionally parsing numeric columns straight to float32
+
+    In float32 mode the first rows are sniffed to find the numeric columns,
+    which the parser then writes directly as float32, so no float64 copy of
+    the table is ever built. If a numeric-looking column turns out to hold
+    text further down, the file is parsed normally and downcast instead.
+
+    Args:
+        source: Path or seekable file-like object
+        float32: Parse numeric columns as float32 (None: server default
+            FLOAT32_PIPELINE)
+        columns: Only parse these columns (matched case-insensitively;
+            names missing from the file are ignored)
+        compression: "gzip", "bz2", "xz" or "zstd" to decompress the source
+            while it is parsed (it is never held decompressed in memory)
+
+    Returns:
+        Parsed DataFrame
+    """
+    if float32 is None:
+        float32 = FLOAT32_PIPELINE
+    options = {"usecols": _column_filter(columns), "compression": compression}
+    if not float32:
+        return pd.read_csv(source, **options)
+
+    head = pd.read_csv(source, nrows=_SNIFF_ROWS, **options)
+    numeric = [
+        c for c in head.columns
+        if pd.api.types.is_numeric_dtype(head[c]) and not pd.api.types.is_bool_dtype(head[c])
+    ]
+    _rewind(source)
+    try:
+        return pd.read_csv(source, dtype={c: np.float32 for c in numeric}, **options)
+    except (ValueError, TypeError) as e:
+        logger.warning(f"float32 CSV parse failed ({e}), parsing with inferred dtypes and downcasting")
+        _rewind(source)
+        return _downcast(pd.read_csv(source, **options))
+
+
+def upload_format(filename: str) -> Optional[str]:
+    """
+    Format of an upload from its file name
+
+    Returns:
+        "csv", "parquet" or "arrow", or None if the type is not accepted
+    """
+    name = (filename or "").lower()
+    for suffix, fmt in COLUMNAR_SUFFIXES.items():
+        if name.endswith(suffix):
+            return fmt
+    if any(name.endswith(suffix) for suffix in UPLOAD_SUFFIXES):
+        return "csv"
+    return None
+
+
+@contextmanager
+def _arrow_input(source):
+    """
+    Arrow readable for a path or file object, closed when the block exits
+
+    Paths are memory-mapped. File objects (uploads included) are read
+    through their seek/read methods, so Parquet only reads the column
+    chunks of the projection; the caller's file is left open.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with pa.memory_map(os.fspath(source)) as mapped:
+            # Arrow keeps the mapping alive while buffers still use it
+            yield mapped
+    else:
+        yield pa.PythonFile(source, mode="r")
+
+
+def _projection(names: List[str], columns: Optional[Iterable[str]]) -> List[str]:
+    keep = _column_filter(columns)
+    return list(names) if keep is None else [name for name in names if keep(name)]
+
+
+def read_columnar(
+    source,
+    fmt: str,
+    float32: Optional[bool] = None,
+    columns: Optional[Iterable[str]] = None
+) -> pd.DataFrame:
+    """
+    Read a Parquet or Arrow IPC (file or stream) table
+
+    Args:
+        source: Path or seekable file-like object
+        fmt: "parquet" or "arrow"
+        float32: Convert numeric columns to float32 (None: server default
+            FLOAT32_PIPELINE)
+        columns: Only read these columns (matched case-insensitively;
+            names missing from the file are ignored)
+
+    Returns:
+        DataFrame of the projected columns
+    """
+    if pa is None:
+        raise ValueError(f"{fmt} uploads require pyarrow, which is not installed on the server")
+    if float32 is None:
+        float32 = FLOAT32_PIPELINE
+
+    with _arrow_input(source) as data:
+        if fmt == "parquet":
+            parquet_file = pq.ParquetFile(data)
+            table = parquet_file.read(columns=_projection(parquet_file.schema_arrow.names, columns))
+        else:
+            try:
+                table = pa.ipc.open_file(data).read_all()
+            except pa.ArrowInvalid:
+                # No file footer: an IPC stream
+                data.seek(0)
+                table = pa.ipc.open_stream(data).read_all()
+            table = table.select(_projection(table.schema.names, columns))
+        df = table.to_pandas()
+    return _downcast(df) if float32 else df
+
+
+def read_upload(
+    source,
+    filename: str,
+    float32: Optional[bool] = None,
+    columns: Optional[Iterable[str]] = None
+) -> pd.DataFrame:
+    """
+    Read an uploaded dataset in any accepted format (see upload_format)
+
+    Args:
+        source: Path or seekable file-like object
+        filename: Original file name, which selects the format
+        float32: Numeric columns as float32 (None: server default)
+        columns: Only read these columns (None: every column)
+
+    Returns:
+        Parsed DataFrame
+    """
+    fmt = upload_format(filename)
+    if fmt is None:
+        raise ValueError(f"Unsupported file type: {filename}")
+    if fmt != "csv":
+        return read_columnar(source, fmt, float32=float32, columns=columns)
+
+    compression = next(
+        (codec for ext, codec in CSV_COMPRESSION.items() if filename.lower().endswith(ext)),
+        None
+    )
+    if compression == "zstd" and importlib.util.find_spec("zstandard") is None:
+        raise ValueError("zstd-compressed uploads require zstandard, which is not installed on the server")
+    return read_csv(source, float32=float32, columns=columns, compression=compression)
+
+
+def frame_from_json(payload, float32: Optional[bool] = None) -> pd.DataFrame:
+    """
+    Build a DataFrame from a JSON scoring payload in one of three layouts
+
+    - records: [{"feature": value, ...}, ...]
+    - columnar: {"feature": [value, ...], ...}
+    - rows: {"columns": ["feature", ...], "rows": [[value, ...], ...]}
+
+    Args:
+        payload: Decoded JSON document
+        float32: Numeric columns as float32 (None: server default
+            FLOAT32_PIPELINE)
+
+    Returns:
+        DataFrame with one row per sample
+
+    Raises:
+        ValueError: If the payload matches none of the layouts, has no rows,
+            or its columns/rows differ in length
+    """
+    if float32 is None:
+        float32 = FLOAT32_PIPELINE
+    if isinstance(payload, list):
+        if not all(isinstance(record, dict) for record in payload):
+            raise ValueError("Records must all be JSON objects of feature values")
+        df = pd.DataFrame.from_records(payload)
+    elif isinstance(payload, dict) and set(payload) == {"columns", "rows"}:
+        columns, rows = payload["columns"], payload["rows"]
+        valid = isinstance(columns, list) and isinstance(rows, list) and all(isinstance(row, list) for row in rows)
+        if not valid:
+            raise ValueError('"columns" must be a list of names and "rows" a list of value lists')
+        df = pd.DataFrame(rows, columns=columns)
+    elif isinstance(payload, dict) and all(isinstance(values, list) for values in payload.values()):
+        df = pd.DataFrame(payload)
+    else:
+        raise ValueError(
+            'Expected a list of records, {"feature": [values]} columns, '
+            'or {"columns": [...], "rows": [[...]]}'
+        )
+    if df.empty:
+        raise ValueError("Payload contains no samples")
+    return _downcast(df) if float32 else df
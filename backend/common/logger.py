@@ -1,13 +1,147 @@
 """
 Logging configuration
 """
+import sys
+import time
+import queue
+import atexit
 import logging
+import threading
+from logging.handlers import QueueHandler, QueueListener
+from typing import Callable, Dict, Optional, Tuple
+
+from common.config import LOG_ASYNC, LOG_QUEUE_SIZE, LOG_RATE_LIMIT, LOG_HOT_PATH_RATE
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Token bucket per call site (file and line) for records below WARNING
+
+    A call site may emit `burst` records at once and `rate` per second after
+    that; the next record let through reports how many were suppressed.
+    A record's own rate (extra={"rate_limit": r}) overrides the default,
+    and 0 means unlimited.
+    """
+
+    def __init__(self, rate: float = 0, burst: int = 5, clock: Callable[[], float] = time.monotonic):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self._clock = clock
+        # call site -> (tokens, last refill, suppressed records)
+        self._buckets: Dict[Tuple[str, int], Tuple[float, float, int]] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, key: Tuple[str, int], rate: float) -> Optional[int]:
+        """
+        Take a token for a call site
+
+        Returns:
+            Number of records suppressed since the last one let through, or
+            None when this one must be dropped
+        """
+        now = self._clock()
+        with self._lock:
+            tokens, last, suppressed = self._buckets.get(key, (self.burst, now, 0))
+            tokens = min(self.burst, tokens + (now - last) * rate)
+            if tokens < 1:
+                self._buckets[key] = (tokens, now, suppressed + 1)
+                return None
+            self._buckets[key] = (tokens - 1, now, 0)
+        return suppressed
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = getattr(record, "rate_limit", self.rate)
+        if not rate:
+            return True
+        suppressed = self.acquire((record.pathname, record.lineno), rate)
+        if suppressed is None:
+            return False
+        if suppressed:
+            record.msg = f"{record.msg} ({suppressed} similar messages suppressed)"
+        return True
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    Queue handler that leaves message formatting to the listener thread
+
+    The standard QueueHandler formats each record on the calling thread so
+    it can be pickled; records here stay in-process, so only the record is
+    queued and %-style arguments are rendered by the background writer.
+    Arguments must therefore not be mutated after the logging call.
+    """
+
+    def __init__(self, log_queue: "queue.Queue"):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.exc_info:
+            # Render tracebacks now rather than keep their frames alive
+            return super().prepare(record)
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # Never block a request on logging; count what was lost
+            self.dropped += 1
+
+
+def _configure() -> None:
+    if logging.getLogger().handlers:
+        # Already configured (like basicConfig, leave it alone)
+        return
+    rate_limit = RateLimitFilter(LOG_RATE_LIMIT)
+    if not LOG_ASYNC:
+        logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
+        for handler in logging.getLogger().handlers:
+            handler.addFilter(rate_limit)
+        return
+
+    log_queue: "queue.Queue" = queue.Queue(LOG_QUEUE_SIZE)
+    writer = logging.StreamHandler()
+    writer.setFormatter(logging.Formatter(LOG_FORMAT))
+    handler = DeferredQueueHandler(log_queue)
+    handler.addFilter(rate_limit)
+    logging.basicConfig(level=logging.INFO, handlers=[handler])
+
+    listener = QueueListener(log_queue, writer, respect_handler_level=True)
+    listener.start()
+    # Flush queued records on shutdown
+    atexit.register(listener.stop)
+
 
 # Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+_configure()
 
 logger = logging.getLogger(__name__)
 
+_hot_path_limiter = RateLimitFilter(LOG_HOT_PATH_RATE)
+
+
+def log_hot_path(msg: str, *args, level: int = logging.INFO) -> None:
+    """
+    Log a message emitted on every request, at most LOG_HOT_PATH_RATE per
+    second from each call site
+
+    The call site's budget is checked before a log record is created, so a
+    suppressed message costs a frame lookup and a dict update. Pass values
+    as %-style args: they are only formatted if the message is written.
+    """
+    if not logger.isEnabledFor(level):
+        return
+    if LOG_HOT_PATH_RATE:
+        caller = sys._getframe(1)
+        suppressed = _hot_path_limiter.acquire((caller.f_code.co_filename, caller.f_lineno), LOG_HOT_PATH_RATE)
+        if suppressed is None:
+            return
+        if suppressed:
+            msg = f"{msg} ({suppressed} similar messages suppressed)"
+    logger.log(level, msg, *args, stacklevel=2)
@@ -3,13 +3,25 @@ Data preprocessing utilities
 """
 import pandas as pd
 import numpy as np
-from typing import Tuple
+import scipy.sparse as sp
+from typing import Tuple, Optional, Union, Dict
 
-from common.config import FEATURE_COLUMNS_PATH
-from common.logger import logger
+from common.config import (
+    FEATURE_COLUMNS_PATH,
+    SANITIZE_NAN_VALUE,
+    SANITIZE_POSINF_VALUE,
+    SANITIZE_NEGINF_VALUE,
+    FLOAT32_PIPELINE
+)
+from common.logger import logger, log_hot_path
 import json
 
 
+# Float32 (offset, divisor) per fitted scaler, keyed by id() and holding a
+# reference to the scaler so the id cannot be reused
+_FLOAT32_SCALER_PARAMS: Dict[int, Tuple[object, Optional[Tuple[np.ndarray, np.ndarray]]]] = {}
+
+
 def split_columns(df: pd.DataFrame, encoder, scaler) -> Tuple[list, list]:
     """
     Split columns into categorical and numerical based on encoder and scaler
@@ -35,24 +47,169 @@ def split_columns(df: pd.DataFrame, encoder, scaler) -> Tuple[list, list]:
     return enc_in, scl_in
 
 
-def preprocess_dataframe(
-    df: pd.DataFrame, 
-    encoder, 
-    scaler, 
-    feature_columns: list
-) -> pd.DataFrame:
+def input_columns(encoder, scaler) -> Optional[list]:
     """
-    Preprocess DataFrame for model prediction
+    Raw columns the preprocessing reads, for column projection on upload
+    
+    Args:
+        encoder: Fitted encoder (its feature_names_in_, if any, are included)
+        scaler: Fitted scaler with feature_names_in_ attribute
+    
+    Returns:
+        Column names, or None if the scaler does not record its inputs
+        (every column must then be read)
+    """
+    scl_in = getattr(scaler, "feature_names_in_", None)
+    if scl_in is None:
+        return None
+    return list(getattr(encoder, "feature_names_in_", [])) + list(scl_in)
+
+
+def validate_features(df: pd.DataFrame, encoder, scaler) -> None:
+    """
+    Check that raw input holds every model feature, numerical ones as numbers
+    
+    Columns are matched case-insensitively, as in preprocessing. Numerical
+    features sent as text must parse as numbers. Nothing is checked when the
+    scaler does not record its inputs.
     
     Args:
         df: Raw DataFrame
         encoder: Fitted encoder
         scaler: Fitted scaler
-        feature_columns: List of feature column names expected by the model
+    
+    Raises:
+        ValueError: If features are missing or hold non-numeric values
+    """
+    expected = input_columns(encoder, scaler)
+    if expected is None:
+        return
+    present = {c.lower(): c for c in df.columns}
+    missing = [c for c in expected if c.lower() not in present]
+    if len(missing) == len(expected):
+        raise ValueError("No model features found in the input")
+    if missing:
+        raise ValueError(f"{len(missing)} model features are missing, such as {missing[:5]}")
+    for name in getattr(scaler, "feature_names_in_", []):
+        column = df[present[name.lower()]]
+        if not pd.api.types.is_numeric_dtype(column):
+            try:
+                pd.to_numeric(column)
+            except (ValueError, TypeError) as e:
+                raise ValueError(f"Numerical column '{name}' has non-numeric values: {e}") from e
+
+
+def sanitize_numeric(
+    X: np.ndarray,
+    nan: float = SANITIZE_NAN_VALUE,
+    posinf: float = SANITIZE_POSINF_VALUE,
+    neginf: float = SANITIZE_NEGINF_VALUE
+) -> np.ndarray:
+    """
+    Replace NaN and +/-inf in a float matrix in place and count them per feature
+    
+    One vectorized isfinite pass finds the bad entries; only those are
+    rewritten, so clean data costs a single read of the block.
+    
+    Args:
+        X: 2-D float array (n_samples, n_features), modified in place
+        nan: Value written over NaN
+        posinf: Value written over +inf
+        neginf: Value written over -inf
     
     Returns:
-        Preprocessed DataFrame ready for model prediction
+        int64 array of shape (n_features,) with the number of replaced values
+    """
+    bad = ~np.isfinite(X)
+    counts = bad.sum(axis=0)
+    if counts.any():
+        rows, cols = np.nonzero(bad)
+        values = X[rows, cols]
+        X[rows, cols] = np.where(np.isnan(values), nan, np.where(values > 0, posinf, neginf))
+    return counts
+
+
+def _float32_scaler_params(scaler) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Precompute a fitted scaler as float32 (offset, divisor) arrays
+    
+    transform(x) == (x - offset) / divisor, in the same operation order as
+    scikit-learn. Returns None for scaler types without this form.
     """
+    cached = _FLOAT32_SCALER_PARAMS.get(id(scaler))
+    if cached is not None and cached[0] is scaler:
+        return cached[1]
+    
+    name = type(scaler).__name__
+    n_features = int(getattr(scaler, "n_features_in_", 0))
+    ones, zeros = np.ones(n_features), np.zeros(n_features)
+    # mean_/center_ and scale_ may be fitted even when transform() does not
+    # apply them, so the with_* flags decide
+    if name == "StandardScaler":
+        offset = scaler.mean_ if scaler.with_mean and scaler.mean_ is not None else zeros
+        divisor = scaler.scale_ if scaler.with_std and scaler.scale_ is not None else ones
+    elif name == "RobustScaler":
+        offset = scaler.center_ if scaler.with_centering and scaler.center_ is not None else zeros
+        divisor = scaler.scale_ if scaler.with_scaling and scaler.scale_ is not None else ones
+    elif name == "MaxAbsScaler":
+        offset, divisor = zeros, scaler.scale_
+    else:
+        offset = divisor = None
+    
+    params = None
+    if offset is not None:
+        params = (np.asarray(offset, dtype=np.float32), np.asarray(divisor, dtype=np.float32))
+    _FLOAT32_SCALER_PARAMS[id(scaler)] = (scaler, params)
+    return params
+
+
+def _scale_float32(X: np.ndarray, columns: list, scaler) -> np.ndarray:
+    """Scale a float32 block in place with precomputed float32 parameters"""
+    params = _float32_scaler_params(scaler)
+    expected = list(getattr(scaler, "feature_names_in_", columns))
+    if params is None or len(expected) != X.shape[1]:
+        # Unsupported scaler or missing features: let scikit-learn handle/report it
+        frame = pd.DataFrame(X, columns=columns, copy=False)
+        return scaler.transform(frame).astype(np.float32, copy=False)
+    
+    offset, divisor = params
+    if columns != expected:
+        positions = {name: i for i, name in enumerate(expected)}
+        index = [positions[c] for c in columns]
+        offset, divisor = offset[index], divisor[index]
+    X -= offset
+    X /= divisor
+    return X
+
+
+def _preprocess_matrix(
+    df: pd.DataFrame,
+    encoder,
+    scaler,
+    scale: bool = True,
+    sparse: bool = False,
+    replaced: Optional[Dict[str, int]] = None,
+    float32: Optional[bool] = None
+) -> Tuple[Union[np.ndarray, sp.csr_matrix], list]:
+    """
+    Clean, encode and scale a raw DataFrame into a feature matrix
+    
+    Args:
+        df: Raw DataFrame
+        encoder: Fitted encoder
+        scaler: Fitted scaler
+        scale: Apply the scaler to numerical columns
+        sparse: Keep the encoder output sparse and return a CSR matrix
+        replaced: Optional dict updated with the number of NaN/inf values
+            replaced per numeric feature (features with none are omitted)
+        float32: Sanitize and scale in float32 with precomputed scaler
+            parameters (None: server default FLOAT32_PIPELINE)
+    
+    Returns:
+        Tuple of (feature matrix, column names of the matrix)
+    """
+    if float32 is None:
+        float32 = FLOAT32_PIPELINE
     df = df.copy()
     
     # Validate DataFrame is not empty
@@ -74,7 +231,7 @@ def preprocess_dataframe(
                 renamed_columns.append(col)  # Keep original if no match
         
         df.columns = renamed_columns
-        logger.info(f"Normalized column names to match scaler (first 5): {df.columns[:5].tolist()}")
+        log_hot_path("Normalized column names to match scaler (first 5): %s", list(df.columns[:5]))
     else:
         logger.warning("Scaler does not have feature_names_in_, using original column names")
     
@@ -93,13 +250,37 @@ def preprocess_dataframe(
     if df.empty or len(df.columns) == 0:
         raise ValueError("DataFrame has no columns after removing Timestamp and Label.")
     
-    # Handle missing values and infinities
+    # Scaler inputs that arrive as text (JSON strings, object CSV columns)
+    # are parsed to numbers so they join the numeric block
+    scaler_inputs = set(getattr(scaler, "feature_names_in_", []))
+    for c in df.columns:
+        if c in scaler_inputs and not pd.api.types.is_numeric_dtype(df[c]):
+            try:
+                values = pd.to_numeric(df[c])
+            except (ValueError, TypeError) as e:
+                raise ValueError(f"Numerical column '{c}' has non-numeric values: {e}") from e
+            df[c] = values.to_numpy(dtype=np.float64, na_value=np.nan)
+    
+    # Handle missing values and infinities: text columns one by one, the
+    # numeric block as a single array sanitized in place
     for c in df.columns:
         if df[c].dtype == "object":
             df[c] = df[c].fillna("missing")
-        else:
-            df[c] = df[c].replace([np.inf, -np.inf], np.nan)
-            df[c] = df[c].fillna(0)
+    
+    numeric_cols = [c for c in df.columns if pd.api.types.is_numeric_dtype(df[c])]
+    if float32:
+        # Filled column by column so the block is C-ordered like the model input
+        block = np.empty((len(df), len(numeric_cols)), dtype=np.float32)
+        for j, c in enumerate(numeric_cols):
+            block[:, j] = df[c].to_numpy()
+    else:
+        block = df[numeric_cols].to_numpy(dtype=np.float64, copy=True)
+    counts = sanitize_numeric(block)
+    numeric = pd.DataFrame(block, columns=numeric_cols, index=df.index, copy=False)
+    if replaced is not None:
+        for name, count in zip(numeric_cols, counts):
+            if count:
+                replaced[name] = replaced.get(name, 0) + int(count)
 
     # Split categorical and numerical columns
     cat_cols, num_cols = split_columns(df, encoder, scaler)
@@ -112,7 +293,9 @@ def preprocess_dataframe(
     if len(cat_cols) > 0:
         try:
             X_cat = encoder.transform(df[cat_cols])
-            if hasattr(X_cat, "toarray"):
+            if sparse:
+                X_cat = sp.csr_matrix(X_cat)
+            elif hasattr(X_cat, "toarray"):
                 X_cat = X_cat.toarray()
             try:
                 # Try different methods to get feature names
@@ -134,11 +317,24 @@ def preprocess_dataframe(
     else:
         X_cat = np.array([]).reshape(len(df), 0)
         cat_names = []
+    if float32:
+        X_cat = X_cat.astype(np.float32, copy=False)
 
     # Scale numerical columns
     if len(num_cols) > 0:
         try:
-            X_num = scaler.transform(df[num_cols])
+            if float32:
+                # Stay in float32: no DataFrame round trip, no upcast
+                if num_cols == numeric_cols:
+                    X_num = block
+                else:
+                    X_num = numeric[num_cols].to_numpy(dtype=np.float32, copy=True)
+                if scale:
+                    X_num = _scale_float32(X_num, num_cols, scaler)
+            elif scale:
+                X_num = scaler.transform(numeric[num_cols])
+            else:
+                X_num = numeric[num_cols].to_numpy(dtype=np.float64)
             num_names = num_cols
         except Exception as e:
             logger.error(f"Error scaling numerical columns: {e}")
@@ -150,16 +346,46 @@ def preprocess_dataframe(
         num_names = []
 
     # Concatenate
-    if X_cat.size > 0 and X_num.size > 0:
+    if X_cat.shape[1] == 0 and X_num.shape[1] == 0:
+        raise ValueError("Both categorical and numerical arrays are empty after preprocessing")
+    if sparse:
+        X = sp.hstack([sp.csr_matrix(X_num), sp.csr_matrix(X_cat)], format="csr")
+    elif X_cat.shape[1] > 0 and X_num.shape[1] > 0:
         X = np.hstack([X_num, X_cat])
-    elif X_num.size > 0:
+    elif X_num.shape[1] > 0:
         X = X_num
-    elif X_cat.size > 0:
-        X = X_cat
     else:
-        raise ValueError("Both categorical and numerical arrays are empty after preprocessing")
+        X = X_cat
     
     cols = list(num_names) + list(cat_names)
+    return X, cols
+
+
+def preprocess_dataframe(
+    df: pd.DataFrame, 
+    encoder, 
+    scaler, 
+    feature_columns: list,
+    scale: bool = True,
+    replaced: Optional[Dict[str, int]] = None
+) -> pd.DataFrame:
+    """
+    Preprocess DataFrame for model prediction
+    
+    Args:
+        df: Raw DataFrame
+        encoder: Fitted encoder
+        scaler: Fitted scaler
+        feature_columns: List of feature column names expected by the model
+        scale: Apply the scaler to numerical columns. Disable for models
+            that have the scaler folded into their first layer
+        replaced: Optional dict updated with NaN/inf replacement counts
+            per feature
+    
+    Returns:
+        Preprocessed DataFrame ready for model prediction
+    """
+    X, cols = _preprocess_matrix(df, encoder, scaler, scale, replaced=replaced)
     X_df = pd.DataFrame(X, columns=cols)
 
     # Reindex columns in the exact order expected by the model
@@ -167,3 +393,100 @@ def preprocess_dataframe(
     
     return X_df
 
+
+def preprocess_array(
+    df: pd.DataFrame,
+    encoder,
+    scaler,
+    feature_columns: Optional[list],
+    scale: bool = True,
+    replaced: Optional[Dict[str, int]] = None,
+    float32: Optional[bool] = None
+) -> np.ndarray:
+    """
+    Preprocess DataFrame into a C-contiguous float32 array for inference
+    
+    Same transformation as preprocess_dataframe, but columns are aligned to
+    feature_columns with an index map instead of a DataFrame reindex, and
+    the result is handed to the models without feature-name validation.
+    
+    Args:
+        df: Raw DataFrame
+        encoder: Fitted encoder
+        scaler: Fitted scaler
+        feature_columns: Column order expected by the model, or None to keep
+            the encoder/scaler order
+        scale: Apply the scaler to numerical columns
+        replaced: Optional dict updated with NaN/inf replacement counts
+            per feature
+        float32: Run cleaning and scaling in float32 (None: server default)
+    
+    Returns:
+        float32 array of shape (n_samples, len(feature_columns))
+    """
+    X, cols = _preprocess_matrix(df, encoder, scaler, scale, replaced=replaced, float32=float32)
+    if feature_columns is None or cols == list(feature_columns):
+        # Already in model order: no aligned copy (and none at all in float32 mode)
+        return np.ascontiguousarray(X, dtype=np.float32)
+
+    positions = {name: i for i, name in enumerate(cols)}
+    dst = [j for j, name in enumerate(feature_columns) if name in positions]
+    src = [positions[feature_columns[j]] for j in dst]
+
+    out = np.zeros((X.shape[0], len(feature_columns)), dtype=np.float32)
+    out[:, dst] = X[:, src]
+    return out
+
+
+def preprocess_sparse(
+    df: pd.DataFrame,
+    encoder,
+    scaler,
+    feature_columns: Optional[list],
+    scale: bool = True,
+    replaced: Optional[Dict[str, int]] = None,
+    float32: Optional[bool] = None
+) -> sp.csr_matrix:
+    """
+    Preprocess DataFrame into a float32 CSR matrix for inference
+    
+    Same transformation as preprocess_array, but one-hot encoded columns
+    stay sparse: the encoder output is never densified and columns are
+    aligned to feature_columns with a sparse selection matrix, so memory
+    and time grow with the non-zero entries rather than with the number
+    of categories. Zeros are not stored; models must read absent entries
+    as 0 (see ModelLoader.predict_proba).
+    
+    Args:
+        df: Raw DataFrame
+        encoder: Fitted encoder
+        scaler: Fitted scaler
+        feature_columns: Column order expected by the model, or None to keep
+            the encoder/scaler order
+        scale: Apply the scaler to numerical columns
+        replaced: Optional dict updated with NaN/inf replacement counts
+            per feature
+        float32: Run cleaning and scaling in float32 (None: server default)
+    
+    Returns:
+        float32 CSR matrix of shape (n_samples, len(feature_columns))
+    """
+    X, cols = _preprocess_matrix(
+        df, encoder, scaler, scale, sparse=True, replaced=replaced, float32=float32
+    )
+    X = X.astype(np.float32, copy=False)
+    if feature_columns is None:
+        X.eliminate_zeros()
+        return X
+
+    positions = {name: i for i, name in enumerate(cols)}
+    dst = [j for j, name in enumerate(feature_columns) if name in positions]
+    src = [positions[feature_columns[j]] for j in dst]
+    selection = sp.csr_matrix(
+        (np.ones(len(dst), dtype=np.float32), (src, dst)),
+        shape=(len(cols), len(feature_columns))
+    )
+
+    out = (X @ selection).tocsr()
+    out.eliminate_zeros()
+    return out
@@ -0,0 +1,89 @@
+"""
+JSON serialization for large internal results - NumPy-aware and fast
+"""
+import json
+import math
+import datetime
+from typing import Any
+
+import numpy as np
+import pandas as pd
+from fastapi.responses import Response
+
+from monitoring.metrics import stage
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(obj: Any) -> Any:
+    """Types neither encoder handles natively"""
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, pd.Categorical):
+        # Label strings, missing values as null
+        return np.asarray(obj, dtype=object).tolist()
+    if isinstance(obj, (datetime.datetime, datetime.date)):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _finite(obj: Any) -> Any:
+    """Replace NaN/inf floats with None (the stdlib encoder would emit NaN)"""
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {k: _finite(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_finite(v) for v in obj]
+    return obj
+
+
+def dumps(content: Any) -> bytes:
+    """
+    Encode to compact UTF-8 JSON
+
+    NumPy arrays and scalars are written directly (no per-element Python
+    objects with orjson), dict keys may be non-strings, and non-finite
+    floats become null. Without orjson the standard library encoder is used.
+    """
+    if orjson is not None:
+        return orjson.dumps(
+            content,
+            default=_default,
+            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        )
+    return json.dumps(
+        _finite(content),
+        default=lambda obj: _finite(_default(obj)),
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":")
+    ).encode("utf-8")
+
+
+def loads(data: bytes) -> Any:
+    """Decode a JSON document (orjson when installed)"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class FastJSONResponse(Response):
+    """
+    JSON response for trusted internal results
+
+    Returning it from an endpoint bypasses response_model validation and
+    jsonable_encoder (the model still documents the schema), and the body
+    is encoded in one pass by dumps().
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        with stage("response", "serialize"):
+            return dumps(content)
@@ -2,13 +2,16 @@
 Dataset analysis API endpoints
 """
 from fastapi import APIRouter, HTTPException, UploadFile, File, Query
-from io import BytesIO
 import pandas as pd
 
 from dataset_analysis.services import get_dataset_analysis_service
+from common.ingestion import read_upload, upload_format, UPLOAD_SUFFIXES
 from common.logger import logger
+from common.serialization import FastJSONResponse
+from monitoring.metrics import stage
+from monitoring.middleware import TimedRoute
 
-router = APIRouter(prefix="/analyze-dataset", tags=["dataset-analysis"])
+router = APIRouter(prefix="/analyze-dataset", tags=["dataset-analysis"], route_class=TimedRoute)
 
 
 @router.get("")
@@ -17,7 +20,7 @@ def analyze_dataset():
     try:
         service = get_dataset_analysis_service()
         result = service.analyze_dataset()
-        return result
+        return FastJSONResponse(result)
     except FileNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
@@ -43,7 +46,7 @@ def analyze_dataset_balanced(
             benign_samples, 
             malicious_samples
         )
-        return result
+        return FastJSONResponse(result)
     except FileNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
@@ -62,7 +65,7 @@ def analyze_dataset_all_attacks(samples_per_attack: int = 50):
     try:
         service = get_dataset_analysis_service()
         result = service.analyze_dataset_all_attacks(samples_per_attack)
-        return result
+        return FastJSONResponse(result)
     except FileNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
@@ -77,38 +80,44 @@ async def analyze_dataset_upload(
     malicious_samples: int = Query(500, ge=1, le=10000)
 ):
     """
-    Analyze uploaded CSV file with balanced sampling
+    Analyze an uploaded file with balanced sampling
     
     Args:
-        file: CSV file to upload
+        file: CSV (optionally gzip, bz2, xz or zstd compressed), Parquet or
+            Arrow IPC file to upload
         benign_samples: Number of BENIGN samples to take (default: 500)
         malicious_samples: Number of malicious samples to take (default: 500)
     """
     try:
         # Validate file type
-        if not file.filename.endswith('.csv'):
+        if upload_format(file.filename) is None:
             raise HTTPException(
                 status_code=400,
-                detail="Only CSV files are accepted"
+                detail=f"Unsupported file type, accepted: {', '.join(UPLOAD_SUFFIXES)}"
             )
         
-        # Read CSV
-        content = await file.read()
-        df = pd.read_csv(BytesIO(content))
+        service = get_dataset_analysis_service()
         
-        logger.info(
-            f"CSV file received: {file.filename}, {len(df)} rows, {len(df.columns)} columns"
-        )
+        # Read only the columns the model uses, straight from the spooled upload
+        with stage("analysis_upload", "parse"):
+            try:
+                df = read_upload(file.file, file.filename, columns=service.prediction_service.input_columns())
+            except pd.errors.EmptyDataError:
+                raise HTTPException(status_code=400, detail="CSV file is empty or invalid")
+            except ValueError as e:
+                # Parser errors and formats this server cannot read
+                raise HTTPException(status_code=400, detail=f"Invalid file: {str(e)}")
+        
+        logger.info("File received: %s, %d rows, %d columns", file.filename, len(df), len(df.columns))
         
         # Validate dataset is not empty
         if df.empty:
             raise HTTPException(
                 status_code=400,
-                detail="Uploaded CSV file is empty"
+                detail="Uploaded file is empty"
             )
         
         # Analyze with balanced sampling
-        service = get_dataset_analysis_service()
         result = service.analyze_dataset_balanced_from_dataframe(
             df=df,
             benign_samples=benign_samples,
@@ -116,14 +125,10 @@ async def analyze_dataset_upload(
             filename=file.filename
         )
         
-        return result
+        return FastJSONResponse(result)
         
     except HTTPException:
         raise
-    except pd.errors.EmptyDataError:
-        raise HTTPException(status_code=400, detail="CSV file is empty or invalid")
-    except pd.errors.ParserError as e:
-        raise HTTPException(status_code=400, detail=f"Invalid CSV format: {str(e)}")
     except Exception as e:
         logger.error(f"Error during uploaded dataset analysis: {e}")
         raise HTTPException(status_code=500, detail=f"Analysis error: {str(e)}")
@@ -11,6 +11,8 @@ from model_management.services import get_model_loader
 from prediction.services import get_prediction_service
 from common.config import TEST_CSV_PATH
 from common.preprocessing import preprocess_dataframe
+from common.ingestion import read_csv
+from monitoring.metrics import stage
 from common.constants import THREAT_TYPES
 from common.logger import logger
 
@@ -37,14 +39,15 @@ class DatasetAnalysisService:
                 raise FileNotFoundError(f"Test CSV not found: {TEST_CSV_PATH}")
             
             # Load dataset
-            df = pd.read_csv(TEST_CSV_PATH)
+            with stage("analysis", "parse"):
+                df = read_csv(TEST_CSV_PATH)
             logger.info(f"Dataset test_api.csv loaded: {len(df)} rows")
             
             # Random sampling
             df_sample = df.sample(n=min(sample_size, len(df)), random_state=42)
             
             # Make predictions
-            result = self.prediction_service.predict_batch(df_sample)
+            result = self.prediction_service.predict_batch(df_sample, source="analysis")
             
             # Add dataset info
             result["dataset_info"] = {
@@ -147,7 +150,7 @@ class DatasetAnalysisService:
                 )
             
             # Make predictions
-            result = self.prediction_service.predict_batch(df_sample)
+            result = self.prediction_service.predict_batch(df_sample, source="analysis")
             
             # Add original labels if available
             if 'Label' in df_sample.columns:
@@ -192,7 +195,8 @@ class DatasetAnalysisService:
                 raise FileNotFoundError(f"Test CSV not found: {TEST_CSV_PATH}")
             
             # Load dataset
-            df = pd.read_csv(TEST_CSV_PATH)
+            with stage("analysis", "parse"):
+                df = read_csv(TEST_CSV_PATH)
             logger.info(f"Dataset test_api.csv loaded: {len(df)} rows, {len(df.columns)} columns")
             
             # Validate dataset is not empty
@@ -262,7 +266,7 @@ class DatasetAnalysisService:
                 )
             
             # Make predictions
-            result = self.prediction_service.predict_batch(df_sample)
+            result = self.prediction_service.predict_batch(df_sample, source="analysis")
             
             # Add original labels if available
             if 'Label' in df_sample.columns:
@@ -304,7 +308,8 @@ class DatasetAnalysisService:
                 raise FileNotFoundError(f"Test CSV not found: {TEST_CSV_PATH}")
             
             # Load dataset
-            df = pd.read_csv(TEST_CSV_PATH)
+            with stage("analysis", "parse"):
+                df = read_csv(TEST_CSV_PATH)
             logger.info(f"Dataset test_api.csv loaded: {len(df)} rows")
             
             if 'Label' in df.columns:
@@ -341,7 +346,7 @@ class DatasetAnalysisService:
                 logger.warning("Column 'Label' not found")
             
             # Make predictions
-            result = self.prediction_service.predict_batch(df_sample)
+            result = self.prediction_service.predict_batch(df_sample, source="analysis")
             
             # Add original labels if available
             if 'Label' in df_sample.columns:
@@ -1,23 +1,47 @@
 """
 Main FastAPI application entry point
 """
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from datetime import datetime
-import random
+from fastapi.middleware.gzip import GZipMiddleware
 
-from common.config import CORS_ORIGINS
-from common.constants import THREAT_TYPES
+from common.config import CORS_ORIGINS, MODEL_WARMUP, RESPONSE_GZIP_MIN_SIZE, RESPONSE_GZIP_LEVEL
+from common.logger import logger
+from model_management.services import get_model_loader
+from model_management.mlp_loader import get_mlp_model_loader
 from model_management.endpoints import router as model_router
 from prediction.endpoints import router as prediction_router
 from dataset_analysis.endpoints import router as dataset_router
 from benchmarking.endpoints import router as benchmark_router
+from monitoring.endpoints import router as monitoring_router
+from monitoring.middleware import MetricsMiddleware
+
+
+def warmup_models() -> None:
+    """Load both models and run their serving paths before accepting traffic"""
+    for name, get_loader in (("XGBoost", get_model_loader), ("MLP", get_mlp_model_loader)):
+        try:
+            get_loader().warmup()
+        except Exception as e:
+            # Keep serving: the model is loaded lazily again on first use
+            logger.error(f"{name} warmup failed: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application startup and shutdown"""
+    if MODEL_WARMUP:
+        warmup_models()
+    yield
+
 
 # Initialize FastAPI app
 app = FastAPI(
     title="CIC-IDS 2017 XGBoost API", 
     version="1.0",
-    description="API de détection d'intrusion basée sur XGBoost avec dataset CIC-IDS-2017"
+    description="API de détection d'intrusion basée sur XGBoost avec dataset CIC-IDS-2017",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -29,11 +53,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request latency and in-flight requests for /metrics
+app.add_middleware(MetricsMiddleware)
+
+# Outermost, so Server-Timing debug bodies are edited before compression
+if RESPONSE_GZIP_MIN_SIZE > 0:
+    app.add_middleware(GZipMiddleware, minimum_size=RESPONSE_GZIP_MIN_SIZE, compresslevel=RESPONSE_GZIP_LEVEL)
+
 # Include routers
 app.include_router(model_router)
 app.include_router(prediction_router)
 app.include_router(dataset_router)
 app.include_router(benchmark_router)
+app.include_router(monitoring_router)
 
 
 @app.get("/")
@@ -43,43 +75,21 @@ def root():
         "message": "CIC-IDS 2017 XGBoost vs MLP Benchmarking API",
         "version": "2.0",
         "endpoints": [
+            "/model/live",
+            "/model/ready",
             "/model/health",
             "/model/info",
             "/predict/one",
             "/predict/csv",
+            "/predict/bulk",
             "/analyze-dataset",
             "/analyze-dataset/balanced",
             "/analyze-dataset/all-attacks",
             "/benchmark/compare",
             "/benchmark/models-info",
             "/benchmark/health",
-            "/realtime-metrics"
-        ]
-    }
-
-
-@app.get("/realtime-metrics")
-def get_realtime_metrics():
-    """Real-time metrics for dashboard"""
-    return {
-        "current_metrics": {
-            "samples_processed": random.randint(10000, 50000),
-            "threats_detected": random.randint(50, 200),
-            "accuracy_current": round(99.86 + random.uniform(-0.1, 0.1), 2),
-            "processing_speed": f"{random.randint(800, 1200)} samples/sec"
-        },
-        "system_status": {
-            "model_status": "active",
-            "last_update": datetime.now().isoformat(),
-            "uptime": "99.97%",
-            "memory_usage": f"{random.randint(60, 80)}%"
-        },
-        "recent_activity": [
-            {
-                "timestamp": datetime.now().isoformat(),
-                "event": "Threat detected",
-                "details": f"DDoS attack from IP 192.168.1.{random.randint(1, 255)}"
-            }
+            "/realtime-metrics",
+            "/metrics"
         ]
     }
 
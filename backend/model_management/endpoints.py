@@ -6,9 +6,11 @@ from fastapi.responses import JSONResponse
 from datetime import datetime
 
 from model_management.services import get_model_loader
+from model_management.health import get_health_monitor
 from common.logger import logger
+from monitoring.middleware import TimedRoute
 
-router = APIRouter(prefix="/model", tags=["model"])
+router = APIRouter(prefix="/model", tags=["model"], route_class=TimedRoute)
 
 
 @router.get("/info")
@@ -24,12 +26,26 @@ def get_model_info():
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/live")
+def liveness_probe():
+    """Liveness probe: answers without touching the models"""
+    return get_health_monitor().liveness()
+
+
+@router.get("/ready")
+def readiness_probe():
+    """Readiness probe: XGBoost model loaded and not failing its deep check"""
+    result = get_health_monitor().readiness()
+    if result["status"] != "ready":
+        return JSONResponse(status_code=503, content=result)
+    return result
+
+
 @router.get("/health")
 def health_check():
-    """Health check endpoint for the model"""
+    """Deep health check of the model (cached, see HEALTH_CHECK_TTL)"""
     try:
-        model_loader = get_model_loader()
-        result = model_loader.health_check()
+        result = get_health_monitor().deep("xgboost")
         result["timestamp"] = datetime.now().isoformat()
         
         if result["status"] == "unhealthy":
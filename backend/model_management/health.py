@@ -0,0 +1,182 @@
+"""
+Health probes - O(1) liveness, readiness from the loaded models, and deep
+checks (a real inference) cached with a TTL and refreshed in the background
+"""
+import time
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+from common.config import HEALTH_CHECK_TTL
+from common.logger import logger
+from model_management.services import get_model_loader, get_loaded_model_loader
+from model_management.mlp_loader import get_mlp_model_loader, get_loaded_mlp_model_loader
+
+
+class CachedHealthCheck:
+    """
+    Runs an expensive check at most once per `ttl` seconds
+
+    The first call runs the check inline. After that callers always get the
+    cached result immediately; once it is older than the TTL a single
+    background thread refreshes it (stale-while-revalidate), so probes never
+    queue behind an inference.
+    """
+
+    def __init__(self, name: str, check: Callable[[], Dict[str, Any]], ttl: float, clock=time.monotonic):
+        """
+        Args:
+            name: Label used in logs
+            check: Function returning a health dict with a "status" key
+            ttl: Seconds a result is considered fresh
+            clock: Monotonic time source
+        """
+        self.name = name
+        self._check = check
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._result: Optional[Dict[str, Any]] = None
+        self._checked_at: Optional[float] = None
+        self._checked_at_wall: Optional[str] = None
+
+    def _run(self) -> None:
+        try:
+            result = self._check()
+        except Exception as e:
+            logger.error(f"{self.name} deep health check failed: {e}")
+            result = {"status": "unhealthy", "error": str(e)}
+        with self._lock:
+            self._result = result
+            self._checked_at = self._clock()
+            self._checked_at_wall = datetime.now().isoformat()
+            self._refreshing = False
+
+    def age(self) -> Optional[float]:
+        """Seconds since the last completed check (None if never run)"""
+        checked_at = self._checked_at
+        return None if checked_at is None else self._clock() - checked_at
+
+    def last_status(self) -> Optional[str]:
+        result = self._result
+        return None if result is None else result.get("status")
+
+    def get(self) -> Dict[str, Any]:
+        """Latest result with its age, refreshing it as described above"""
+        with self._lock:
+            start_refresh = False
+            if self._result is None:
+                run_inline = True
+            else:
+                run_inline = False
+                if self._clock() - self._checked_at >= self.ttl and not self._refreshing:
+                    self._refreshing = start_refresh = True
+        if run_inline:
+            self._run()
+        elif start_refresh:
+            threading.Thread(target=self._run, name=f"health-{self.name}", daemon=True).start()
+        with self._lock:
+            return {
+                **self._result,
+                "checked_at": self._checked_at_wall,
+                "check_age_seconds": round(self._clock() - self._checked_at, 3),
+                "refreshing": self._refreshing
+            }
+
+
+class HealthMonitor:
+    """Liveness, readiness and cached deep checks for both model families"""
+
+    def __init__(self, ttl: float = HEALTH_CHECK_TTL):
+        self.started_at = time.monotonic()
+        self._load_lock = threading.Lock()
+        self._loading = False
+        self.deep_checks = {
+            "xgboost": CachedHealthCheck("xgboost", lambda: get_model_loader().health_check(), ttl),
+            "mlp": CachedHealthCheck("mlp", lambda: get_mlp_model_loader().health_check(), ttl)
+        }
+
+    def _check_ages(self) -> Dict[str, Optional[float]]:
+        ages = {}
+        for name, check in self.deep_checks.items():
+            age = check.age()
+            ages[name] = None if age is None else round(age, 3)
+        return ages
+
+    def liveness(self) -> Dict[str, Any]:
+        """The process answers: no model access, no locks"""
+        return {
+            "status": "alive",
+            "uptime_seconds": round(time.monotonic() - self.started_at, 3),
+            "deep_check_age_seconds": self._check_ages()
+        }
+
+    def _load_models(self) -> None:
+        try:
+            loader = get_loaded_model_loader()
+            if loader is None:
+                get_model_loader()
+            elif not loader.is_loaded():
+                # An earlier load failed: get_model_loader() would return it as is
+                loader.load_model()
+        except Exception as e:
+            logger.error(f"Background model load failed: {e}")
+        finally:
+            with self._load_lock:
+                self._loading = False
+
+    def _start_loading(self) -> bool:
+        """Load the XGBoost model in a background thread (one at a time)"""
+        with self._load_lock:
+            if not self._loading:
+                self._loading = True
+                threading.Thread(target=self._load_models, name="health-model-load", daemon=True).start()
+            return self._loading
+
+    def readiness(self) -> Dict[str, Any]:
+        """
+        Whether this worker can serve predictions: the XGBoost model is
+        loaded and its last deep check (if any) did not fail. The MLP is
+        reported but only needed by the cascade and benchmark endpoints.
+
+        Without MODEL_WARMUP nothing loads the model until the first
+        prediction, so a not-ready probe starts loading it in the background
+        and the worker turns ready once that finishes. Likewise a deep
+        result older than the TTL is refreshed in the background, so a
+        transient failure does not keep the worker unready.
+        """
+        xgboost_check = self.deep_checks["xgboost"]
+        if xgboost_check.age() is not None:
+            # Never the first (inline) run: probes must not wait on inference
+            xgboost_check.get()
+        models = {}
+        for name, loader in (("xgboost", get_loaded_model_loader()), ("mlp", get_loaded_mlp_model_loader())):
+            models[name] = {
+                "loaded": loader is not None and loader.is_loaded(),
+                "last_deep_status": self.deep_checks[name].last_status()
+            }
+        xgboost = models["xgboost"]
+        ready = xgboost["loaded"] and xgboost["last_deep_status"] != "unhealthy"
+        return {
+            "status": "ready" if ready else "not ready",
+            "loading": not xgboost["loaded"] and self._start_loading(),
+            "models": models,
+            "deep_check_age_seconds": self._check_ages()
+        }
+
+    def deep(self, name: str) -> Dict[str, Any]:
+        """Cached deep check of one model family"""
+        return self.deep_checks[name].get()
+
+
+# Global health monitor instance
+_health_monitor: Optional[HealthMonitor] = None
+
+
+def get_health_monitor() -> HealthMonitor:
+    """Get or create the global health monitor instance"""
+    global _health_monitor
+    if _health_monitor is None:
+        _health_monitor = HealthMonitor()
+    return _health_monitor
@@ -0,0 +1,279 @@
+"""
+MLP export utilities - fold preprocessing into the network weights
+"""
+import os
+import argparse
+import numpy as np
+from typing import Dict, Any, List, Optional, Tuple
+
+from common.logger import logger
+
+
+# Layers that are the identity at inference time
+_INFERENCE_NOOP_LAYERS = {
+    "InputLayer",
+    "Dropout",
+    "AlphaDropout",
+    "GaussianDropout",
+    "GaussianNoise",
+    "Flatten"
+}
+
+# Standalone activation layers mapped to activation names
+_ACTIVATION_LAYERS = {
+    "ReLU": "relu",
+    "Softmax": "softmax"
+}
+
+
+def scaler_affine(scaler) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Express a fitted scaler as a per-feature affine transform
+
+    Args:
+        scaler: Fitted StandardScaler, MinMaxScaler, RobustScaler or MaxAbsScaler
+
+    Returns:
+        Tuple (a, c) such that scaler.transform(x) == x * a + c
+    """
+    name = type(scaler).__name__
+    n_features = int(scaler.n_features_in_)
+
+    if name == "StandardScaler":
+        scale = scaler.scale_ if scaler.scale_ is not None else np.ones(n_features)
+        mean = scaler.mean_ if scaler.mean_ is not None else np.zeros(n_features)
+        a = 1.0 / scale
+        c = -mean * a
+    elif name == "MinMaxScaler":
+        if getattr(scaler, "clip", False):
+            raise ValueError("MinMaxScaler with clip=True is not an affine transform")
+        a = scaler.scale_
+        c = scaler.min_
+    elif name == "RobustScaler":
+        scale = scaler.scale_ if scaler.scale_ is not None else np.ones(n_features)
+        center = scaler.center_ if scaler.center_ is not None else np.zeros(n_features)
+        a = 1.0 / scale
+        c = -center * a
+    elif name == "MaxAbsScaler":
+        a = 1.0 / scaler.scale_
+        c = np.zeros(n_features)
+    else:
+        raise ValueError(f"Unsupported scaler type for folding: {name}")
+
+    return np.asarray(a, dtype=np.float64), np.asarray(c, dtype=np.float64)
+
+
+def _fold_input_affine(layer: Dict[str, Any], a: np.ndarray, c: np.ndarray) -> None:
+    """Absorb x -> x * a + c applied before a dense layer into its weights"""
+    kernel = layer["kernel"]
+    layer["bias"] = layer["bias"] + c @ kernel
+    layer["kernel"] = a[:, None] * kernel
+
+
+def _batch_norm_affine(bn_layer) -> Tuple[np.ndarray, np.ndarray]:
+    """Express an inference-mode BatchNormalization layer as x * s + t"""
+    axis = bn_layer.axis
+    if isinstance(axis, (list, tuple)):
+        axis = axis[0] if len(axis) == 1 else axis
+    if axis not in (-1, 1):
+        raise ValueError(f"Unsupported BatchNormalization axis: {bn_layer.axis}")
+
+    weights = bn_layer.get_weights()
+    idx = 0
+    gamma = None
+    beta = None
+    if bn_layer.scale:
+        gamma = weights[idx]
+        idx += 1
+    if bn_layer.center:
+        beta = weights[idx]
+        idx += 1
+    moving_mean, moving_variance = weights[idx], weights[idx + 1]
+
+    gamma = np.ones_like(moving_mean) if gamma is None else gamma
+    beta = np.zeros_like(moving_mean) if beta is None else beta
+
+    s = gamma.astype(np.float64) / np.sqrt(moving_variance.astype(np.float64) + bn_layer.epsilon)
+    t = beta.astype(np.float64) - moving_mean.astype(np.float64) * s
+    return s, t
+
+
+def extract_dense_layers(model) -> List[Dict[str, Any]]:
+    """
+    Flatten a feed-forward Keras model into a list of dense layers
+
+    BatchNormalization layers are folded into the adjacent Dense layer
+    (the preceding one when it has a linear activation, the following
+    one otherwise) and inference no-op layers are dropped.
+
+    Args:
+        model: Keras model made of Dense/BatchNormalization/Dropout/Activation layers
+
+    Returns:
+        List of dicts with float64 'kernel', 'bias' and 'activation' entries
+    """
+    layers: List[Dict[str, Any]] = []
+    pending: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+    for layer in model.layers:
+        kind = type(layer).__name__
+
+        if kind in _INFERENCE_NOOP_LAYERS:
+            continue
+
+        if kind == "Dense":
+            kernel, *rest = layer.get_weights()
+            kernel = kernel.astype(np.float64)
+            bias = rest[0].astype(np.float64) if rest else np.zeros(kernel.shape[1])
+            dense = {
+                "kernel": kernel,
+                "bias": bias,
+                "activation": getattr(layer.activation, "__name__", "linear")
+            }
+            if pending is not None:
+                _fold_input_affine(dense, *pending)
+                pending = None
+            layers.append(dense)
+
+        elif kind == "BatchNormalization":
+            s, t = _batch_norm_affine(layer)
+            if layers and layers[-1]["activation"] == "linear" and pending is None:
+                previous = layers[-1]
+                previous["kernel"] = previous["kernel"] * s[None, :]
+                previous["bias"] = previous["bias"] * s + t
+            elif pending is not None:
+                pending = (pending[0] * s, pending[1] * s + t)
+            else:
+                pending = (s, t)
+
+        elif kind in ("Activation",) or kind in _ACTIVATION_LAYERS:
+            activation = (
+                _ACTIVATION_LAYERS[kind] if kind in _ACTIVATION_LAYERS
+                else getattr(layer.activation, "__name__", "linear")
+            )
+            if not layers or layers[-1]["activation"] != "linear" or pending is not None:
+                raise ValueError(f"Cannot attach standalone activation '{layer.name}' to a dense layer")
+            layers[-1]["activation"] = activation
+
+        else:
+            raise ValueError(f"Unsupported layer type for export: {kind} ({layer.name})")
+
+    if pending is not None:
+        raise ValueError("Model ends with a BatchNormalization layer that cannot be folded")
+    if not layers:
+        raise ValueError("Model has no Dense layers to export")
+
+    return layers
+
+
+def fold_scaler(layers: List[Dict[str, Any]], scaler) -> List[Dict[str, Any]]:
+    """
+    Merge the fitted input scaler into the first dense layer
+
+    Args:
+        layers: Output of extract_dense_layers
+        scaler: Fitted scaler applied to the raw features before the model
+
+    Returns:
+        New list of layers that takes raw (cleaned, unscaled) features
+    """
+    a, c = scaler_affine(scaler)
+    if a.shape[0] != layers[0]["kernel"].shape[0]:
+        raise ValueError(
+            f"Scaler has {a.shape[0]} features but the first layer expects "
+            f"{layers[0]['kernel'].shape[0]}"
+        )
+
+    folded = [dict(layer) for layer in layers]
+    _fold_input_affine(folded[0], a, c)
+    return folded
+
+
+def build_keras_model(layers: List[Dict[str, Any]]):
+    """Rebuild a plain Sequential Keras model from dense layers"""
+    from tensorflow import keras
+
+    model = keras.Sequential([keras.Input(shape=(layers[0]["kernel"].shape[0],))])
+    for layer in layers:
+        model.add(keras.layers.Dense(layer["kernel"].shape[1], activation=layer["activation"]))
+    for dense, layer in zip(model.layers, layers):
+        dense.set_weights([
+            layer["kernel"].astype(np.float32),
+            layer["bias"].astype(np.float32)
+        ])
+    return model
+
+
+def build_folded_model(model, scaler):
+    """Build a Keras model equivalent to model(scaler.transform(x)) taking raw x"""
+    return build_keras_model(fold_scaler(extract_dense_layers(model), scaler))
+
+
+def export_npz(model, path: str, scaler=None, dtype=np.float32) -> None:
+    """
+    Dump the dense layers of a Keras MLP to a .npz archive for the NumPy engine
+
+    Args:
+        model: Source Keras model
+        path: Destination .npz file
+        scaler: Optional fitted scaler to fold into the first layer
+        dtype: Storage precision of the weights (float32 or float16)
+    """
+    from model_management.mlp_numpy import NumpyMLP
+
+    if scaler is not None and np.dtype(dtype) == np.float16:
+        # Folded first-layer weights scale with 1 / feature range and
+        # underflow in half precision; MLPModelLoader folds at load instead
+        raise ValueError("Store float16 weights without the scaler folded in")
+
+    layers = extract_dense_layers(model)
+    if scaler is not None:
+        layers = fold_scaler(layers, scaler)
+    NumpyMLP(layers, input_scaled=scaler is None).save(path, dtype=dtype)
+
+
+def main() -> None:
+    """Export the production MLP with its scaler folded into the first layer"""
+    import joblib
+    import tensorflow as tf
+    from common.config import (
+        MLP_MODEL_PATH, MLP_SCALER_PATH, MLP_FOLDED_MODEL_PATH, MLP_NPZ_PATH, MLP_NPZ_FP16_PATH
+    )
+
+    parser = argparse.ArgumentParser(description="Export an optimized copy of the MLP")
+    parser.add_argument("--model", default=MLP_MODEL_PATH, help="Source Keras model")
+    parser.add_argument("--scaler", default=MLP_SCALER_PATH, help="Fitted scaler (joblib)")
+    parser.add_argument("--format", choices=["keras", "npz"], default="keras", help="Export format")
+    parser.add_argument("--output", default=None, help="Destination file")
+    parser.add_argument("--no-fold-scaler", action="store_true", help="Keep scaling as a separate step")
+    parser.add_argument(
+        "--precision", choices=["float32", "float16"], default="float32",
+        help="Weight storage precision (npz only)"
+    )
+    args = parser.parse_args()
+    if args.precision == "float16" and args.format != "npz":
+        parser.error("--precision float16 is only supported with --format npz")
+
+    model = tf.keras.models.load_model(args.model, compile=False)
+    # float16 archives keep the scaler separate (see export_npz)
+    fold = not args.no_fold_scaler and args.precision == "float32"
+    scaler = joblib.load(args.scaler) if fold else None
+    if args.format == "npz":
+        default_output = MLP_NPZ_FP16_PATH if args.precision == "float16" else MLP_NPZ_PATH
+    else:
+        default_output = MLP_FOLDED_MODEL_PATH
+    output = args.output or default_output
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+
+    if args.format == "npz":
+        export_npz(model, output, scaler, dtype=np.dtype(args.precision))
+    else:
+        layers = extract_dense_layers(model)
+        if scaler is not None:
+            layers = fold_scaler(layers, scaler)
+        build_keras_model(layers).save(output)
+    logger.info(f"MLP exported to: {output}")
+
+
+if __name__ == "__main__":
+    main()
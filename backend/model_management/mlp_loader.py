@@ -3,16 +3,24 @@ MLP Model management service - handles MLP model loading
 """
 import os
 import joblib
-import tensorflow as tf
-from tensorflow import keras
+import numpy as np
 from typing import Optional, Dict, Any, List
 
 from common.config import (
     MLP_MODEL_PATH,
     MLP_ENCODER_PATH,
-    MLP_SCALER_PATH
+    MLP_SCALER_PATH,
+    MLP_NPZ_PATH,
+    MLP_NPZ_FP16_PATH,
+    MLP_FOLD_SCALER,
+    MLP_BACKEND,
+    MLP_PRECISION,
+    MLP_BATCH_BUCKETS
 )
 from common.logger import logger
+from model_management.mlp_export import build_folded_model, fold_scaler
+from model_management.mlp_numpy import NumpyMLP
+from model_management.mlp_serving import BucketedPredictor
 
 
 # MLP Model metrics (from training)
@@ -29,14 +37,58 @@ MLP_MODEL_METRICS = {
 class MLPModelLoader:
     """Service for loading and managing the MLP model"""
     
-    def __init__(self):
-        self.model: Optional[keras.Model] = None
+    # Weight precisions each backend can serve
+    PRECISIONS = {
+        "keras": ("float32",),
+        "numpy": ("float32", "float16")
+    }
+    
+    def __init__(self, backend: str = MLP_BACKEND, precision: str = MLP_PRECISION):
+        if backend not in self.PRECISIONS:
+            raise ValueError(f"Unknown MLP backend: {backend}")
+        if precision not in self.PRECISIONS[backend]:
+            raise ValueError(f"Precision {precision} is not available for the {backend} MLP backend")
+        self.backend = backend
+        self.precision = precision
+        self.model_path = MLP_MODEL_PATH
+        # keras.Model or NumpyMLP depending on the backend
+        self.model: Optional[Any] = None
         self.encoder = None
         self.scaler = None
+        # Whether the model expects scaler.transform()-ed inputs
+        self.input_scaled = True
+        # Fixed-shape serving functions for the keras backend
+        self.bucketed: Optional[BucketedPredictor] = None
         self._load_model()
         self._load_preprocessing_components()
+        if MLP_FOLD_SCALER and self.input_scaled:
+            self._fold_scaler()
+        if self.backend == "keras" and MLP_BATCH_BUCKETS:
+            self.bucketed = BucketedPredictor(self.model, self.input_dim, MLP_BATCH_BUCKETS)
     
     def _load_model(self) -> None:
+        """Load the MLP model for the configured backend"""
+        if self.backend == "numpy":
+            self._load_numpy_model()
+        else:
+            self._load_keras_model()
+    
+    def _load_numpy_model(self) -> None:
+        """Load the exported .npz weights for the NumPy engine"""
+        path = MLP_NPZ_FP16_PATH if self.precision == "float16" else MLP_NPZ_PATH
+        self.model_path = path
+        try:
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"MLP weights file not found: {path}")
+            
+            self.model = NumpyMLP.load(path)
+            self.input_scaled = self.model.input_scaled
+            logger.info(f"MLP weights loaded from: {path} (NumPy engine, {self.precision} weights)")
+        except Exception as e:
+            logger.error(f"Error loading MLP weights: {e}")
+            raise
+    
+    def _load_keras_model(self) -> None:
         """Load the Keras MLP model"""
         try:
             if not os.path.exists(MLP_MODEL_PATH):
@@ -80,6 +132,57 @@ class MLPModelLoader:
             logger.error(f"Error loading MLP preprocessing components: {e}")
             raise
     
+    def _fold_scaler(self) -> None:
+        """Merge the scaler into the first Dense layer so inputs skip scaling"""
+        try:
+            if self.backend == "numpy":
+                self.model = NumpyMLP(fold_scaler(self.model.layers, self.scaler), input_scaled=False)
+            else:
+                self.model = build_folded_model(self.model, self.scaler)
+            self.input_scaled = False
+            logger.info("MLP scaler folded into the first Dense layer")
+        except ValueError as e:
+            logger.warning(f"Could not fold scaler into MLP, keeping separate scaling: {e}")
+    
+    def predict_proba(self, X) -> np.ndarray:
+        """
+        Predict class probabilities
+        
+        Args:
+            X: Preprocessed features (scaled only if input_scaled is True)
+        
+        Returns:
+            Array of shape (n_samples, n_classes)
+        """
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if self.backend == "numpy":
+            return self.model.predict(X)
+        if self.bucketed is not None:
+            return self.bucketed.predict(X)
+        return np.asarray(self.model.predict(X, verbose=0))
+    
+    def warmup(self) -> None:
+        """Run the serving path once per batch bucket (or once for other backends)"""
+        if self.bucketed is not None:
+            self.bucketed.warmup()
+        else:
+            self.predict_proba(np.zeros((1, self.input_dim), dtype=np.float32))
+        logger.info("MLP warmed up")
+    
+    @property
+    def input_dim(self) -> int:
+        """Number of input features expected by the model"""
+        if self.backend == "numpy":
+            return self.model.input_dim
+        return self.model.input_shape[1] if self.model.input_shape else 0
+    
+    @property
+    def output_dim(self) -> int:
+        """Number of output classes produced by the model"""
+        if self.backend == "numpy":
+            return self.model.output_dim
+        return self.model.output_shape[1] if self.model.output_shape else 0
+    
     def is_loaded(self) -> bool:
         """Check if MLP model is loaded"""
         return self.model is not None and self.encoder is not None and self.scaler is not None
@@ -96,15 +199,17 @@ class MLPModelLoader:
             "model_info": {
                 "algorithm": "MLP (Multi-Layer Perceptron)",
                 "version": "Optimized v2",
-                "features_count": self.model.input_shape[1] if self.model.input_shape else 0,
+                "backend": self.backend,
+                "precision": self.precision,
+                "features_count": self.input_dim,
                 "classes": num_classes,
                 "layers": len(self.model.layers),
                 "dataset": "CIC-IDS-2017"
             },
             "performance_metrics": MLP_MODEL_METRICS,
             "architecture": {
-                "input_dim": self.model.input_shape[1] if self.model.input_shape else 0,
-                "output_dim": self.model.output_shape[1] if self.model.output_shape else 0,
+                "input_dim": self.input_dim,
+                "output_dim": self.output_dim,
                 "total_params": self.model.count_params()
             }
         }
@@ -119,16 +224,19 @@ class MLPModelLoader:
                 }
             
             # Test model with dummy data
-            import numpy as np
-            input_dim = self.model.input_shape[1]
-            test_data = np.zeros((1, input_dim))
-            _ = self.model.predict(test_data, verbose=0)
+            input_dim = self.input_dim
+            test_data = np.zeros((1, input_dim), dtype=np.float32)
+            _ = self.predict_proba(test_data)
             
             return {
                 "status": "healthy",
+                "backend": self.backend,
+                "precision": self.precision,
                 "model_loaded": True,
                 "encoder_loaded": self.encoder is not None,
                 "scaler_loaded": self.scaler is not None,
+                "scaler_folded": not self.input_scaled,
+                "batch_buckets": self.bucketed.buckets if self.bucketed is not None else None,
                 "input_features": input_dim
             }
         except Exception as e:
@@ -144,9 +252,17 @@ _mlp_model_loader: Optional[MLPModelLoader] = None
 
 
 def get_mlp_model_loader() -> MLPModelLoader:
-    """Get or create the global MLP model loader instance"""
+    """Get or create the global MLP model loader instance (MLP_BACKEND decides the runtime)"""
     global _mlp_model_loader
     if _mlp_model_loader is None:
-        _mlp_model_loader = MLPModelLoader()
+        if MLP_BACKEND == "onnx":
+            from model_management.onnx_loader import OnnxModelLoader
+            _mlp_model_loader = OnnxModelLoader("mlp", precision=MLP_PRECISION)
+        else:
+            _mlp_model_loader = MLPModelLoader()
     return _mlp_model_loader
 
+
+def get_loaded_mlp_model_loader() -> Optional[MLPModelLoader]:
+    """Return the global MLP model loader if it exists, without loading it"""
+    return _mlp_model_loader
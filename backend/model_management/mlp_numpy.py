@@ -0,0 +1,149 @@
+"""
+NumPy MLP inference engine - runs the exported dense layers without TensorFlow
+"""
+import numpy as np
+from typing import Dict, Any, List
+
+
+def _relu(h: np.ndarray) -> np.ndarray:
+    return np.maximum(h, 0, out=h)
+
+
+def _sigmoid(h: np.ndarray) -> np.ndarray:
+    np.negative(h, out=h)
+    np.exp(h, out=h)
+    h += 1
+    return np.reciprocal(h, out=h)
+
+
+def _tanh(h: np.ndarray) -> np.ndarray:
+    return np.tanh(h, out=h)
+
+
+def _softmax(h: np.ndarray) -> np.ndarray:
+    h -= h.max(axis=1, keepdims=True)
+    np.exp(h, out=h)
+    h /= h.sum(axis=1, keepdims=True)
+    return h
+
+
+def _elu(h: np.ndarray) -> np.ndarray:
+    negative = h < 0
+    h[negative] = np.expm1(h[negative])
+    return h
+
+
+def _selu(h: np.ndarray) -> np.ndarray:
+    alpha = 1.6732632423543772
+    scale = 1.0507009873554805
+    negative = h < 0
+    h[negative] = alpha * np.expm1(h[negative])
+    h *= scale
+    return h
+
+
+def _swish(h: np.ndarray) -> np.ndarray:
+    return h * _sigmoid(h.copy())
+
+
+def _softplus(h: np.ndarray) -> np.ndarray:
+    return np.logaddexp(h, 0, out=h)
+
+
+ACTIVATIONS = {
+    "linear": lambda h: h,
+    "relu": _relu,
+    "sigmoid": _sigmoid,
+    "tanh": _tanh,
+    "softmax": _softmax,
+    "elu": _elu,
+    "selu": _selu,
+    "swish": _swish,
+    "silu": _swish,
+    "softplus": _softplus
+}
+
+
+class NumpyMLP:
+    """Feed-forward MLP evaluated with float32 BLAS matmuls"""
+
+    def __init__(self, layers: List[Dict[str, Any]], input_scaled: bool = True):
+        """
+        Args:
+            layers: Dense layers as produced by mlp_export.extract_dense_layers
+            input_scaled: Whether the network expects scaler.transform()-ed inputs
+
+        Weights are computed in float32 whatever their stored precision.
+        """
+        unsupported = [layer["activation"] for layer in layers if layer["activation"] not in ACTIVATIONS]
+        if unsupported:
+            raise ValueError(f"Unsupported activations for NumPy engine: {unsupported}")
+
+        self.layers = layers
+        self.input_scaled = input_scaled
+        self._kernels = [np.ascontiguousarray(layer["kernel"], dtype=np.float32) for layer in layers]
+        self._biases = [np.ascontiguousarray(layer["bias"], dtype=np.float32) for layer in layers]
+        self._activations = [ACTIVATIONS[layer["activation"]] for layer in layers]
+
+    @property
+    def input_dim(self) -> int:
+        return self._kernels[0].shape[0]
+
+    @property
+    def output_dim(self) -> int:
+        return self._kernels[-1].shape[1]
+
+    def count_params(self) -> int:
+        """Total number of weights and biases"""
+        return int(sum(k.size + b.size for k, b in zip(self._kernels, self._biases)))
+
+    def predict(self, X) -> np.ndarray:
+        """
+        Run the forward pass
+
+        Args:
+            X: Array-like of shape (n_samples, input_dim)
+
+        Returns:
+            float32 array of shape (n_samples, output_dim)
+        """
+        h = np.ascontiguousarray(X, dtype=np.float32)
+        if h.ndim != 2 or h.shape[1] != self.input_dim:
+            raise ValueError(f"Expected input of shape (n, {self.input_dim}), got {h.shape}")
+
+        for kernel, bias, activation in zip(self._kernels, self._biases, self._activations):
+            h = h @ kernel
+            h += bias
+            h = activation(h)
+        return h
+
+    def save(self, path: str, dtype=np.float32) -> None:
+        """
+        Write the layers to a compact .npz archive
+
+        Args:
+            path: Destination .npz file
+            dtype: Storage precision of the weights (float32 or float16)
+        """
+        arrays = {"activations": np.array([layer["activation"] for layer in self.layers])}
+        for i, (kernel, bias) in enumerate(zip(self._kernels, self._biases)):
+            arrays[f"kernel_{i}"] = kernel.astype(dtype)
+            arrays[f"bias_{i}"] = bias.astype(dtype)
+        arrays["input_scaled"] = np.array(self.input_scaled)
+        np.savez(path, **arrays)
+
+    @classmethod
+    def load(cls, path: str) -> "NumpyMLP":
+        """Load an archive written by save()"""
+        with np.load(path, allow_pickle=False) as data:
+            activations = [str(a) for a in data["activations"]]
+            layers = [
+                {
+                    "kernel": data[f"kernel_{i}"],
+                    "bias": data[f"bias_{i}"],
+                    "activation": activation
+                }
+                for i, activation in enumerate(activations)
+            ]
+            input_scaled = bool(data["input_scaled"])
+        return cls(layers, input_scaled=input_scaled)
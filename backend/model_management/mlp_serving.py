@@ -0,0 +1,103 @@
+"""
+Fixed-shape serving functions for the Keras MLP - no retracing at request time
+"""
+import numpy as np
+from typing import Dict, List, Sequence
+
+from common.logger import logger
+
+
+class BucketedPredictor:
+    """
+    Runs a Keras model through one concrete tf.function per batch bucket
+
+    Every bucket size gets its own graph traced once with a static input
+    shape. A request is cut into chunks of the largest bucket; the tail is
+    padded with zeros up to the nearest bucket, or split further when that
+    would more than double the work. No call at serving time can trigger
+    a new trace.
+    """
+
+    def __init__(self, model, input_dim: int, buckets: Sequence[int]):
+        """
+        Args:
+            model: Keras model called with training=False
+            input_dim: Number of input features
+            buckets: Batch sizes to compile (e.g. 1, 8, 64, 512, 4096)
+        """
+        import tensorflow as tf
+
+        if not buckets or min(buckets) < 1:
+            raise ValueError(f"Invalid batch buckets: {buckets}")
+        self.buckets: List[int] = sorted(set(int(b) for b in buckets))
+        self.input_dim = input_dim
+        self.output_dim = int(model.output_shape[-1])
+        # Incremented only while tracing, so tests can check for retraces
+        self.trace_count = 0
+
+        def serve(x):
+            self.trace_count += 1
+            return model(x, training=False)
+
+        function = tf.function(serve)
+        self._functions: Dict[int, object] = {
+            bucket: function.get_concrete_function(tf.TensorSpec([bucket, input_dim], tf.float32))
+            for bucket in self.buckets
+        }
+        self._tf = tf
+        logger.info(f"MLP serving functions traced for batch buckets {self.buckets}")
+
+    def warmup(self) -> None:
+        """Run every bucket once so first requests do not pay graph setup costs"""
+        for bucket in self.buckets:
+            self._run(np.zeros((bucket, self.input_dim), dtype=np.float32))
+
+    def _run(self, batch: np.ndarray) -> np.ndarray:
+        """Evaluate one batch whose size is exactly a bucket"""
+        return self._functions[batch.shape[0]](self._tf.constant(batch)).numpy()
+
+    def _plan(self, n_rows: int) -> List[int]:
+        """Chunk sizes (each <= a bucket) covering n_rows"""
+        largest = self.buckets[-1]
+        chunks = [largest] * (n_rows // largest)
+        remaining = n_rows % largest
+        while remaining:
+            bucket = next(b for b in self.buckets if b >= remaining)
+            if bucket <= 2 * remaining or bucket == self.buckets[0]:
+                chunks.append(remaining)
+                break
+            # Padding would more than double the work: take a full smaller bucket
+            fit = max(b for b in self.buckets if b <= remaining)
+            chunks.append(fit)
+            remaining -= fit
+        return chunks
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """
+        Forward pass over any number of rows
+
+        Args:
+            X: float32 array of shape (n_samples, input_dim)
+
+        Returns:
+            float32 array of shape (n_samples, n_outputs)
+        """
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.input_dim:
+            raise ValueError(f"Expected input of shape (n, {self.input_dim}), got {X.shape}")
+
+        outputs = []
+        start = 0
+        for size in self._plan(X.shape[0]):
+            chunk = X[start:start + size]
+            bucket = next(b for b in self.buckets if b >= size)
+            if bucket != size:
+                padded = np.zeros((bucket, self.input_dim), dtype=np.float32)
+                padded[:size] = chunk
+                chunk = padded
+            outputs.append(self._run(chunk)[:size])
+            start += size
+
+        if not outputs:
+            return np.zeros((0, self.output_dim), dtype=np.float32)
+        return np.concatenate(outputs)
@@ -0,0 +1,371 @@
+"""
+ONNX export utilities - convert the XGBoost and MLP models for ONNX Runtime
+"""
+import os
+import json
+import argparse
+import numpy as np
+from typing import Dict, Any, List, Optional, Tuple
+
+from common.logger import logger
+from model_management.mlp_export import extract_dense_layers, fold_scaler, scaler_affine
+from model_management.xgb_forest import _parse_base_score
+
+
+ONNX_OPSET = 17
+ONNX_ML_OPSET = 3
+ONNX_IR_VERSION = 8
+
+INPUT_NAME = "input"
+OUTPUT_NAME = "probabilities"
+
+# Dense-layer activations mapped to single ONNX operators
+_ONNX_ACTIVATIONS = {
+    "relu": "Relu",
+    "sigmoid": "Sigmoid",
+    "tanh": "Tanh",
+    "elu": "Elu",
+    "selu": "Selu",
+    "softplus": "Softplus"
+}
+
+
+def _make_model(graph, metadata: Dict[str, Any]):
+    """Wrap a graph with opset imports and loader metadata"""
+    from onnx import helper
+
+    model = helper.make_model(
+        graph,
+        opset_imports=[
+            helper.make_opsetid("", ONNX_OPSET),
+            helper.make_opsetid("ai.onnx.ml", ONNX_ML_OPSET)
+        ],
+        producer_name="network-risk-app"
+    )
+    model.ir_version = ONNX_IR_VERSION
+    helper.set_model_props(model, {key: json.dumps(value) for key, value in metadata.items()})
+    return model
+
+
+def _scaler_steps(scaler) -> List[Tuple[str, np.ndarray]]:
+    """
+    Express a fitted scaler as the elementwise ops sklearn's transform applies
+
+    Matching sklearn's order of operations (rather than an equivalent
+    x * a + c) keeps the float32 result bit-identical, so tree thresholds
+    see exactly the same values as with scaler.transform().
+    """
+    name = type(scaler).__name__
+    steps: List[Tuple[str, np.ndarray]] = []
+    if name == "StandardScaler":
+        if scaler.mean_ is not None:
+            steps.append(("Sub", scaler.mean_))
+        if scaler.scale_ is not None:
+            steps.append(("Div", scaler.scale_))
+    elif name == "RobustScaler":
+        if scaler.center_ is not None:
+            steps.append(("Sub", scaler.center_))
+        if scaler.scale_ is not None:
+            steps.append(("Div", scaler.scale_))
+    elif name == "MaxAbsScaler":
+        steps.append(("Div", scaler.scale_))
+    else:
+        a, c = scaler_affine(scaler)
+        steps += [("Mul", a), ("Add", c)]
+    return [(op, np.asarray(value, dtype=np.float64)) for op, value in steps]
+
+
+def _scaler_prefix(
+    scaler,
+    input_name: str,
+    nodes: List,
+    initializers: List,
+    feature_names: Optional[List[str]] = None
+) -> str:
+    """
+    Append the scaler's transform (computed in float64, like sklearn) to the graph
+
+    When feature_names is given and the scaler was fitted on named columns,
+    the parameters are laid out in feature_names order; columns the scaler
+    does not know pass through unchanged.
+
+    Returns:
+        Name of the scaled float32 tensor
+    """
+    from onnx import helper, numpy_helper, TensorProto
+
+    steps = _scaler_steps(scaler)
+    scaler_names = getattr(scaler, "feature_names_in_", None)
+    if feature_names is not None and scaler_names is not None:
+        positions = {name: i for i, name in enumerate(feature_names)}
+        missing = [name for name in scaler_names if name not in positions]
+        if missing:
+            raise ValueError(f"Scaler columns missing from feature columns: {missing[:5]}")
+        index = [positions[name] for name in scaler_names]
+        identity = {"Sub": 0.0, "Add": 0.0, "Mul": 1.0, "Div": 1.0}
+        laid_out = []
+        for op, value in steps:
+            full = np.full(len(feature_names), identity[op])
+            full[index] = value
+            laid_out.append((op, full))
+        steps = laid_out
+
+    nodes.append(helper.make_node("Cast", [input_name], ["scaler_in"], to=TensorProto.DOUBLE))
+    current = "scaler_in"
+    for i, (op, value) in enumerate(steps):
+        initializers.append(numpy_helper.from_array(value, f"scaler_{i}"))
+        nodes.append(helper.make_node(op, [current, f"scaler_{i}"], [f"scaler_step_{i}"]))
+        current = f"scaler_step_{i}"
+    nodes.append(helper.make_node("Cast", [current], ["scaled"], to=TensorProto.FLOAT))
+    return "scaled"
+
+
+def mlp_to_onnx(layers: List[Dict[str, Any]], scaler=None):
+    """
+    Build an ONNX graph for a feed-forward MLP
+
+    Args:
+        layers: Dense layers as produced by extract_dense_layers
+        scaler: Optional fitted scaler, folded into the first layer
+
+    Returns:
+        onnx.ModelProto mapping 'input' (float32) to 'probabilities'
+    """
+    from onnx import helper, numpy_helper, TensorProto
+
+    if scaler is not None:
+        layers = fold_scaler(layers, scaler)
+
+    nodes, initializers = [], []
+    current = INPUT_NAME
+    for i, layer in enumerate(layers):
+        initializers += [
+            numpy_helper.from_array(layer["kernel"].astype(np.float32), f"kernel_{i}"),
+            numpy_helper.from_array(layer["bias"].astype(np.float32), f"bias_{i}")
+        ]
+        # MatMul + Add rather than Gemm: ONNX Runtime fuses the pair, and
+        # dynamic int8 quantization only rewrites MatMul nodes
+        nodes += [
+            helper.make_node("MatMul", [current, f"kernel_{i}"], [f"matmul_{i}"]),
+            helper.make_node("Add", [f"matmul_{i}", f"bias_{i}"], [f"dense_{i}"])
+        ]
+        current = f"dense_{i}"
+
+        activation = layer["activation"]
+        if activation == "linear":
+            continue
+        output = f"act_{i}"
+        if activation == "softmax":
+            nodes.append(helper.make_node("Softmax", [current], [output], axis=-1))
+        elif activation in ("swish", "silu"):
+            nodes += [
+                helper.make_node("Sigmoid", [current], [f"gate_{i}"]),
+                helper.make_node("Mul", [current, f"gate_{i}"], [output])
+            ]
+        elif activation in _ONNX_ACTIVATIONS:
+            nodes.append(helper.make_node(_ONNX_ACTIVATIONS[activation], [current], [output]))
+        else:
+            raise ValueError(f"Unsupported activation for ONNX export: {activation}")
+        current = output
+
+    nodes.append(helper.make_node("Identity", [current], [OUTPUT_NAME]))
+    n_inputs = layers[0]["kernel"].shape[0]
+    n_outputs = layers[-1]["kernel"].shape[1]
+    graph = helper.make_graph(
+        nodes,
+        "mlp",
+        [helper.make_tensor_value_info(INPUT_NAME, TensorProto.FLOAT, [None, n_inputs])],
+        [helper.make_tensor_value_info(OUTPUT_NAME, TensorProto.FLOAT, [None, n_outputs])],
+        initializers
+    )
+    return _make_model(graph, {
+        "input_scaled": scaler is None,
+        "classes": list(range(n_outputs))
+    })
+
+
+def xgboost_to_onnx(model_json: Dict[str, Any], scaler=None, feature_names: Optional[List[str]] = None):
+    """
+    Build an ONNX graph for a gbtree classifier from its JSON dump
+
+    Trees become one TreeEnsembleRegressor producing per-class margins
+    (XGBoost's x < threshold goes left, missing follows default_left),
+    followed by Softmax or Sigmoid.
+
+    Args:
+        model_json: Parsed output of booster.save_raw('json')
+        scaler: Optional fitted scaler applied as a graph prefix
+        feature_names: Optional feature names stored as metadata
+
+    Returns:
+        onnx.ModelProto mapping 'input' (float32) to 'probabilities'
+    """
+    from onnx import helper, numpy_helper, TensorProto
+
+    learner = model_json["learner"]
+    objective = learner["objective"]["name"]
+    if objective not in ("multi:softprob", "multi:softmax", "binary:logistic"):
+        raise ValueError(f"Unsupported objective for ONNX export: {objective}")
+    booster = learner["gradient_booster"]
+    if booster.get("name") != "gbtree":
+        raise ValueError(f"Unsupported booster for ONNX export: {booster.get('name')}")
+
+    params = learner["learner_model_param"]
+    num_feature = int(params["num_feature"])
+    num_groups = max(int(params.get("num_class", "0")), 1)
+    base_score = _parse_base_score(params["base_score"])
+    if objective == "binary:logistic":
+        base_score = np.log(base_score / (1.0 - base_score))
+    base_margin = np.broadcast_to(base_score, (num_groups,)).astype(np.float32)
+
+    trees = booster["model"]["trees"]
+    tree_group = booster["model"]["tree_info"]
+    attrs = {key: [] for key in (
+        "nodes_treeids", "nodes_nodeids", "nodes_featureids", "nodes_values", "nodes_modes",
+        "nodes_truenodeids", "nodes_falsenodeids", "nodes_missing_value_tracks_true",
+        "target_treeids", "target_nodeids", "target_ids", "target_weights"
+    )}
+    for tree_id, tree in enumerate(trees):
+        if any(tree.get("split_type", [])):
+            raise ValueError("Categorical splits are not supported by the ONNX exporter")
+        left = tree["left_children"]
+        for node, left_child in enumerate(left):
+            is_leaf = left_child == -1
+            attrs["nodes_treeids"].append(tree_id)
+            attrs["nodes_nodeids"].append(node)
+            attrs["nodes_featureids"].append(0 if is_leaf else int(tree["split_indices"][node]))
+            attrs["nodes_values"].append(0.0 if is_leaf else float(tree["split_conditions"][node]))
+            attrs["nodes_modes"].append("LEAF" if is_leaf else "BRANCH_LT")
+            attrs["nodes_truenodeids"].append(0 if is_leaf else int(left_child))
+            attrs["nodes_falsenodeids"].append(0 if is_leaf else int(tree["right_children"][node]))
+            attrs["nodes_missing_value_tracks_true"].append(0 if is_leaf else int(tree["default_left"][node]))
+            if is_leaf:
+                attrs["target_treeids"].append(tree_id)
+                attrs["target_nodeids"].append(node)
+                attrs["target_ids"].append(int(tree_group[tree_id]))
+                attrs["target_weights"].append(float(tree["split_conditions"][node]))
+
+    nodes, initializers = [], []
+    current = INPUT_NAME
+    if scaler is not None:
+        current = _scaler_prefix(scaler, current, nodes, initializers, feature_names)
+
+    nodes.append(helper.make_node(
+        "TreeEnsembleRegressor", [current], ["margin"],
+        domain="ai.onnx.ml",
+        n_targets=num_groups,
+        aggregate_function="SUM",
+        post_transform="NONE",
+        base_values=base_margin.tolist(),
+        **attrs
+    ))
+    if objective == "binary:logistic":
+        initializers.append(numpy_helper.from_array(np.ones(1, dtype=np.float32), "one"))
+        nodes += [
+            helper.make_node("Sigmoid", ["margin"], ["positive"]),
+            helper.make_node("Sub", ["one", "positive"], ["negative"]),
+            helper.make_node("Concat", ["negative", "positive"], [OUTPUT_NAME], axis=1)
+        ]
+        n_classes = 2
+    else:
+        nodes.append(helper.make_node("Softmax", ["margin"], [OUTPUT_NAME], axis=-1))
+        n_classes = num_groups
+
+    graph = helper.make_graph(
+        nodes,
+        "xgboost",
+        [helper.make_tensor_value_info(INPUT_NAME, TensorProto.FLOAT, [None, num_feature])],
+        [helper.make_tensor_value_info(OUTPUT_NAME, TensorProto.FLOAT, [None, n_classes])],
+        initializers
+    )
+    metadata = {"input_scaled": scaler is None, "classes": list(range(n_classes))}
+    if feature_names:
+        metadata["feature_columns"] = list(feature_names)
+    return _make_model(graph, metadata)
+
+
+def quantize_int8(source_path: str, output_path: str, per_channel: bool = True) -> None:
+    """
+    Dynamically quantize the MatMul weights of an exported graph to int8
+
+    Weights get symmetric int8 scales (one per output channel by default);
+    activations are quantized to uint8 on the fly per batch, so no
+    calibration data is needed.
+
+    Args:
+        source_path: float32 ONNX graph (from mlp_to_onnx, without a scaler)
+        output_path: Destination of the quantized graph
+        per_channel: Per output channel weight scales instead of per tensor
+
+    Raises:
+        ValueError: If the graph has the scaler folded into its first layer
+    """
+    import onnx
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    props = {prop.key: prop.value for prop in onnx.load(source_path, load_external_data=False).metadata_props}
+    if props.get("input_scaled") == "false":
+        # The folded first layer carries the scaler's per-feature scale, far
+        # too wide a range for one int8 scale per channel
+        raise ValueError("Quantize the MLP graph exported without the scaler folded in")
+
+    quantize_dynamic(
+        source_path,
+        output_path,
+        per_channel=per_channel,
+        weight_type=QuantType.QInt8,
+        op_types_to_quantize=["MatMul"]
+    )
+
+
+def main() -> None:
+    """Export the production models to ONNX"""
+    import joblib
+    import onnx
+    import xgboost as xgb
+    from common.config import (
+        MODEL_PATH, SCALER_PATH, FEATURE_COLUMNS_PATH, XGB_ONNX_PATH,
+        MLP_MODEL_PATH, MLP_SCALER_PATH, MLP_ONNX_PATH, MLP_ONNX_INT8_PATH
+    )
+
+    parser = argparse.ArgumentParser(description="Export the models to ONNX")
+    parser.add_argument("--model", choices=["xgboost", "mlp", "all"], default="all", help="Model(s) to export")
+    parser.add_argument("--include-scaler", action="store_true", help="Put the fitted scaler in the graph")
+    parser.add_argument("--xgb-output", default=XGB_ONNX_PATH, help="Destination of the XGBoost graph")
+    parser.add_argument("--mlp-output", default=MLP_ONNX_PATH, help="Destination of the MLP graph")
+    parser.add_argument("--int8", action="store_true", help="Also write a dynamically quantized int8 MLP")
+    parser.add_argument("--int8-output", default=MLP_ONNX_INT8_PATH, help="Destination of the int8 MLP graph")
+    parser.add_argument("--per-tensor", action="store_true", help="One int8 scale per weight matrix")
+    args = parser.parse_args()
+    if args.int8 and args.include_scaler and args.model != "xgboost":
+        # See quantize_int8: the folded MLP loses too much accuracy in int8
+        parser.error("--int8 quantizes the MLP without the scaler, drop --include-scaler or export it separately")
+
+    if args.model in ("xgboost", "all"):
+        booster = xgb.Booster()
+        booster.load_model(MODEL_PATH)
+        with open(FEATURE_COLUMNS_PATH, "r", encoding="utf-8") as f:
+            feature_columns = json.load(f)
+        scaler = joblib.load(SCALER_PATH) if args.include_scaler else None
+        model = xgboost_to_onnx(json.loads(booster.save_raw("json")), scaler, feature_columns)
+        os.makedirs(os.path.dirname(args.xgb_output), exist_ok=True)
+        onnx.save(model, args.xgb_output)
+        logger.info(f"XGBoost exported to: {args.xgb_output}")
+
+    if args.model in ("mlp", "all"):
+        import tensorflow as tf
+
+        keras_model = tf.keras.models.load_model(MLP_MODEL_PATH, compile=False)
+        scaler = joblib.load(MLP_SCALER_PATH) if args.include_scaler else None
+        model = mlp_to_onnx(extract_dense_layers(keras_model), scaler)
+        os.makedirs(os.path.dirname(args.mlp_output), exist_ok=True)
+        onnx.save(model, args.mlp_output)
+        logger.info(f"MLP exported to: {args.mlp_output}")
+
+        if args.int8:
+            quantize_int8(args.mlp_output, args.int8_output, per_channel=not args.per_tensor)
+            logger.info(f"int8 MLP exported to: {args.int8_output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+"""
+ONNX Runtime model loader - serves exported XGBoost or MLP graphs
+"""
+import os
+import json
+import joblib
+import numpy as np
+import scipy.sparse as sp
+from typing import Optional, Dict, Any, List, Tuple
+
+from common.config import (
+    ENCODER_PATH,
+    SCALER_PATH,
+    FEATURE_COLUMNS_PATH,
+    XGB_ONNX_PATH,
+    MLP_ENCODER_PATH,
+    MLP_SCALER_PATH,
+    MLP_ONNX_PATH,
+    MLP_ONNX_INT8_PATH,
+    ONNX_INTRA_OP_THREADS,
+    ONNX_GRAPH_OPTIMIZATION
+)
+from common.logger import logger
+from common.constants import MODEL_METRICS, MODEL_PARAMETERS
+
+
+# Artifacts per model family: (graph, encoder, scaler, feature columns)
+_ARTIFACTS = {
+    "xgboost": (XGB_ONNX_PATH, ENCODER_PATH, SCALER_PATH, FEATURE_COLUMNS_PATH),
+    "mlp": (MLP_ONNX_PATH, MLP_ENCODER_PATH, MLP_SCALER_PATH, None)
+}
+
+# Reduced-precision graphs per model family
+_PRECISION_PATHS = {
+    ("mlp", "int8"): MLP_ONNX_INT8_PATH
+}
+
+_GRAPH_OPTIMIZATION_LEVELS = {
+    "disabled": "ORT_DISABLE_ALL",
+    "basic": "ORT_ENABLE_BASIC",
+    "extended": "ORT_ENABLE_EXTENDED",
+    "all": "ORT_ENABLE_ALL"
+}
+
+
+class OnnxModelLoader:
+    """
+    Service for serving an ONNX export of either model family
+
+    Exposes the same inference interface as ModelLoader and MLPModelLoader
+    (encoder, scaler, input_scaled, classes_, predict_proba, health_check,
+    get_model_info), so callers do not depend on the runtime in use.
+    """
+
+    def __init__(
+        self,
+        kind: str = "xgboost",
+        model_path: Optional[str] = None,
+        intra_op_threads: int = ONNX_INTRA_OP_THREADS,
+        graph_optimization: str = ONNX_GRAPH_OPTIMIZATION,
+        precision: str = "float32"
+    ):
+        if kind not in _ARTIFACTS:
+            raise ValueError(f"Unknown model kind for ONNX backend: {kind}")
+        if precision != "float32" and (kind, precision) not in _PRECISION_PATHS:
+            raise ValueError(f"Precision {precision} is not available for the ONNX {kind} backend")
+        if graph_optimization not in _GRAPH_OPTIMIZATION_LEVELS:
+            raise ValueError(f"Unknown ONNX graph optimization level: {graph_optimization}")
+        self.kind = kind
+        self.backend = "onnx"
+        self.precision = precision
+        self.model_path = model_path or _PRECISION_PATHS.get((kind, precision), _ARTIFACTS[kind][0])
+        self.intra_op_threads = intra_op_threads
+        self.graph_optimization = graph_optimization
+        self.session = None
+        self.metadata: Dict[str, Any] = {}
+        self.encoder = None
+        self.scaler = None
+        self.feature_columns: List[str] = []
+        self.input_scaled = True
+        # ModelLoader features that need the xgboost booster
+        self.gate = None
+        self.fast_mode_config: Dict[str, Any] = {}
+        self.load_model()
+
+    def load_model(self) -> None:
+        """Load (or reload after a failure) the graph and preprocessing components"""
+        self._load_model()
+        self._load_preprocessing_components()
+
+    def _session_options(self):
+        """Build ONNX Runtime session options from config"""
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = getattr(
+            ort.GraphOptimizationLevel,
+            _GRAPH_OPTIMIZATION_LEVELS[self.graph_optimization]
+        )
+        if self.intra_op_threads > 0:
+            options.intra_op_num_threads = self.intra_op_threads
+        options.inter_op_num_threads = 1
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        return options
+
+    def _load_model(self) -> None:
+        """Create the inference session and read the export metadata"""
+        try:
+            if not os.path.exists(self.model_path):
+                raise FileNotFoundError(f"ONNX model file not found: {self.model_path}")
+
+            import onnxruntime as ort
+
+            self.session = ort.InferenceSession(
+                self.model_path,
+                sess_options=self._session_options(),
+                providers=["CPUExecutionProvider"]
+            )
+            props = self.session.get_modelmeta().custom_metadata_map
+            self.metadata = {key: self._parse_metadata(value) for key, value in props.items()}
+            self.input_scaled = bool(self.metadata.get("input_scaled", True))
+            if self.precision == "int8" and not self.input_scaled:
+                raise ValueError(
+                    f"int8 graph {self.model_path} has the scaler folded in, which int8 cannot represent; "
+                    "re-export it without --include-scaler"
+                )
+            self._input_name = self.session.get_inputs()[0].name
+            self._output_name = self.session.get_outputs()[0].name
+            logger.info(
+                f"ONNX {self.kind} model loaded from: {self.model_path} "
+                f"(threads={self.intra_op_threads or 'default'}, optimization={self.graph_optimization})"
+            )
+        except Exception as e:
+            logger.error(f"Error loading ONNX model: {e}")
+            raise
+
+    @staticmethod
+    def _parse_metadata(value: str) -> Any:
+        """Decode exporter metadata (JSON); tools such as the quantizer add plain strings"""
+        try:
+            return json.loads(value)
+        except ValueError:
+            return value
+
+    def _load_preprocessing_components(self) -> None:
+        """Load encoder, scaler, and feature columns for the model family"""
+        _, encoder_path, scaler_path, feature_columns_path = _ARTIFACTS[self.kind]
+        try:
+            if not os.path.exists(encoder_path):
+                raise FileNotFoundError(f"Encoder file not found: {encoder_path}")
+            if not os.path.exists(scaler_path):
+                raise FileNotFoundError(f"Scaler file not found: {scaler_path}")
+
+            self.encoder = joblib.load(encoder_path)
+            self.scaler = joblib.load(scaler_path)
+
+            if feature_columns_path is not None:
+                if not os.path.exists(feature_columns_path):
+                    raise FileNotFoundError(f"Feature columns file not found: {feature_columns_path}")
+                with open(feature_columns_path, "r", encoding="utf-8") as f:
+                    self.feature_columns = json.load(f)
+                exported = self.metadata.get("feature_columns")
+                if exported and list(exported) != list(self.feature_columns):
+                    raise ValueError("ONNX model feature columns do not match feature_columns")
+
+            logger.info(f"ONNX {self.kind} encoder and scaler loaded successfully")
+        except Exception as e:
+            logger.error(f"Error loading ONNX preprocessing components: {e}")
+            raise
+
+    @property
+    def classes_(self) -> np.ndarray:
+        """Class indices in the column order of predict_proba"""
+        return np.asarray(self.metadata.get("classes", range(self.output_dim)))
+
+    @property
+    def input_dim(self) -> int:
+        """Number of input features expected by the model"""
+        return int(self.session.get_inputs()[0].shape[1])
+
+    @property
+    def output_dim(self) -> int:
+        """Number of output classes produced by the model"""
+        return int(self.session.get_outputs()[0].shape[1])
+
+    def predict_proba(
+        self,
+        X,
+        iteration_range: Optional[Tuple[int, int]] = None
+    ) -> np.ndarray:
+        """
+        Predict class probabilities
+
+        Args:
+            X: Preprocessed features (scaled only if input_scaled is True),
+                dense or CSR
+            iteration_range: Not supported, the exported graph is the full ensemble
+
+        Returns:
+            float32 array of shape (n_samples, n_classes)
+        """
+        if iteration_range is not None:
+            raise ValueError("iteration_range is not supported by the ONNX backend")
+        if sp.issparse(X):
+            # ONNX Runtime takes dense tensors only
+            X = X.toarray()
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        return self.session.run([self._output_name], {self._input_name: X})[0]
+
+    def predict_proba_tiered(self, X, iterations=None, margin_threshold=None):
+        """Fast mode needs boosting-round prefixes, which the ONNX graph does not expose"""
+        raise ValueError("Fast mode requires the native or sklearn XGBoost backend")
+
+    def warmup(self) -> None:
+        """Run the session once so allocations happen before the first request"""
+        self.predict_proba(np.zeros((1, self.input_dim), dtype=np.float32))
+        logger.info(f"ONNX {self.kind} model warmed up")
+
+    def is_loaded(self) -> bool:
+        """Check if model is loaded"""
+        return self.session is not None and self.encoder is not None and self.scaler is not None
+
+    def get_model_info(self) -> Dict[str, Any]:
+        """Get model information"""
+        if self.session is None:
+            raise ValueError("ONNX model not loaded")
+
+        info = {
+            "model_info": {
+                "algorithm": "XGBoost" if self.kind == "xgboost" else "MLP (Multi-Layer Perceptron)",
+                "backend": self.backend,
+                "precision": self.precision,
+                "model_path": self.model_path,
+                "features_count": self.input_dim,
+                "classes": [str(cls) for cls in self.classes_],
+                "scaler_in_graph": not self.input_scaled,
+                "dataset": "CIC-IDS-2017"
+            },
+            "session": {
+                "intra_op_threads": self.intra_op_threads or "default",
+                "graph_optimization": self.graph_optimization
+            }
+        }
+        if self.kind == "xgboost":
+            info["performance_metrics"] = MODEL_METRICS
+            info["model_parameters"] = MODEL_PARAMETERS
+            info["feature_columns_preview"] = self.feature_columns[:10]
+        return info
+
+    def health_check(self) -> Dict[str, Any]:
+        """Perform health check on the ONNX model"""
+        try:
+            if not self.is_loaded():
+                return {
+                    "status": "unhealthy",
+                    "error": "ONNX model components not fully loaded"
+                }
+
+            # Test model with dummy data
+            test_data = np.zeros((1, self.input_dim), dtype=np.float32)
+            _ = self.predict_proba(test_data)
+
+            return {
+                "status": "healthy",
+                "backend": self.backend,
+                "precision": self.precision,
+                "model_loaded": True,
+                "encoder_loaded": self.encoder is not None,
+                "scaler_loaded": self.scaler is not None,
+                "scaler_in_graph": not self.input_scaled,
+                "features_count": self.input_dim
+            }
+        except Exception as e:
+            logger.error(f"ONNX health check failed: {e}")
+            return {
+                "status": "unhealthy",
+                "error": str(e)
+            }
@@ -4,29 +4,105 @@ Model management services - handles model loading and information
 import os
 import json
 import joblib
+import threading
+import numpy as np
+import scipy.sparse as sp
 import xgboost as xgb
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 
 from common.config import (
     MODEL_PATH, 
     ENCODER_PATH, 
     SCALER_PATH, 
-    FEATURE_COLUMNS_PATH
+    FEATURE_COLUMNS_PATH,
+    XGB_BACKEND,
+    XGB_NTHREAD,
+    XGB_FOREST_MAX_ROWS,
+    XGB_FAST_MODE_ITERATIONS,
+    XGB_FAST_MODE_MARGIN,
+    FAST_MODE_CONFIG_PATH,
+    GATE_MODEL_PATH,
+    GATE_META_PATH,
+    GATE_THRESHOLD
 )
 from common.logger import logger
 from common.constants import MODEL_METRICS, MODEL_PARAMETERS
+from model_management.xgb_forest import ForestEvaluator
+
+
+def _missing_as_zero(booster: xgb.Booster) -> xgb.Booster:
+    """
+    Copy a booster so that missing values take the branch a 0 would take
+    
+    XGBoost reads entries absent from a CSR matrix as missing, while the
+    dense path feeds explicit zeros. Pointing every split's default
+    direction at the side of its threshold that 0 falls on (x < t goes
+    left) makes both inputs score identically. Serving data never carries
+    real NaNs (preprocessing replaces them with 0), so nothing is lost.
+    
+    Args:
+        booster: Trained gbtree booster with numerical splits
+    
+    Returns:
+        New booster for scoring sparse matrices
+    """
+    model = json.loads(booster.save_raw("json"))
+    for tree in model["learner"]["gradient_booster"]["model"]["trees"]:
+        if any(tree.get("split_type", [])):
+            raise ValueError("Categorical splits cannot be scored from sparse input")
+        tree["default_left"] = [
+            int(left == -1 or threshold > 0)
+            for left, threshold in zip(tree["left_children"], tree["split_conditions"])
+        ]
+    
+    copy = xgb.Booster()
+    copy.load_model(bytearray(json.dumps(model).encode("utf-8")))
+    if XGB_NTHREAD > 0:
+        copy.set_param({"nthread": XGB_NTHREAD})
+    return copy
 
 
 class ModelLoader:
     """Service for loading and managing ML models"""
     
-    def __init__(self):
+    def __init__(self, backend: str = XGB_BACKEND):
+        if backend not in ("native", "sklearn"):
+            raise ValueError(f"Unknown XGBoost backend: {backend}")
+        self.backend = backend
+        self.model_path = MODEL_PATH
         self.model: Optional[xgb.XGBClassifier] = None
+        # Booster cached once for the native backend
+        self.booster: Optional[xgb.Booster] = None
         self.encoder = None
         self.scaler = None
         self.feature_columns: List[str] = []
+        # The booster always consumes scaler.transform()-ed features
+        self.input_scaled = True
+        # Booster copies for CSR input, built on first sparse request
+        self.sparse_booster: Optional[xgb.Booster] = None
+        self.gate_sparse: Optional[xgb.Booster] = None
+        # Array-backed evaluator for small batches (None when disabled)
+        self.forest: Optional[ForestEvaluator] = None
+        self.fast_mode_config: Dict[str, Any] = {}
+        # Cumulative tiered-inference and gate counters, updated from request
+        # threads under _stats_lock
+        self._stats_lock = threading.Lock()
+        self.fast_mode_stats = {"rows": 0, "escalated": 0}
+        # Optional binary benign/malicious gate (None when not trained)
+        self.gate: Optional[xgb.Booster] = None
+        self.gate_forest: Optional[ForestEvaluator] = None
+        self.gate_config: Dict[str, Any] = {}
+        self.gate_stats = {"rows": 0, "passed": 0}
+        self.load_model()
+    
+    def load_model(self) -> None:
+        """Load (or reload after a failure) the model and its companions"""
         self._load_model()
         self._load_preprocessing_components()
+        if XGB_FOREST_MAX_ROWS > 0:
+            self._load_forest_evaluator()
+        self._load_fast_mode_config()
+        self._load_gate()
     
     def _load_model(self) -> None:
         """Load the XGBoost model"""
@@ -37,10 +113,31 @@ class ModelLoader:
             self.model = xgb.XGBClassifier()
             self.model.load_model(MODEL_PATH)
             logger.info(f"XGBoost model loaded from: {MODEL_PATH}")
+            
+            if self.backend == "native":
+                self._configure_booster()
         except Exception as e:
             logger.error(f"Error loading model: {e}")
             raise
     
+    def _configure_booster(self) -> None:
+        """Cache the booster and pin its thread count for inplace prediction"""
+        booster = self.model.get_booster()
+        config = json.loads(booster.save_config())
+        objective = config["learner"]["objective"]["name"]
+        if objective not in ("multi:softprob", "binary:logistic"):
+            logger.warning(
+                f"Objective {objective} does not return probabilities from "
+                f"inplace_predict, falling back to the sklearn backend"
+            )
+            self.backend = "sklearn"
+            return
+        
+        if XGB_NTHREAD > 0:
+            booster.set_param({"nthread": XGB_NTHREAD})
+        self.booster = booster
+        logger.info(f"Native XGBoost backend ready (nthread={XGB_NTHREAD or 'default'})")
+    
     def _load_preprocessing_components(self) -> None:
         """Load encoder, scaler, and feature columns"""
         try:
@@ -62,6 +159,221 @@ class ModelLoader:
             logger.error(f"Error loading preprocessing components: {e}")
             raise
     
+    def _load_forest_evaluator(self) -> None:
+        """Flatten the booster into arrays for small-batch scoring"""
+        try:
+            booster = self.model.get_booster()
+            if booster.feature_names and list(booster.feature_names) != list(self.feature_columns):
+                raise ValueError("booster feature names do not match feature_columns")
+            self.forest = ForestEvaluator.from_booster(booster)
+            logger.info(
+                f"Forest evaluator ready: {len(self.forest.roots)} trees, "
+                f"depth {self.forest.max_depth}, used for <= {XGB_FOREST_MAX_ROWS} rows"
+            )
+        except ValueError as e:
+            logger.warning(f"Forest evaluator disabled: {e}")
+            self.forest = None
+    
+    def _load_fast_mode_config(self) -> None:
+        """Load tuned fast-mode thresholds, falling back to config defaults"""
+        self.fast_mode_config = {
+            "iterations": XGB_FAST_MODE_ITERATIONS,
+            "margin_threshold": XGB_FAST_MODE_MARGIN,
+            "source": "defaults"
+        }
+        if not os.path.exists(FAST_MODE_CONFIG_PATH):
+            return
+        try:
+            with open(FAST_MODE_CONFIG_PATH, "r", encoding="utf-8") as f:
+                tuned = json.load(f)
+            self.fast_mode_config.update({
+                "iterations": int(tuned["iterations"]),
+                "margin_threshold": float(tuned["margin_threshold"]),
+                "source": FAST_MODE_CONFIG_PATH
+            })
+            logger.info(f"Fast mode thresholds loaded: {self.fast_mode_config}")
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Ignoring invalid fast mode config {FAST_MODE_CONFIG_PATH}: {e}")
+    
+    def _load_gate(self) -> None:
+        """Load the binary gate model and its tuned threshold if present"""
+        if not os.path.exists(GATE_MODEL_PATH):
+            return
+        try:
+            gate = xgb.Booster()
+            gate.load_model(GATE_MODEL_PATH)
+            if gate.feature_names and list(gate.feature_names) != list(self.feature_columns):
+                raise ValueError("gate feature names do not match feature_columns")
+            if XGB_NTHREAD > 0:
+                gate.set_param({"nthread": XGB_NTHREAD})
+            
+            self.gate_config = {"threshold": GATE_THRESHOLD, "benign_label": "BENIGN"}
+            if os.path.exists(GATE_META_PATH):
+                with open(GATE_META_PATH, "r", encoding="utf-8") as f:
+                    meta = json.load(f)
+                self.gate_config.update({
+                    "threshold": float(meta["threshold"]),
+                    "benign_label": meta.get("benign_label", "BENIGN")
+                })
+            benign = self.encoder.transform([self.gate_config["benign_label"]])[0]
+            self.gate_config["benign_column"] = int(np.flatnonzero(self.classes_ == benign)[0])
+            
+            self.gate = gate
+            if XGB_FOREST_MAX_ROWS > 0:
+                self.gate_forest = ForestEvaluator.from_booster(gate)
+            logger.info(f"Binary gate loaded from: {GATE_MODEL_PATH} ({self.gate_config})")
+        except (ValueError, KeyError, IndexError, xgb.core.XGBoostError) as e:
+            logger.warning(f"Binary gate disabled: {e}")
+            self.gate = None
+            self.gate_forest = None
+    
+    @property
+    def classes_(self) -> np.ndarray:
+        """Class indices in the column order of predict_proba"""
+        return self.model.classes_
+    
+    def predict_proba(
+        self, 
+        X, 
+        iteration_range: Optional[Tuple[int, int]] = None
+    ) -> np.ndarray:
+        """
+        Predict class probabilities, choosing the engine by batch size
+        
+        Args:
+            X: Preprocessed features ordered as feature_columns, dense or
+                a CSR matrix from preprocess_sparse
+            iteration_range: Optional (begin, end) boosting rounds to use
+        
+        Returns:
+            Array of shape (n_samples, n_classes)
+        """
+        if self.forest is not None and X.shape[0] <= XGB_FOREST_MAX_ROWS:
+            if sp.issparse(X):
+                X = X.toarray()
+            return self.forest.predict_proba(X, iteration_range)
+        if sp.issparse(X):
+            if self.sparse_booster is None:
+                self.sparse_booster = _missing_as_zero(self.model.get_booster())
+            return self._predict_native(X, iteration_range, self.sparse_booster)
+        if self.booster is not None:
+            return self._predict_native(X, iteration_range)
+        if iteration_range is not None:
+            return self.model.predict_proba(X, iteration_range=iteration_range)
+        return self.model.predict_proba(X)
+    
+    def predict_proba_tiered(
+        self,
+        X,
+        iterations: Optional[int] = None,
+        margin_threshold: Optional[float] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Score with a prefix of the ensemble and escalate uncertain rows
+        
+        Rows whose gap between the two most likely classes is below
+        margin_threshold after `iterations` boosting rounds are re-scored
+        as a compacted sub-batch with the full model.
+        
+        Args:
+            X: Preprocessed features ordered as feature_columns
+            iterations: Boosting rounds of the fast pass (default: tuned value)
+            margin_threshold: Top-2 probability gap below which rows escalate
+        
+        Returns:
+            Tuple of (probabilities, boolean mask of escalated rows)
+        """
+        iterations = iterations or self.fast_mode_config["iterations"]
+        if margin_threshold is None:
+            margin_threshold = self.fast_mode_config["margin_threshold"]
+        
+        proba = np.array(self.predict_proba(X, iteration_range=(0, iterations)), dtype=np.float32)
+        top2 = np.partition(proba, -2, axis=1)[:, -2:]
+        escalated = (top2[:, 1] - top2[:, 0]) < margin_threshold
+        
+        if escalated.any():
+            proba[escalated] = self.predict_proba(X[escalated])
+        
+        n_escalated = int(escalated.sum())
+        with self._stats_lock:
+            self.fast_mode_stats["rows"] += len(proba)
+            self.fast_mode_stats["escalated"] += n_escalated
+        return proba, escalated
+    
+    def predict_gate(self, X) -> np.ndarray:
+        """
+        Probability that each row is malicious according to the binary gate
+        
+        Args:
+            X: Preprocessed features ordered as feature_columns
+        
+        Returns:
+            float32 array of shape (n_samples,)
+        """
+        if self.gate is None:
+            raise ValueError("Binary gate not loaded")
+        if self.gate_forest is not None and X.shape[0] <= XGB_FOREST_MAX_ROWS:
+            return self.gate_forest.predict_proba(X.toarray() if sp.issparse(X) else X)[:, 1]
+        if sp.issparse(X):
+            if self.gate_sparse is None:
+                self.gate_sparse = _missing_as_zero(self.gate)
+            return self.gate_sparse.inplace_predict(X, validate_features=False).astype(np.float32)
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        return self.gate.inplace_predict(X, validate_features=False).astype(np.float32)
+    
+    def gate_filter(self, X) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Split rows into gated-out benign rows and suspicious rows
+        
+        Rows below the gate threshold get a probability row with 1 - p on
+        BENIGN and p spread over the other classes; suspicious rows are left
+        for the multi-class model to fill in.
+        
+        Args:
+            X: Preprocessed features ordered as feature_columns
+        
+        Returns:
+            Tuple of (probabilities for gated-out rows, boolean mask of suspicious rows)
+        """
+        p_malicious = self.predict_gate(X)
+        suspicious = p_malicious >= self.gate_config["threshold"]
+        
+        n_classes = len(self.classes_)
+        proba = np.repeat((p_malicious / max(n_classes - 1, 1))[:, None], n_classes, axis=1)
+        proba[:, self.gate_config["benign_column"]] = 1.0 - p_malicious
+        
+        n_passed = int(suspicious.sum())
+        with self._stats_lock:
+            self.gate_stats["rows"] += len(proba)
+            self.gate_stats["passed"] += n_passed
+        return proba, suspicious
+    
+    def _predict_native(
+        self, 
+        X, 
+        iteration_range: Optional[Tuple[int, int]] = None,
+        booster: Optional[xgb.Booster] = None
+    ) -> np.ndarray:
+        """Predict with Booster.inplace_predict, skipping DMatrix and wrapper checks"""
+        if not sp.issparse(X):
+            X = np.ascontiguousarray(X, dtype=np.float32)
+        proba = (booster or self.booster).inplace_predict(
+            X,
+            iteration_range=iteration_range or (0, 0),
+            predict_type="value",
+            validate_features=False
+        )
+        if proba.ndim == 1:
+            # binary:logistic returns P(1) only
+            proba = np.column_stack([1.0 - proba, proba])
+        return proba
+    
+    def warmup(self) -> None:
+        """Score a small and a large dummy batch so both engines are initialized"""
+        for n_rows in (1, max(XGB_FOREST_MAX_ROWS + 1, 64)):
+            self.predict_proba(np.zeros((n_rows, len(self.feature_columns)), dtype=np.float32))
+        logger.info("XGBoost model warmed up")
+    
     def is_loaded(self) -> bool:
         """Check if model is loaded"""
         return self.model is not None and self.encoder is not None and self.scaler is not None
@@ -70,17 +382,32 @@ class ModelLoader:
         """Get model information"""
         if not self.model:
             raise ValueError("Model not loaded")
+        with self._stats_lock:
+            fast_mode_stats = dict(self.fast_mode_stats)
+            gate_stats = dict(self.gate_stats)
         
         return {
             "model_info": {
                 "algorithm": "XGBoost",
                 "version": "Latest",
+                "backend": self.backend,
                 "features_count": len(self.feature_columns),
                 "classes": [str(cls) for cls in self.model.classes_] if hasattr(self.model, 'classes_') else [],
                 "dataset": "CIC-IDS-2017"
             },
             "performance_metrics": MODEL_METRICS,
             "model_parameters": MODEL_PARAMETERS,
+            "fast_mode": {
+                **self.fast_mode_config,
+                "rows_scored": fast_mode_stats["rows"],
+                "rows_escalated": fast_mode_stats["escalated"]
+            },
+            "gate": {
+                "loaded": self.gate is not None,
+                "threshold": self.gate_config.get("threshold"),
+                "rows_scored": gate_stats["rows"],
+                "rows_passed": gate_stats["passed"]
+            },
             "feature_columns_preview": self.feature_columns[:10]  # First 10 features
         }
     
@@ -94,19 +421,17 @@ class ModelLoader:
                 }
             
             # Test model with dummy data
-            import pandas as pd
-            import numpy as np
-            test_data = pd.DataFrame(
-                np.zeros((1, len(self.feature_columns))), 
-                columns=self.feature_columns
-            )
-            _ = self.model.predict_proba(test_data)
+            test_data = np.zeros((1, len(self.feature_columns)), dtype=np.float32)
+            _ = self.predict_proba(test_data)
             
             return {
                 "status": "healthy",
+                "backend": self.backend,
                 "model_loaded": True,
                 "encoder_loaded": self.encoder is not None,
                 "scaler_loaded": self.scaler is not None,
+                "forest_evaluator": self.forest is not None,
+                "gate_loaded": self.gate is not None,
                 "features_count": len(self.feature_columns)
             }
         except Exception as e:
@@ -122,9 +447,17 @@ _model_loader: Optional[ModelLoader] = None
 
 
 def get_model_loader() -> ModelLoader:
-    """Get or create the global model loader instance"""
+    """Get or create the global model loader instance (XGB_BACKEND decides the runtime)"""
     global _model_loader
     if _model_loader is None:
-        _model_loader = ModelLoader()
+        if XGB_BACKEND == "onnx":
+            from model_management.onnx_loader import OnnxModelLoader
+            _model_loader = OnnxModelLoader("xgboost")
+        else:
+            _model_loader = ModelLoader()
     return _model_loader
 
+
+def get_loaded_model_loader() -> Optional[ModelLoader]:
+    """Return the global model loader if it exists, without loading it"""
+    return _model_loader
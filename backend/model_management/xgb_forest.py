@@ -0,0 +1,193 @@
+"""
+Array-backed XGBoost forest evaluator - scores small batches without the xgboost wrapper
+"""
+import json
+import numpy as np
+from typing import Dict, Any, Optional, Tuple
+
+
+def _parse_base_score(raw: str) -> np.ndarray:
+    """Parse base_score, stored either as '5E-1' or as '[a,b,c]'"""
+    return np.array([float(v) for v in raw.strip("[]").split(",")], dtype=np.float64)
+
+
+class ForestEvaluator:
+    """
+    Vectorized evaluator for a gbtree model loaded from its JSON dump
+
+    All trees are flattened into parallel arrays (feature index, threshold,
+    left, right, leaf value, default direction). Rows x trees are walked
+    level by level with NumPy gathers, so a batch costs max_depth vectorized
+    steps instead of per-row Python or per-call DMatrix construction.
+    """
+
+    def __init__(self, model_json: Dict[str, Any]):
+        learner = model_json["learner"]
+        objective = learner["objective"]["name"]
+        if objective not in ("multi:softprob", "multi:softmax", "binary:logistic"):
+            raise ValueError(f"Unsupported objective for forest evaluator: {objective}")
+
+        booster = learner["gradient_booster"]
+        if booster.get("name") != "gbtree":
+            raise ValueError(f"Unsupported booster for forest evaluator: {booster.get('name')}")
+
+        model = booster["model"]
+        trees = model["trees"]
+        params = learner["learner_model_param"]
+
+        self.objective = objective
+        self.num_feature = int(params["num_feature"])
+        self.num_groups = max(int(params.get("num_class", "0")), 1)
+        self.tree_group = np.asarray(model["tree_info"], dtype=np.int64)
+
+        if "iteration_indptr" in model:
+            self.iteration_indptr = np.asarray(model["iteration_indptr"], dtype=np.int64)
+        else:
+            per_iteration = self.num_groups * int(model["gbtree_model_param"].get("num_parallel_tree", "1"))
+            self.iteration_indptr = np.arange(0, len(trees) + 1, per_iteration, dtype=np.int64)
+
+        base_score = _parse_base_score(params["base_score"])
+        if objective == "binary:logistic":
+            # base_score is stored as a probability, convert to margin
+            base_score = np.log(base_score / (1.0 - base_score))
+        self.base_margin = np.broadcast_to(base_score, (self.num_groups,)).astype(np.float64)
+
+        self._flatten(trees)
+
+    def _flatten(self, trees) -> None:
+        """Concatenate all trees into flat node arrays with global indices"""
+        features, thresholds, lefts, rights, defaults, leaves, roots = [], [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+
+        for tree in trees:
+            if any(tree.get("split_type", [])):
+                raise ValueError("Categorical splits are not supported by the forest evaluator")
+            if int(tree["tree_param"].get("size_leaf_vector", "1")) > 1:
+                raise ValueError("Multi-target trees are not supported by the forest evaluator")
+
+            left = np.asarray(tree["left_children"], dtype=np.int64)
+            right = np.asarray(tree["right_children"], dtype=np.int64)
+            n_nodes = len(left)
+            is_leaf = left == -1
+            local = np.arange(n_nodes)
+
+            # Leaves loop onto themselves so extra traversal steps are no-ops
+            lefts.append(np.where(is_leaf, local, left) + offset)
+            rights.append(np.where(is_leaf, local, right) + offset)
+            features.append(np.where(is_leaf, 0, tree["split_indices"]))
+            thresholds.append(np.asarray(tree["split_conditions"], dtype=np.float32))
+            leaves.append(np.where(is_leaf, tree["split_conditions"], 0.0))
+            defaults.append(np.asarray(tree["default_left"], dtype=bool))
+            roots.append(offset)
+
+            max_depth = max(max_depth, self._depth(left, right))
+            offset += n_nodes
+
+        self.feature = np.concatenate(features).astype(np.intp)
+        self.threshold = np.concatenate(thresholds)
+        self.left = np.concatenate(lefts).astype(np.intp)
+        self.right = np.concatenate(rights).astype(np.intp)
+        self.default_left = np.concatenate(defaults)
+        self.leaf_value = np.concatenate(leaves).astype(np.float32)
+        self.roots = np.asarray(roots, dtype=np.intp)
+        self.max_depth = max_depth
+
+        # Interleaved children: children[2 * node + go_right]
+        self._children = np.column_stack([self.left, self.right]).ravel()
+        # One-hot tree -> output group matrix, so leaf sums are a single matmul
+        self._group_onehot = np.zeros((len(self.roots), self.num_groups), dtype=np.float32)
+        self._group_onehot[np.arange(len(self.roots)), self.tree_group] = 1.0
+
+    @staticmethod
+    def _depth(left: np.ndarray, right: np.ndarray) -> int:
+        """Depth of a single tree given its child arrays"""
+        depth = 0
+        level = [0]
+        while level:
+            nxt = [c for n in level for c in (left[n], right[n]) if c != -1]
+            if nxt:
+                depth += 1
+            level = nxt
+        return depth
+
+    @classmethod
+    def from_booster(cls, booster) -> "ForestEvaluator":
+        """Build from an xgboost.Booster"""
+        return cls(json.loads(booster.save_raw("json")))
+
+    @classmethod
+    def load(cls, path: str) -> "ForestEvaluator":
+        """Build from a model saved with save_model('*.json')"""
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    @property
+    def num_iterations(self) -> int:
+        return len(self.iteration_indptr) - 1
+
+    def _tree_range(self, iteration_range: Optional[Tuple[int, int]]) -> Tuple[int, int]:
+        """Translate an iteration range into a slice of trees"""
+        if iteration_range is None or iteration_range == (0, 0):
+            return 0, len(self.roots)
+        begin, end = iteration_range
+        end = min(end, self.num_iterations) if end > 0 else self.num_iterations
+        return int(self.iteration_indptr[begin]), int(self.iteration_indptr[end])
+
+    def predict_margin(self, X, iteration_range: Optional[Tuple[int, int]] = None) -> np.ndarray:
+        """
+        Raw margins per output group
+
+        Args:
+            X: Dense features of shape (n_samples, num_feature), NaN marks missing
+            iteration_range: Optional (begin, end) boosting rounds to use
+
+        Returns:
+            float64 array of shape (n_samples, num_groups)
+        """
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.num_feature:
+            raise ValueError(f"Expected input of shape (n, {self.num_feature}), got {X.shape}")
+
+        first, last = self._tree_range(iteration_range)
+        margin = np.tile(self.base_margin, (X.shape[0], 1))
+        if first == last:
+            return margin
+
+        n_rows = X.shape[0]
+        flat = X.ravel()
+        row_base = (np.arange(n_rows, dtype=np.intp) * self.num_feature)[:, None]
+        has_missing = bool(np.isnan(flat).any())
+
+        node = np.broadcast_to(self.roots[first:last], (n_rows, last - first)).copy()
+        for _ in range(self.max_depth):
+            value = flat[row_base + self.feature[node]]
+            go_right = ~(value < self.threshold[node])
+            if has_missing:
+                missing = np.isnan(value)
+                go_right[missing] = ~self.default_left[node[missing]]
+            node = self._children[2 * node + go_right]
+
+        margin += self.leaf_value[node] @ self._group_onehot[first:last]
+        return margin
+
+    def predict_proba(self, X, iteration_range: Optional[Tuple[int, int]] = None) -> np.ndarray:
+        """
+        Class probabilities, matching XGBClassifier.predict_proba
+
+        Args:
+            X: Dense features of shape (n_samples, num_feature), NaN marks missing
+            iteration_range: Optional (begin, end) boosting rounds to use
+
+        Returns:
+            float32 array of shape (n_samples, n_classes)
+        """
+        margin = self.predict_margin(X, iteration_range)
+        if self.objective == "binary:logistic":
+            positive = 1.0 / (1.0 + np.exp(-margin[:, 0]))
+            return np.column_stack([1.0 - positive, positive]).astype(np.float32)
+
+        margin -= margin.max(axis=1, keepdims=True)
+        np.exp(margin, out=margin)
+        margin /= margin.sum(axis=1, keepdims=True)
+        return margin.astype(np.float32)
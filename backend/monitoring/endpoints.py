@@ -0,0 +1,129 @@
+"""
+Monitoring API endpoints
+"""
+import asyncio
+import secrets
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+from common.config import (
+    ADMIN_TOKEN,
+    PROFILER_INTERVAL,
+    PROFILER_MAX_OVERHEAD,
+    PROFILER_MAX_SECONDS
+)
+from monitoring.services import get_live_metrics, model_status
+from monitoring.metrics import REGISTRY
+from monitoring.middleware import TimedRoute
+from monitoring.profiler import (
+    SamplingProfiler,
+    try_begin_profiling,
+    end_profiling,
+    start_request_profile,
+    stop_request_profile
+)
+
+router = APIRouter(tags=["monitoring"], route_class=TimedRoute)
+
+# Content type of the Prometheus text exposition format
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+INTERVAL_QUERY = Query(
+    PROFILER_INTERVAL * 1000,
+    ge=1,
+    le=1000,
+    description="Milliseconds between stack samples (stretched to respect the overhead cap)"
+)
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Reject requests without the configured admin token"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Admin endpoints are disabled (ADMIN_TOKEN not set)")
+    if x_admin_token is None or not secrets.compare_digest(x_admin_token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+def _profile_response(profiler: SamplingProfiler) -> PlainTextResponse:
+    """Collapsed stacks with the sampling statistics as headers"""
+    stats = profiler.stats()
+    return PlainTextResponse(
+        profiler.collapsed(),
+        headers={
+            "X-Profile-Samples": str(stats["samples"]),
+            "X-Profile-Duration": str(stats["duration_seconds"]),
+            "X-Profile-Overhead": str(stats["overhead"])
+        }
+    )
+
+
+@router.get("/realtime-metrics")
+def get_realtime_metrics():
+    """Real-time metrics for dashboard"""
+    return get_live_metrics().snapshot(model_status())
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """
+    Prometheus scrape endpoint: stage latencies, batch sizes, rows per model,
+    cache lookups and thread pool queue depth for this worker
+    """
+    # Async so queue depth is read from the event loop's thread limiter
+    return PlainTextResponse(REGISTRY.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
+@router.post("/admin/profile", response_class=PlainTextResponse, dependencies=[Depends(require_admin)])
+async def profile_worker(
+    seconds: float = Query(10, gt=0, le=PROFILER_MAX_SECONDS, description="Sampling duration"),
+    interval_ms: float = INTERVAL_QUERY
+):
+    """
+    Sample every thread of this worker for `seconds` and return collapsed
+    stacks (one "frame;frame;... count" line per stack, ready for
+    flamegraph.pl or speedscope)
+    """
+    if not try_begin_profiling():
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    try:
+        profiler = SamplingProfiler(interval_ms / 1000, PROFILER_MAX_OVERHEAD)
+        profiler.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            profiler.stop()
+        return _profile_response(profiler)
+    finally:
+        end_profiling()
+
+
+@router.post("/admin/profile/requests", response_class=PlainTextResponse, dependencies=[Depends(require_admin)])
+async def profile_requests(
+    route: str = Query(..., description="Route template to profile, e.g. /predict/one"),
+    count: int = Query(10, ge=1, le=10000, description="Number of requests to profile"),
+    timeout: float = Query(60, gt=0, le=PROFILER_MAX_SECONDS, description="Give up waiting after this many seconds"),
+    interval_ms: float = INTERVAL_QUERY
+):
+    """
+    Sample only the threads serving the next `count` requests to `route`
+    and return their collapsed stacks. Async endpoints share the event loop
+    thread, so their profile also contains whatever else the loop ran.
+    """
+    if not try_begin_profiling():
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    try:
+        session = start_request_profile(route, count, interval_ms / 1000, PROFILER_MAX_OVERHEAD)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        try:
+            while not session.done.is_set() and loop.time() < deadline:
+                await asyncio.sleep(0.05)
+        finally:
+            stop_request_profile(session)
+        response = _profile_response(session.profiler)
+        response.headers["X-Profile-Requests"] = str(count - max(session.remaining, 0))
+        return response
+    finally:
+        end_profiling()
@@ -0,0 +1,336 @@
+"""
+Prometheus-compatible metrics - counters, gauges and histograms rendered in
+the text exposition format served on /metrics
+"""
+import math
+import time
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from monitoring.tracing import current_trace
+
+
+# Latency buckets in seconds: sub-millisecond single predictions up to
+# multi-second uploads
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30
+)
+# Batch size buckets in rows
+ROWS_BUCKETS = (1, 10, 100, 1000, 10000, 100000, 1000000)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+Callback = Callable[[], Dict[Tuple[str, ...], float]]
+
+
+class _Metric:
+    """Base class: a named family of time series keyed by label values"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """
+    Monotonically increasing value per label set, either incremented
+    directly or read from a callback at scrape time (the callback returns
+    {label values: value})
+    """
+
+    kind = "counter"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        callback: Optional[Callback] = None
+    ):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._callback = callback
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        if self._callback is not None:
+            values.update(self._callback())
+        lines = self._header()
+        for labels, value in sorted(values.items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(_Metric):
+    """Value that goes up and down, set directly or read from a callback"""
+
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        callback: Optional[Callback] = None
+    ):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._callback = callback
+
+    def set(self, *labels: str, value: float) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        if self._callback is not None:
+            values.update(self._callback())
+        lines = self._header()
+        for labels, value in sorted(values.items()):
+            if value is not None:
+                lines.append(f"{self.name}{_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    """Bucketed observations with running sum and count per label set"""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket (last one is +Inf)..., sum]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, *labels: str, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return int(sum(series[:-1])) if series else 0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((labels, list(series)) for labels, series in self._series.items())
+        lines = self._header()
+        for labels, series in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (math.inf,), series[:-1]):
+                cumulative += n
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Ordered collection of metrics rendered together"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """All metrics in Prometheus text exposition format (version 0.0.4)"""
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "nids_stage_duration_seconds",
+    "Time spent in each processing stage (parse, preprocess, infer, build, serialize)",
+    ("component", "stage")
+))
+BATCH_ROWS = REGISTRY.register(Histogram(
+    "nids_batch_rows",
+    "Rows per scored batch",
+    ("source",),
+    buckets=ROWS_BUCKETS
+))
+ROWS_SCORED = REGISTRY.register(Counter(
+    "nids_model_rows_total",
+    "Rows scored by each model",
+    ("model",)
+))
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "nids_http_request_duration_seconds",
+    "End-to-end HTTP request latency by route",
+    ("method", "route", "status")
+))
+REQUESTS_IN_FLIGHT = REGISTRY.register(Gauge(
+    "nids_http_requests_in_flight",
+    "Requests currently being handled by this worker"
+))
+
+
+def _cache_stats() -> Optional[Dict]:
+    """Stats of the single-prediction cache, if the service exists"""
+    from prediction.services import get_loaded_prediction_service
+    service = get_loaded_prediction_service()
+    if service is None or service.cache is None:
+        return None
+    return service.cache.stats()
+
+
+def _cache_lookups() -> Dict[Tuple[str, ...], float]:
+    stats = _cache_stats()
+    if stats is None:
+        return {}
+    return {("hit",): stats["hits"], ("miss",): stats["misses"]}
+
+
+def _cache_occupancy() -> Dict[Tuple[str, ...], float]:
+    stats = _cache_stats()
+    if stats is None:
+        return {}
+    return {
+        ("entries",): stats["entries"],
+        ("bytes",): stats["bytes"],
+        ("hit_ratio",): stats["hit_rate"] / 100
+    }
+
+
+def _threadpool_usage() -> Dict[Tuple[str, ...], float]:
+    """
+    Sync endpoints run on AnyIO's default thread limiter: borrowed tokens are
+    requests being executed, waiting tasks are requests queued for a thread.
+    Only readable from the event loop (the /metrics handler is async).
+    """
+    try:
+        from anyio.to_thread import current_default_thread_limiter
+        limiter = current_default_thread_limiter()
+        statistics = limiter.statistics()
+    except Exception:
+        return {}
+    return {
+        ("capacity",): limiter.total_tokens,
+        ("busy",): statistics.borrowed_tokens,
+        ("waiting",): statistics.tasks_waiting
+    }
+
+
+REGISTRY.register(Counter(
+    "nids_prediction_cache_lookups_total",
+    "Single-prediction cache lookups by result",
+    ("result",),
+    callback=_cache_lookups
+))
+REGISTRY.register(Gauge(
+    "nids_prediction_cache",
+    "Single-prediction cache occupancy and hit ratio",
+    ("field",),
+    callback=_cache_occupancy
+))
+REGISTRY.register(Gauge(
+    "nids_threadpool_tasks",
+    "Worker thread pool capacity, busy threads and requests queued for a thread",
+    ("state",),
+    callback=_threadpool_usage
+))
+
+
+def observe_stage(component: str, name: str, seconds: float) -> None:
+    """Record a stage duration measured by the caller (histogram and request trace)"""
+    STAGE_SECONDS.observe(component, name, value=seconds)
+    trace = current_trace()
+    if trace is not None:
+        trace.add_span(component, name, seconds)
+
+
+@contextmanager
+def stage(component: str, name: str) -> Iterator[None]:
+    """
+    Time a block into the per-stage latency histogram and the trace of the
+    request being served (its Server-Timing header)
+
+    Args:
+        component: Service or endpoint the stage belongs to
+        name: Stage name (parse, preprocess, infer, build, ...)
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(component, name, time.perf_counter() - start)
+
+
+def count_rows(model: str, rows: int) -> None:
+    """Account rows scored by a model"""
+    ROWS_SCORED.inc(model, amount=rows)
+    trace = current_trace()
+    if trace is not None:
+        trace.add_rows(model, rows)
@@ -0,0 +1,183 @@
+"""
+HTTP instrumentation - request latency per route, in-flight requests,
+response serialization time and Server-Timing headers
+"""
+import json
+import time
+import asyncio
+import functools
+from contextvars import ContextVar
+from typing import Callable, List, Optional
+from urllib.parse import parse_qs
+
+from fastapi.routing import APIRoute
+
+from common.config import CORS_ORIGINS, SERVER_TIMING, SERVER_TIMING_DEBUG
+from monitoring.metrics import REQUEST_SECONDS, REQUESTS_IN_FLIGHT, observe_stage
+from monitoring.tracing import RequestTrace, start_trace, end_trace
+from monitoring.profiler import profile_request
+
+
+# Time each endpoint function returned, set by the route handler for the
+# duration of one request (a shared list, so threadpool endpoints can fill it)
+_endpoint_done: ContextVar[Optional[List[float]]] = ContextVar("_endpoint_done", default=None)
+
+
+def _mark_endpoint_done() -> None:
+    holder = _endpoint_done.get()
+    if holder is not None:
+        holder.append(time.perf_counter())
+
+
+def _timed_endpoint(call: Callable, route: str) -> Callable:
+    """
+    Wrap an endpoint so the route knows when it returned, and so the thread
+    running it can be sampled by a request profile targeting the route
+    """
+    if getattr(call, "_timed_route", False):
+        # Already wrapped by the router the route was included from
+        return call
+    if asyncio.iscoroutinefunction(call):
+        @functools.wraps(call)
+        async def wrapper(*args, **kwargs):
+            try:
+                with profile_request(route):
+                    return await call(*args, **kwargs)
+            finally:
+                _mark_endpoint_done()
+    else:
+        @functools.wraps(call)
+        def wrapper(*args, **kwargs):
+            try:
+                with profile_request(route):
+                    return call(*args, **kwargs)
+            finally:
+                _mark_endpoint_done()
+    wrapper._timed_route = True
+    return wrapper
+
+
+class TimedRoute(APIRoute):
+    """
+    Route recording the time between the endpoint returning and the response
+    being ready (response model validation and JSON encoding) as the
+    "serialize" stage of the route
+    """
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        super().__init__(path, _timed_endpoint(endpoint, path), **kwargs)
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        component = self.path
+
+        async def timed_handler(request):
+            holder: List[float] = []
+            token = _endpoint_done.set(holder)
+            try:
+                response = await handler(request)
+            finally:
+                _endpoint_done.reset(token)
+            if holder:
+                observe_stage(component, "serialize", time.perf_counter() - holder[0])
+            return response
+
+        return timed_handler
+
+
+def _route(scope) -> str:
+    """Route template (e.g. /predict/csv) so label cardinality stays bounded"""
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+def _debug_requested(scope) -> bool:
+    """Whether the request asked for the timing breakdown in its body"""
+    query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    return query.get("debug_timing", ["false"])[-1].lower() in ("1", "true", "yes")
+
+
+def _with_timing(message, trace: RequestTrace, body: Optional[bytes] = None):
+    """Response start message with Server-Timing headers (and a new length)"""
+    headers = [
+        (name, value) for name, value in message.get("headers", [])
+        if body is None or name.lower() != b"content-length"
+    ]
+    if body is not None:
+        headers.append((b"content-length", str(len(body)).encode("latin-1")))
+    headers.append((b"server-timing", trace.server_timing().encode("latin-1")))
+    # Lets the dashboard's origin read the timings in the browser
+    headers.append((b"timing-allow-origin", ", ".join(CORS_ORIGINS).encode("latin-1")))
+    return {**message, "headers": headers}
+
+
+def _add_breakdown(start_message, body: bytes, trace: RequestTrace) -> bytes:
+    """Add the trace as a "timing" key to a JSON object body"""
+    content_type = dict(start_message.get("headers", [])).get(b"content-type", b"")
+    if not content_type.startswith(b"application/json"):
+        return body
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return body
+    if not isinstance(data, dict):
+        return body
+    data["timing"] = trace.breakdown()
+    return json.dumps(data).encode("utf-8")
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware timing each HTTP request from the first byte
+    received to the last byte sent, and attaching the request's stage
+    breakdown as a Server-Timing header.
+
+    The body is only buffered when the client asked for ?debug_timing=true,
+    to add the breakdown to a JSON response.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = [500]
+        REQUESTS_IN_FLIGHT.inc()
+        trace = token = None
+        if SERVER_TIMING:
+            trace, token = start_trace()
+        debug = trace is not None and SERVER_TIMING_DEBUG and _debug_requested(scope)
+        pending_start = []
+        body_parts = []
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                if debug:
+                    pending_start.append(message)
+                    return
+                if trace is not None:
+                    message = _with_timing(message, trace)
+            elif debug and message["type"] == "http.response.body" and pending_start:
+                body_parts.append(message.get("body", b""))
+                if message.get("more_body", False):
+                    return
+                body = _add_breakdown(pending_start[0], b"".join(body_parts), trace)
+                await send(_with_timing(pending_start.pop(), trace, body))
+                message = {"type": "http.response.body", "body": body}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if token is not None:
+                end_trace(token)
+            REQUESTS_IN_FLIGHT.dec()
+            REQUEST_SECONDS.observe(
+                scope["method"], _route(scope), str(status[0]),
+                value=time.perf_counter() - start
+            )
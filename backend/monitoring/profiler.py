@@ -0,0 +1,204 @@
+"""
+Statistical sampling profiler - stacks of running threads are sampled from a
+timer thread and aggregated into collapsed (flamegraph-compatible) text
+"""
+import os
+import sys
+import time
+import sysconfig
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from typing import Collection, Dict, Iterator, List, Optional
+
+from common.config import APP_ROOT
+from common.logger import logger
+
+
+_STDLIB = sysconfig.get_paths()["stdlib"]
+
+
+def _frame_label(code) -> str:
+    """function (path:line) with paths shortened to the app, site-packages or stdlib"""
+    path = code.co_filename
+    if "site-packages" + os.sep in path:
+        path = path.split("site-packages" + os.sep, 1)[1]
+    elif path.startswith(APP_ROOT):
+        path = os.path.relpath(path, APP_ROOT)
+    elif path.startswith(_STDLIB):
+        path = os.path.relpath(path, _STDLIB)
+    return f"{code.co_name} ({path}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """
+    Samples the Python stacks of other threads every `interval` seconds
+
+    The sampler holds the GIL while it walks stacks, so its cost is paid by
+    the threads being profiled. After each sample the next sleep is
+    stretched as needed to keep the sampler's share of wall time under
+    `max_overhead`, which makes it safe to run under real load.
+    """
+
+    def __init__(
+        self,
+        interval: float = 0.005,
+        max_overhead: float = 0.02,
+        threads: Optional[Collection[int]] = None
+    ):
+        """
+        Args:
+            interval: Target seconds between samples
+            max_overhead: Maximum fraction of wall time spent sampling
+            threads: Only sample these thread idents (a live collection,
+                may change while sampling; None = every thread)
+        """
+        self.interval = interval
+        self.max_overhead = max_overhead
+        self.threads = threads
+        self.stacks: Dict[str, int] = {}
+        self.samples = 0
+        self.sampling_seconds = 0.0
+        self.started_at: Optional[float] = None
+        self.stopped_at: Optional[float] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.stopped_at = time.perf_counter()
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        delay = self.interval
+        while not self._stop.wait(delay):
+            start = time.perf_counter()
+            if self.threads is None or self.threads:
+                names = self._sample(own, names)
+            cost = time.perf_counter() - start
+            self.sampling_seconds += cost
+            # Duty cycle cost / (cost + delay) stays under max_overhead
+            delay = max(self.interval, cost / self.max_overhead - cost)
+
+    def _sample(self, own: int, names: Dict[int, str]) -> Dict[int, str]:
+        frames = sys._current_frames()
+        for ident, frame in frames.items():
+            if ident == own or (self.threads is not None and ident not in self.threads):
+                continue
+            if ident not in names:
+                names = {t.ident: t.name for t in threading.enumerate()}
+            stack: List[str] = []
+            while frame is not None:
+                stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            stack.append(names.get(ident, f"thread-{ident}"))
+            key = ";".join(reversed(stack))
+            self.stacks[key] = self.stacks.get(key, 0) + 1
+        self.samples += 1
+        return names
+
+    def collapsed(self) -> str:
+        """One "root;...;leaf count" line per distinct stack, heaviest first"""
+        lines = [f"{stack} {n}" for stack, n in sorted(self.stacks.items(), key=lambda x: -x[1])]
+        return "\n".join(lines) + ("\n" if lines else "")
+
+    def stats(self) -> Dict[str, float]:
+        end = self.stopped_at or time.perf_counter()
+        duration = end - self.started_at if self.started_at is not None else 0.0
+        return {
+            "samples": self.samples,
+            "duration_seconds": round(duration, 3),
+            "overhead": round(self.sampling_seconds / duration, 4) if duration > 0 else 0.0
+        }
+
+
+class RequestProfile:
+    """Profiles the threads serving the next `count` requests to one route"""
+
+    def __init__(self, route: str, count: int, profiler: SamplingProfiler):
+        self.route = route
+        self.remaining = count
+        self.in_progress = 0
+        self.profiler = profiler
+        self.done = threading.Event()
+        self._lock = threading.Lock()
+
+    def claim(self, route: str) -> bool:
+        """Take one of the remaining request slots for a request to `route`"""
+        if route != self.route:
+            return False
+        with self._lock:
+            if self.remaining <= 0:
+                return False
+            self.remaining -= 1
+            self.in_progress += 1
+            return True
+
+    def release(self) -> None:
+        with self._lock:
+            self.in_progress -= 1
+            if self.remaining <= 0 and self.in_progress == 0:
+                self.done.set()
+
+
+# Active request profile (None almost always: the per-request check is a
+# single global read)
+_request_profile: Optional[RequestProfile] = None
+_profiling = threading.Lock()
+
+
+@contextmanager
+def profile_request(route: str) -> Iterator[None]:
+    """Include the current thread in the active request profile, if it targets `route`"""
+    session = _request_profile
+    if session is None or not session.claim(route):
+        yield
+        return
+    # Async endpoints share the event loop thread, so idents are counted and
+    # only leave the profile when their last request finishes
+    ident = threading.get_ident()
+    threads = session.profiler.threads
+    with session._lock:
+        threads[ident] += 1
+    try:
+        yield
+    finally:
+        with session._lock:
+            threads[ident] -= 1
+            if threads[ident] <= 0:
+                del threads[ident]
+        session.release()
+
+
+def try_begin_profiling() -> bool:
+    """Reserve the profiler (one profile at a time per worker)"""
+    return _profiling.acquire(blocking=False)
+
+
+def end_profiling() -> None:
+    _profiling.release()
+
+
+def start_request_profile(route: str, count: int, interval: float, max_overhead: float) -> RequestProfile:
+    """Start sampling the threads serving the next `count` requests to `route`"""
+    global _request_profile
+    profiler = SamplingProfiler(interval, max_overhead, threads=Counter())
+    session = RequestProfile(route, count, profiler)
+    profiler.start()
+    _request_profile = session
+    logger.info(f"Profiling the next {count} requests to {route}")
+    return session
+
+
+def stop_request_profile(session: RequestProfile) -> None:
+    global _request_profile
+    _request_profile = None
+    session.profiler.stop()
@@ -0,0 +1,219 @@
+"""
+Monitoring services - live counters behind /realtime-metrics
+"""
+import os
+import time
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from common.constants import THREAT_TYPES
+from monitoring.metrics import BATCH_ROWS
+
+
+# Rolling throughput windows reported by the dashboard, in seconds
+THROUGHPUT_WINDOWS = {"1m": 60, "5m": 300, "15m": 900}
+
+
+def process_rss_bytes() -> Optional[int]:
+    """Resident set size of this process (None when it cannot be read)"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        import sys
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Peak rather than current RSS; kilobytes on Linux, bytes on macOS
+        return peak if sys.platform == "darwin" else peak * 1024
+    except (ImportError, OSError):
+        return None
+
+
+def total_memory_bytes() -> Optional[int]:
+    """Physical memory of the host (None when unknown)"""
+    try:
+        return os.sysconf("SC_PHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+class LiveMetrics:
+    """
+    In-process counters fed by the services that score traffic
+
+    Recording a batch takes one short critical section: a few integer
+    updates, one slot of a per-second ring buffer covering the longest
+    throughput window, and a bounded deque append when threats were found.
+    Everything expensive (window sums, formatting) happens on read.
+    """
+
+    def __init__(self, max_events: int = 50, clock=time.time):
+        """
+        Args:
+            max_events: Number of recent detection events kept
+            clock: Wall-clock time source in seconds
+        """
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._slots = max(THROUGHPUT_WINDOWS.values())
+        # Ring buffer: epoch second held by each slot and rows scored in it
+        self._slot_second: List[int] = [-1] * self._slots
+        self._slot_rows: List[int] = [0] * self._slots
+        self.started_at = clock()
+        self.rows_total = 0
+        self.batches_total = 0
+        self.threats_total = 0
+        self.labelled_rows = 0
+        self.correct_rows = 0
+        self.rows_by_source: Dict[str, int] = {}
+        self.detections_by_label: Dict[str, int] = {}
+        self.events: Deque[Tuple[float, str, Dict[str, int]]] = deque(maxlen=max_events)
+
+    def record_batch(
+        self,
+        source: str,
+        rows: int,
+        predicted: Optional[Dict[str, int]] = None,
+        labelled: int = 0,
+        correct: int = 0
+    ) -> None:
+        """
+        Account for one scored batch
+
+        Args:
+            source: Service that scored it ("prediction", "bulk", "analysis", "benchmark")
+            rows: Number of rows scored
+            predicted: Row count per predicted label (BENIGN included or not)
+            labelled: Rows whose ground-truth label was known
+            correct: Labelled rows predicted correctly
+        """
+        now = self._clock()
+        second = int(now)
+        slot = second % self._slots
+        threats = None
+        if predicted:
+            threats = {label: n for label, n in predicted.items() if label != "BENIGN" and n}
+
+        with self._lock:
+            if self._slot_second[slot] != second:
+                self._slot_second[slot] = second
+                self._slot_rows[slot] = 0
+            self._slot_rows[slot] += rows
+            self.rows_total += rows
+            self.batches_total += 1
+            self.rows_by_source[source] = self.rows_by_source.get(source, 0) + rows
+            self.labelled_rows += labelled
+            self.correct_rows += correct
+            if threats:
+                for label, n in threats.items():
+                    self.detections_by_label[label] = self.detections_by_label.get(label, 0) + n
+                    self.threats_total += n
+                self.events.append((now, source, threats))
+        BATCH_ROWS.observe(source, value=rows)
+
+    def throughput(self, window: int) -> float:
+        """Rows per second over the last `window` seconds"""
+        now = int(self._clock())
+        with self._lock:
+            pairs = list(zip(self._slot_second, self._slot_rows))
+        rows = sum(n for second, n in pairs if 0 <= now - second < window)
+        return rows / window
+
+    def snapshot(self, models: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Dashboard view of the counters
+
+        Args:
+            models: Status per model family, as returned by model_status()
+
+        Returns:
+            Dictionary with current_metrics, detections, system_status and
+            recent_activity sections
+        """
+        now = self._clock()
+        throughput = {name: round(self.throughput(seconds), 2) for name, seconds in THROUGHPUT_WINDOWS.items()}
+        with self._lock:
+            detections = dict(self.detections_by_label)
+            by_source = dict(self.rows_by_source)
+            events = list(self.events)
+            accuracy = self.correct_rows / self.labelled_rows * 100 if self.labelled_rows else None
+
+        by_type: Dict[str, int] = {}
+        for label, n in detections.items():
+            threat_type = THREAT_TYPES.get(label, "Unknown")
+            by_type[threat_type] = by_type.get(threat_type, 0) + n
+
+        rss = process_rss_bytes()
+        total = total_memory_bytes()
+        uptime = int(now - self.started_at)
+        loaded = [name for name, status in models.items() if status.get("loaded")]
+
+        return {
+            "current_metrics": {
+                "samples_processed": self.rows_total,
+                "batches_processed": self.batches_total,
+                "threats_detected": self.threats_total,
+                "accuracy_current": round(accuracy, 2) if accuracy is not None else None,
+                "labelled_samples": self.labelled_rows,
+                "processing_speed": f"{throughput['1m']:.0f} samples/sec",
+                "throughput_rows_per_sec": throughput,
+                "samples_by_source": by_source
+            },
+            "detections": {
+                "by_label": detections,
+                "by_threat_type": by_type
+            },
+            "system_status": {
+                "model_status": "active" if loaded else "not loaded",
+                "models": models,
+                "last_update": datetime.now().isoformat(),
+                "uptime_seconds": uptime,
+                "uptime": f"{uptime // 3600}h {uptime % 3600 // 60}m {uptime % 60}s",
+                "memory_rss_bytes": rss,
+                "memory_usage": f"{rss / total * 100:.1f}%" if rss and total else None
+            },
+            "recent_activity": [
+                {
+                    "timestamp": datetime.fromtimestamp(timestamp).isoformat(),
+                    "event": "Threat detected",
+                    "source": source,
+                    "details": ", ".join(f"{n} {label}" for label, n in sorted(threats.items(), key=lambda x: -x[1])),
+                    "counts": threats
+                }
+                for timestamp, source, threats in reversed(events)
+            ]
+        }
+
+
+def model_status() -> Dict[str, Any]:
+    """Load state of both model families, without triggering a load"""
+    from model_management.services import get_loaded_model_loader
+    from model_management.mlp_loader import get_loaded_mlp_model_loader
+
+    status = {}
+    for name, loader in (("xgboost", get_loaded_model_loader()), ("mlp", get_loaded_mlp_model_loader())):
+        if loader is None:
+            status[name] = {"loaded": False}
+        else:
+            status[name] = {
+                "loaded": loader.is_loaded(),
+                "backend": getattr(loader, "backend", None)
+            }
+    return status
+
+
+# Global live metrics instance
+_live_metrics: Optional[LiveMetrics] = None
+
+
+def get_live_metrics() -> LiveMetrics:
+    """Get or create the global live metrics instance"""
+    global _live_metrics
+    if _live_metrics is None:
+        _live_metrics = LiveMetrics()
+    return _live_metrics
@@ -0,0 +1,75 @@
+"""
+Per-request stage breakdown - spans recorded by the services are collected
+on the request being served and reported in its Server-Timing header
+"""
+import time
+from contextvars import ContextVar, Token
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class RequestTrace:
+    """Stage durations and rows scored during one request"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        # (component, stage) -> [seconds, occurrences], in first-seen order
+        self.spans: Dict[Tuple[str, str], List[float]] = {}
+        self.rows: Dict[str, int] = {}
+
+    def add_span(self, component: str, name: str, seconds: float) -> None:
+        span = self.spans.get((component, name))
+        if span is None:
+            self.spans[(component, name)] = [seconds, 1]
+        else:
+            span[0] += seconds
+            span[1] += 1
+
+    def add_rows(self, model: str, rows: int) -> None:
+        self.rows[model] = self.rows.get(model, 0) + rows
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+    def server_timing(self) -> str:
+        """
+        Server-Timing header value, e.g.
+        parse;dur=16.6;desc="predict_csv", ..., rows.xgboost;desc="3002", total;dur=1762.7
+        """
+        entries = [
+            f'{name};dur={seconds * 1000:.2f};desc="{component}"'
+            for (component, name), (seconds, _) in self.spans.items()
+        ]
+        entries.extend(f'rows.{model};desc="{rows}"' for model, rows in self.rows.items())
+        entries.append(f"total;dur={self.elapsed() * 1000:.2f}")
+        return ", ".join(entries)
+
+    def breakdown(self) -> Dict[str, Any]:
+        """JSON form of the trace for debug responses"""
+        return {
+            "total_ms": round(self.elapsed() * 1000, 3),
+            "stages": [
+                {"component": component, "stage": name, "ms": round(seconds * 1000, 3), "count": int(count)}
+                for (component, name), (seconds, count) in self.spans.items()
+            ],
+            "rows": dict(self.rows)
+        }
+
+
+# Trace of the request being served (the object is shared with threadpool
+# endpoints, which run in a copy of the request's context)
+_current_trace: ContextVar[Optional[RequestTrace]] = ContextVar("_current_trace", default=None)
+
+
+def start_trace() -> Tuple[RequestTrace, Token]:
+    """Begin collecting spans for the current request"""
+    trace = RequestTrace()
+    return trace, _current_trace.set(trace)
+
+
+def end_trace(token: Token) -> None:
+    _current_trace.reset(token)
+
+
+def current_trace() -> Optional[RequestTrace]:
+    """Trace of the request being served, or None outside a request"""
+    return _current_trace.get()
@@ -0,0 +1,188 @@
+"""
+Bounded LRU cache for single predictions keyed by feature-vector hash
+"""
+import os
+import sys
+import math
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from common.logger import logger
+
+
+def feature_key(features: Dict[str, Any], *context: Any) -> str:
+    """
+    Stable hash of a feature dict and the settings that affect its prediction
+
+    Names are compared case-insensitively (like preprocessing does), numbers
+    by value (1 == 1.0) and missing values (None/NaN) as one marker, so
+    equivalent submissions share a key regardless of key order.
+
+    Args:
+        features: Raw feature dictionary from the request
+        context: Model version and inference options
+
+    Returns:
+        Hex digest
+    """
+    items = []
+    for name, value in features.items():
+        if value is None or (isinstance(value, float) and math.isnan(value)):
+            value = "nan"
+        elif isinstance(value, (bool, int, float)):
+            value = repr(float(value))
+        else:
+            value = str(value)
+        items.append((str(name).strip().lower(), value))
+    items.sort()
+    payload = repr((items, context)).encode("utf-8")
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+
+def model_version(loader) -> str:
+    """
+    Identify the model a loader serves
+
+    Combines the loader instance with the model file's path, size and
+    modification time, so a swapped loader or a replaced file never reuses
+    cached predictions.
+    """
+    path = getattr(loader, "model_path", None)
+    stamp = ""
+    if path and os.path.exists(path):
+        stat = os.stat(path)
+        stamp = f"{stat.st_size}:{stat.st_mtime_ns}"
+    return f"{type(loader).__name__}:{id(loader)}:{getattr(loader, 'backend', '')}:{path}:{stamp}"
+
+
+def _estimate_size(value: Any) -> int:
+    """Approximate memory held by a cached result (containers included)"""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(_estimate_size(k) + _estimate_size(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple)):
+        size += sum(_estimate_size(v) for v in value)
+    return size
+
+
+class PredictionCache:
+    """
+    Thread-safe LRU cache with entry and memory limits and an optional TTL
+
+    Entries are stored with the model version they were computed with;
+    the first lookup made for a different version drops every entry.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        max_bytes: int = 0,
+        ttl: float = 0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Args:
+            max_entries: Maximum number of cached predictions
+            max_bytes: Approximate memory limit (0 = entries limit only)
+            ttl: Seconds an entry stays valid (0 = until evicted)
+            clock: Time source, monotonic seconds
+        """
+        if max_entries < 1:
+            raise ValueError(f"Cache needs at least one entry, got {max_entries}")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[str, Tuple[Any, int, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.version: Optional[str] = None
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def _clear(self) -> None:
+        self._entries.clear()
+        self.bytes = 0
+
+    def _check_version(self, version: str) -> None:
+        """Drop all entries when the model version changes"""
+        if version != self.version:
+            if self._entries:
+                self.invalidations += 1
+                logger.info(f"Prediction cache invalidated ({len(self._entries)} entries): model changed")
+            self._clear()
+            self.version = version
+
+    def get(self, key: str, version: str) -> Optional[Any]:
+        """
+        Look up a prediction
+
+        Args:
+            key: Output of feature_key
+            version: Current model version
+
+        Returns:
+            Cached value, or None on a miss
+        """
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl > 0 and self._clock() >= entry[2]:
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: str, version: str, value: Any) -> None:
+        """Store a prediction computed with the given model version"""
+        size = _estimate_size(key) + _estimate_size(value)
+        if self.max_bytes and size > self.max_bytes:
+            return
+        expires = self._clock() + self.ttl if self.ttl > 0 else math.inf
+        with self._lock:
+            self._check_version(version)
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size, expires)
+            self.bytes += size
+            while len(self._entries) > self.max_entries or (self.max_bytes and self.bytes > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key: str) -> None:
+        _, size, _ = self._entries.pop(key)
+        self.bytes -= size
+
+    def clear(self) -> None:
+        """Drop every entry (counters are kept)"""
+        with self._lock:
+            self._clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters and occupancy"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": float(self.hits / lookups * 100) if lookups else 0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations
+            }
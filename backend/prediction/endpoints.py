@@ -1,23 +1,66 @@
 """
 Prediction API endpoints
 """
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from pandas.io.common import BytesIO
-import pandas as pd
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query, Header, Request
+from typing import Optional
 
-from prediction.models import Sample, PredictionResponse, BatchAnalysisResponse
+from prediction.models import (
+    Sample,
+    PredictionResponse,
+    BatchAnalysisResponse,
+    BulkPredictionResponse,
+    BULK_REQUEST_SCHEMA
+)
 from prediction.services import get_prediction_service
+from common.config import BULK_MAX_ROWS, BULK_MAX_BYTES
+from common.ingestion import read_upload, upload_format, frame_from_json, UPLOAD_SUFFIXES
 from common.logger import logger
+from common.serialization import FastJSONResponse, loads
+from common.columnar import negotiate_format, columnar_response
+from monitoring.metrics import stage
+from monitoring.middleware import TimedRoute
 
-router = APIRouter(prefix="/predict", tags=["prediction"])
+router = APIRouter(prefix="/predict", tags=["prediction"], route_class=TimedRoute)
+
+
+FAST_MODE_QUERY = Query(
+    None, 
+    description="Score with a truncated ensemble and escalate uncertain rows (default: server setting)"
+)
+CASCADE_QUERY = Query(
+    None,
+    description="Send rows XGBoost is unsure about to the MLP for a second opinion (default: server setting)"
+)
+GATE_QUERY = Query(
+    None,
+    description=(
+        "Skip the multi-class model for rows the binary gate considers benign (default: server setting); "
+        "batch summaries report gate_applied=false when no gate model is loaded"
+    )
+)
+FORMAT_QUERY = Query(
+    None,
+    alias="format",
+    description="Result format: json, arrow, parquet or npz (default: from the Accept header, else json)"
+)
 
 
 @router.post("/one", response_model=PredictionResponse)
-def predict_one(sample: Sample):
+def predict_one(
+    sample: Sample, 
+    fast_mode: Optional[bool] = FAST_MODE_QUERY,
+    cascade: Optional[bool] = CASCADE_QUERY,
+    gate: Optional[bool] = GATE_QUERY
+):
     """Make a single prediction from feature dictionary"""
     try:
         prediction_service = get_prediction_service()
-        result = prediction_service.predict_single(sample.features)
+        result = prediction_service.predict_single(
+            sample.features, 
+            fast_mode=fast_mode, 
+            cascade=cascade,
+            gate=gate
+        )
         return PredictionResponse(**result)
     except Exception as e:
         logger.error(f"Error in predict_one: {e}")
@@ -25,33 +68,69 @@ def predict_one(sample: Sample):
 
 
 @router.post("/csv", response_model=BatchAnalysisResponse)
-async def predict_csv(file: UploadFile = File(...)):
-    """Make batch predictions from uploaded CSV file"""
+async def predict_csv(
+    file: UploadFile = File(...),
+    fast_mode: Optional[bool] = FAST_MODE_QUERY,
+    cascade: Optional[bool] = CASCADE_QUERY,
+    gate: Optional[bool] = GATE_QUERY,
+    result_format: Optional[str] = FORMAT_QUERY,
+    probabilities: bool = Query(False, description="Add a probability column per class (binary formats)"),
+    accept: Optional[str] = Header(None)
+):
+    """
+    Make batch predictions from an uploaded CSV (optionally gzip, bz2, xz or
+    zstd compressed), Parquet or Arrow IPC file
+    
+    JSON responses carry the summary and the first rows; Arrow, Parquet and
+    npz responses carry every row as columns, with the summary stored as
+    table metadata.
+    """
     try:
-        # Validate file type
-        if not file.filename.endswith('.csv'):
-            raise HTTPException(
-                status_code=400, 
-                detail="Only CSV files are accepted"
-            )
-        
-        # Read CSV
-        content = await file.read()
-        df = pd.read_csv(BytesIO(content))
-        
-        logger.info(
-            f"CSV file received: {len(df)} rows, {len(df.columns)} columns"
+        fmt = negotiate_format(accept, result_format)
+    except ValueError as e:
+        raise HTTPException(status_code=406, detail=str(e))
+    
+    # Validate file type
+    if upload_format(file.filename) is None:
+        raise HTTPException(
+            status_code=400, 
+            detail=f"Unsupported file type, accepted: {', '.join(UPLOAD_SUFFIXES)}"
         )
+    
+    try:
+        prediction_service = get_prediction_service()
+        
+        # Read only the columns the models use, straight from the spooled upload
+        with stage("predict_csv", "parse"):
+            try:
+                df = read_upload(file.file, file.filename, columns=prediction_service.input_columns(cascade))
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=f"Failed to read {file.filename}: {e}")
+        
+        logger.info("File received: %s, %d rows, %d columns", file.filename, len(df), len(df.columns))
         
         # Make predictions
-        prediction_service = get_prediction_service()
-        result = prediction_service.predict_batch(df)
+        columns = None if fmt == "json" else {}
+        result = prediction_service.predict_batch(
+            df, 
+            fast_mode=fast_mode, 
+            cascade=cascade, 
+            gate=gate,
+            columns=columns,
+            probabilities=probabilities
+        )
         
         # Add filename to summary
         result["summary"]["filename"] = file.filename
         
-        return BatchAnalysisResponse(**result)
+        if columns is not None:
+            return columnar_response(columns, fmt, result["summary"], "predictions")
         
+        # Trusted internal result: skip response model validation
+        return FastJSONResponse(result)
+        
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error in predict_csv: {e}")
         raise HTTPException(
@@ -59,3 +138,98 @@ async def predict_csv(file: UploadFile = File(...)):
             detail=f"Error processing file: {str(e)}"
         )
 
+
+@router.post(
+    "/bulk",
+    response_model=BulkPredictionResponse,
+    openapi_extra={
+        "requestBody": {"required": True, "content": {"application/json": {"schema": BULK_REQUEST_SCHEMA}}}
+    }
+)
+async def predict_bulk(
+    request: Request,
+    fast_mode: Optional[bool] = FAST_MODE_QUERY,
+    cascade: Optional[bool] = CASCADE_QUERY,
+    gate: Optional[bool] = GATE_QUERY,
+    result_format: Optional[str] = FORMAT_QUERY,
+    probabilities: bool = Query(False, description="Add a probability column per class"),
+    accept: Optional[str] = Header(None)
+):
+    """
+    Score many samples from a JSON body in one batched pass
+    
+    The body is a list of feature dicts, a {feature: [values]} object, or
+    {"columns": [...], "rows": [[...], ...]}. Results come back as columns
+    (prediction, prediction_label, confidence, and label when the input
+    has one), as JSON lists or in a binary format like /predict/csv.
+    """
+    try:
+        fmt = negotiate_format(accept, result_format)
+    except ValueError as e:
+        raise HTTPException(status_code=406, detail=str(e))
+    
+    # Refuse oversized bodies before reading them, or while they stream in
+    # when no Content-Length was sent
+    too_large = HTTPException(
+        status_code=413,
+        detail=f"Body exceeds the bulk limit of {BULK_MAX_BYTES} bytes, upload a file to /predict/csv"
+    )
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > BULK_MAX_BYTES:
+        raise too_large
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > BULK_MAX_BYTES:
+            raise too_large
+    
+    with stage("predict_bulk", "parse"):
+        try:
+            df = frame_from_json(loads(body))
+        except ValueError as e:
+            # Invalid JSON included (JSONDecodeError is a ValueError)
+            raise HTTPException(status_code=400, detail=f"Invalid bulk payload: {e}")
+    
+    if len(df) > BULK_MAX_ROWS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"{len(df)} samples exceed the bulk limit of {BULK_MAX_ROWS}, upload a file to /predict/csv"
+        )
+    
+    try:
+        prediction_service = get_prediction_service()
+        try:
+            prediction_service.validate_input(df, cascade)
+        except ValueError as e:
+            # Records without the model features, or non-numeric values
+            raise HTTPException(status_code=400, detail=f"Invalid bulk payload: {e}")
+        
+        columns = {}
+        result = prediction_service.predict_batch(
+            df,
+            fast_mode=fast_mode,
+            cascade=cascade,
+            gate=gate,
+            source="bulk",
+            columns=columns,
+            probabilities=probabilities
+        )
+        
+        if fmt != "json":
+            return columnar_response(columns, fmt, result["summary"], "predictions")
+        return FastJSONResponse({"summary": result["summary"], "columns": columns})
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in predict_bulk: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/cache")
+def prediction_cache_stats():
+    """Hit/miss counters and occupancy of the single-prediction cache"""
+    cache = get_prediction_service().cache
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
@@ -25,3 +25,34 @@ class BatchAnalysisResponse(BaseModel):
     results: List[Dict[str, Any]]
     model_metrics: Dict[str, float]
 
+
+class BulkPredictionResponse(BaseModel):
+    """Response model for bulk predictions (one list per result column)"""
+    summary: Dict[str, Any]
+    columns: Dict[str, List[Any]]
+
+
+# Request body of /predict/bulk, read without per-row validation
+BULK_REQUEST_SCHEMA = {
+    "anyOf": [
+        {
+            "title": "Records",
+            "type": "array",
+            "items": {"type": "object", "additionalProperties": True}
+        },
+        {
+            "title": "Columns",
+            "type": "object",
+            "additionalProperties": {"type": "array", "items": {}}
+        },
+        {
+            "title": "Rows",
+            "type": "object",
+            "properties": {
+                "columns": {"type": "array", "items": {"type": "string"}},
+                "rows": {"type": "array", "items": {"type": "array", "items": {}}}
+            },
+            "required": ["columns", "rows"]
+        }
+    ]
+}
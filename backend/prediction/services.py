@@ -1,15 +1,42 @@
 """
 Prediction services - business logic for predictions
 """
+import copy
+import time
+import logging
 import pandas as pd
 import numpy as np
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
 
 from model_management.services import get_model_loader
-from common.preprocessing import preprocess_dataframe
+from model_management.mlp_loader import get_mlp_model_loader
+from common.config import (
+    XGB_FAST_MODE,
+    GATE_MODE,
+    CASCADE_MODE,
+    CASCADE_CONFIDENCE_THRESHOLD,
+    CASCADE_CLASSES,
+    CASCADE_MLP_WEIGHT,
+    SPARSE_PREPROCESSING,
+    DEDUP_MODE,
+    PREDICTION_CACHE_SIZE,
+    PREDICTION_CACHE_MAX_MB,
+    PREDICTION_CACHE_TTL
+)
+from common.preprocessing import preprocess_array, preprocess_sparse, input_columns, validate_features
+from common.dedup import deduplicate
+from prediction.cache import PredictionCache, feature_key, model_version
+from monitoring.services import get_live_metrics
+from monitoring.metrics import stage, observe_stage, count_rows
 from common.constants import THREAT_TYPES, MODEL_METRICS
-from common.logger import logger
+from common.logger import logger, log_hot_path
+
+
+# Rows of detailed results included in batch responses (for display)
+DISPLAY_RESULTS = 100
+# Raw features copied into the detailed results
+DISPLAY_COLUMNS = ['Flow Duration', 'Total Fwd Packets', 'Total Backward Packets']
 
 
 class PredictionService:
@@ -17,33 +44,282 @@ class PredictionService:
     
     def __init__(self):
         self.model_loader = get_model_loader()
+        # Single-prediction cache (None when disabled)
+        self.cache: Optional[PredictionCache] = None
+        if PREDICTION_CACHE_SIZE > 0:
+            self.cache = PredictionCache(
+                PREDICTION_CACHE_SIZE,
+                max_bytes=int(PREDICTION_CACHE_MAX_MB * 1024 * 1024),
+                ttl=PREDICTION_CACHE_TTL
+            )
+    
+    def input_columns(self, cascade: Optional[bool] = None) -> Optional[List[str]]:
+        """
+        Columns batch scoring reads from an upload (None: read every column)
+        
+        Args:
+            cascade: Include the MLP's inputs (None: server default
+                CASCADE_MODE)
+        """
+        loader = self.model_loader
+        columns = input_columns(loader.encoder, loader.scaler)
+        if columns is None:
+            return None
+        if CASCADE_MODE if cascade is None else cascade:
+            mlp_loader = get_mlp_model_loader()
+            mlp_columns = input_columns(mlp_loader.encoder, mlp_loader.scaler)
+            if mlp_columns is None:
+                return None
+            columns += mlp_columns
+        return columns + DISPLAY_COLUMNS + ['Label']
+    
+    def validate_input(self, df: pd.DataFrame, cascade: Optional[bool] = None) -> None:
+        """
+        Reject input the models cannot score (see validate_features)
+        
+        Args:
+            df: Raw samples
+            cascade: Also check the MLP's inputs (None: server default
+                CASCADE_MODE)
+        
+        Raises:
+            ValueError: If model features are missing or not numeric
+        """
+        loader = self.model_loader
+        validate_features(df, loader.encoder, loader.scaler)
+        if CASCADE_MODE if cascade is None else cascade:
+            mlp_loader = get_mlp_model_loader()
+            validate_features(df, mlp_loader.encoder, mlp_loader.scaler)
+    
+    def _cache_lookup(
+        self, 
+        features: Dict[str, Any], 
+        fast_mode: Optional[bool],
+        cascade: Optional[bool],
+        gate: Optional[bool]
+    ) -> Tuple[str, str, Optional[Dict[str, Any]]]:
+        """Key, model version and cached result (or None) for a single prediction"""
+        options = (
+            XGB_FAST_MODE if fast_mode is None else fast_mode,
+            CASCADE_MODE if cascade is None else cascade,
+            GATE_MODE if gate is None else gate
+        )
+        version = model_version(self.model_loader)
+        if options[1]:
+            version += "|" + model_version(get_mlp_model_loader())
+        key = feature_key(features, *options)
+        return key, version, self.cache.get(key, version)
+    
+    def _predict_proba(
+        self, 
+        X: np.ndarray, 
+        df: pd.DataFrame,
+        fast_mode: Optional[bool] = None,
+        cascade: Optional[bool] = None,
+        gate: Optional[bool] = None,
+        dedup: Optional[bool] = None
+    ) -> Tuple[np.ndarray, Dict[str, Any]]:
+        """
+        Score preprocessed features with the configured inference mode
+        
+        Args:
+            X: Preprocessed features (dense or CSR)
+            df: Raw DataFrame the features came from (needed by the cascade)
+            fast_mode: Use the truncated ensemble with escalation
+                (None: server default XGB_FAST_MODE)
+            cascade: Send uncertain rows to the MLP for a second opinion
+                (None: server default CASCADE_MODE)
+            gate: Skip the multi-class model for rows the binary gate
+                considers benign (None: server default GATE_MODE); reported
+                as gate_applied, which is false when no gate is loaded
+            dedup: Score identical dense rows once (None: server default
+                DEDUP_MODE); ignored with the cascade, whose MLP reads raw
+                columns that X does not capture
+        
+        Returns:
+            Tuple of (probabilities, inference info for the summary)
+        """
+        if dedup is None:
+            dedup = DEDUP_MODE
+        if cascade is None:
+            cascade = CASCADE_MODE
+        if dedup and not cascade and isinstance(X, np.ndarray) and X.shape[0] > 1:
+            # Score each distinct feature vector once and fan results back out
+            index, inverse = deduplicate(X)
+            if index.size < X.shape[0]:
+                y_proba, inference = self._predict_proba(
+                    X[index], df.iloc[index], fast_mode, cascade, gate, dedup=False
+                )
+                inference["dedup"] = {
+                    "unique_rows": int(index.size),
+                    "duplicate_rows": int(X.shape[0] - index.size),
+                    "dedup_ratio": float(X.shape[0] / index.size)
+                }
+                return y_proba[inverse], inference
+        
+        if gate is None:
+            gate = GATE_MODE
+        
+        if gate and self.model_loader.gate is not None:
+            y_proba, suspicious = self.model_loader.gate_filter(X)
+            count_rows("gate", X.shape[0])
+            rows = np.flatnonzero(suspicious)
+            inference = {"mode": "full"}
+            if rows.size:
+                y_proba[rows], inference = self._predict_multiclass(X[rows], fast_mode)
+            inference["gate"] = {
+                "threshold": self.model_loader.gate_config["threshold"],
+                "rows_passed": int(rows.size),
+                "pass_rate": float(rows.size / X.shape[0] * 100) if X.shape[0] > 0 else 0
+            }
+        else:
+            y_proba, inference = self._predict_multiclass(X, fast_mode)
+        if gate:
+            inference["gate_applied"] = self.model_loader.gate is not None
+            if self.model_loader.gate is None:
+                log_hot_path("Gate requested but no gate model is loaded, scoring every row", level=logging.WARNING)
+        
+        if cascade:
+            y_proba, inference["cascade"] = self._cascade(y_proba, df)
+        
+        return y_proba, inference
+    
+    def _predict_multiclass(
+        self, 
+        X: np.ndarray, 
+        fast_mode: Optional[bool] = None
+    ) -> Tuple[np.ndarray, Dict[str, Any]]:
+        """Score rows with the full or truncated multi-class XGBoost model"""
+        if fast_mode is None:
+            fast_mode = XGB_FAST_MODE
+        
+        if fast_mode:
+            y_proba, escalated = self.model_loader.predict_proba_tiered(X)
+            n_escalated = int(escalated.sum())
+            count_rows("xgboost_fast", X.shape[0])
+            count_rows("xgboost", n_escalated)
+            return y_proba, {
+                "mode": "fast",
+                "fast_iterations": self.model_loader.fast_mode_config["iterations"],
+                "escalated_rows": n_escalated,
+                "escalation_rate": float(n_escalated / X.shape[0] * 100) if X.shape[0] > 0 else 0
+            }
+        count_rows("xgboost", X.shape[0])
+        return self.model_loader.predict_proba(X), {"mode": "full"}
     
-    def predict_single(self, features: Dict[str, Any]) -> Dict[str, Any]:
+    def _cascade(
+        self, 
+        y_proba: np.ndarray, 
+        df: pd.DataFrame
+    ) -> Tuple[np.ndarray, Dict[str, Any]]:
+        """
+        Blend in MLP probabilities for rows XGBoost is unsure about
+        
+        Only the selected rows are preprocessed and scored by the MLP, as a
+        compacted sub-batch; the MLP's columns are aligned to XGBoost's
+        class order by label before blending.
+        
+        Args:
+            y_proba: XGBoost probabilities for every row
+            df: Raw DataFrame aligned with y_proba
+        
+        Returns:
+            Tuple of (combined probabilities, cascade statistics)
+        """
+        labels = self.model_loader.encoder.inverse_transform(self.model_loader.classes_)
+        y_proba = np.array(y_proba, dtype=np.float32)
+        xgb_pred = y_proba.argmax(axis=1)
+        
+        selected = y_proba.max(axis=1) < CASCADE_CONFIDENCE_THRESHOLD
+        if CASCADE_CLASSES:
+            selected |= np.isin(labels[xgb_pred], CASCADE_CLASSES)
+        rows = np.flatnonzero(selected)
+        
+        stats = {
+            "confidence_threshold": CASCADE_CONFIDENCE_THRESHOLD,
+            "rows_sent_to_mlp": int(rows.size),
+            "mlp_rate": float(rows.size / len(y_proba) * 100) if len(y_proba) > 0 else 0,
+            "changed_predictions": 0
+        }
+        if rows.size == 0:
+            return y_proba, stats
+        
+        mlp_loader = get_mlp_model_loader()
+        X_mlp = preprocess_array(
+            df.iloc[rows],
+            mlp_loader.encoder,
+            mlp_loader.scaler,
+            None,
+            scale=mlp_loader.input_scaled
+        )
+        mlp_proba = mlp_loader.predict_proba(X_mlp)
+        count_rows("mlp", rows.size)
+        
+        # Reorder MLP columns to XGBoost's class order (missing classes get 0)
+        mlp_columns = {label: i for i, label in enumerate(mlp_loader.encoder.classes_)}
+        aligned = np.zeros((rows.size, len(labels)), dtype=np.float32)
+        for j, label in enumerate(labels):
+            if label in mlp_columns:
+                aligned[:, j] = mlp_proba[:, mlp_columns[label]]
+        
+        combined = (1 - CASCADE_MLP_WEIGHT) * y_proba[rows] + CASCADE_MLP_WEIGHT * aligned
+        combined /= combined.sum(axis=1, keepdims=True)
+        y_proba[rows] = combined
+        
+        stats["changed_predictions"] = int((combined.argmax(axis=1) != xgb_pred[rows]).sum())
+        return y_proba, stats
+    
+    def predict_single(
+        self, 
+        features: Dict[str, Any], 
+        fast_mode: Optional[bool] = None,
+        cascade: Optional[bool] = None,
+        gate: Optional[bool] = None
+    ) -> Dict[str, Any]:
         """
         Make a single prediction
         
         Args:
             features: Dictionary of feature names to values
+            fast_mode: Use the truncated ensemble with escalation
+                (None: server default)
+            cascade: Get an MLP second opinion when XGBoost is unsure
+                (None: server default)
+            gate: Pre-filter with the binary benign/malicious gate
+                (None: server default)
         
         Returns:
             Dictionary with prediction results
         """
         try:
+            if self.cache is not None:
+                with stage("single", "cache"):
+                    key, version, cached = self._cache_lookup(features, fast_mode, cascade, gate)
+                if cached is not None:
+                    result, pred_label = cached
+                    get_live_metrics().record_batch("prediction", 1, {pred_label: 1})
+                    # Callers own the returned dict, nested values included
+                    return {**copy.deepcopy(result), "timestamp": datetime.now().isoformat()}
+            
             # Convert to DataFrame
             df = pd.DataFrame([features])
             
             # Preprocess
-            X = preprocess_dataframe(
-                df,
-                self.model_loader.encoder,
-                self.model_loader.scaler,
-                self.model_loader.feature_columns
-            )
+            with stage("single", "preprocess"):
+                X = preprocess_array(
+                    df,
+                    self.model_loader.encoder,
+                    self.model_loader.scaler,
+                    self.model_loader.feature_columns,
+                    scale=self.model_loader.input_scaled
+                )
             
             # Get prediction
-            model = self.model_loader.model
-            probs = model.predict_proba(X)[0]
-            pred = model.classes_[np.argmax(probs)]
+            classes = self.model_loader.classes_
+            with stage("single", "infer"):
+                y_proba, _ = self._predict_proba(X, df, fast_mode, cascade, gate)
+            probs = y_proba[0]
+            pred = classes[np.argmax(probs)]
             confidence = float(np.max(probs))
             
             # Decode numeric prediction to label
@@ -52,71 +328,107 @@ class PredictionService:
             # Determine threat type
             threat_type = THREAT_TYPES.get(pred_label, "Unknown")
             
-            return {
+            result = {
                 "prediction": str(pred),
                 "confidence": confidence,
                 "threat_type": threat_type if pred_label != 'BENIGN' else None,
                 "probabilities": {
                     str(cls): float(prob) 
-                    for cls, prob in zip(model.classes_, probs)
-                },
-                "timestamp": datetime.now().isoformat()
+                    for cls, prob in zip(classes, probs)
+                }
             }
+            if self.cache is not None:
+                self.cache.put(key, version, (copy.deepcopy(result), pred_label))
+            get_live_metrics().record_batch("prediction", 1, {pred_label: 1})
+            return {**result, "timestamp": datetime.now().isoformat()}
         except Exception as e:
             logger.error(f"Error in predict_single: {e}")
             raise
     
-    def predict_batch(self, df: pd.DataFrame) -> Dict[str, Any]:
+    def predict_batch(
+        self, 
+        df: pd.DataFrame, 
+        fast_mode: Optional[bool] = None,
+        cascade: Optional[bool] = None,
+        gate: Optional[bool] = None,
+        source: str = "prediction",
+        columns: Optional[Dict[str, Any]] = None,
+        probabilities: bool = False
+    ) -> Dict[str, Any]:
         """
         Make batch predictions on a DataFrame
         
         Args:
             df: DataFrame with features
+            fast_mode: Use the truncated ensemble with escalation
+                (None: server default)
+            cascade: Get an MLP second opinion for rows XGBoost is unsure
+                about (None: server default)
+            gate: Pre-filter with the binary benign/malicious gate
+                (None: server default)
+            source: Caller reported in the live metrics and stage timings
+            columns: If given, filled with full-length result columns for
+                binary result formats (and the per-row "results" are skipped)
+            probabilities: Include a probability column per class in `columns`
         
         Returns:
             Dictionary with batch prediction results
         """
         try:
-            # Preprocess
-            X = preprocess_dataframe(
-                df,
-                self.model_loader.encoder,
-                self.model_loader.scaler,
-                self.model_loader.feature_columns
-            )
+            # Preprocess (one-hot columns stay sparse in sparse mode)
+            preprocess = preprocess_sparse if SPARSE_PREPROCESSING else preprocess_array
+            replaced: Dict[str, int] = {}
+            with stage(source, "preprocess"):
+                X = preprocess(
+                    df,
+                    self.model_loader.encoder,
+                    self.model_loader.scaler,
+                    self.model_loader.feature_columns,
+                    scale=self.model_loader.input_scaled,
+                    replaced=replaced
+                )
             
             # Get predictions
-            model = self.model_loader.model
-            y_pred = model.predict(X)
-            y_proba = model.predict_proba(X)
+            classes = self.model_loader.classes_
+            with stage(source, "infer"):
+                y_proba, inference = self._predict_proba(X, df, fast_mode, cascade, gate)
+            build_start = time.perf_counter()
+            y_pred = classes[np.argmax(y_proba, axis=1)]
             
             # Decode numeric predictions to labels
             y_pred_labels = self.model_loader.encoder.inverse_transform(y_pred)
             
-            # Build detailed results
+            if columns is not None:
+                self._fill_columns(columns, df, y_pred, y_proba, probabilities)
+            
+            # Build detailed results for the rows returned (columns are
+            # converted to Python values once, not per row)
+            shown = 0 if columns is not None else min(len(y_pred), DISPLAY_RESULTS)
+            class_names = [str(cls) for cls in classes]
+            confidences = y_proba[:shown].max(axis=1).tolist()
+            timestamp = datetime.now().isoformat()
+            display = {
+                col.replace(' ', '_').lower(): df[col].iloc[:shown].astype(float).fillna(0).tolist()
+                for col in DISPLAY_COLUMNS
+                if col in df.columns
+            }
+            
             results = []
-            for i, (pred, pred_label, proba_row) in enumerate(zip(y_pred, y_pred_labels, y_proba)):
-                confidence = float(np.max(proba_row))
-                threat_type = THREAT_TYPES.get(pred_label, "Unknown")
-                
+            for i, (pred, pred_label, proba_row) in enumerate(
+                zip(y_pred[:shown].tolist(), y_pred_labels[:shown], y_proba[:shown].tolist())
+            ):
                 result = {
                     "id": i,
                     "prediction": str(pred),
-                    "confidence": confidence,
-                    "threat_type": threat_type if pred_label != 'BENIGN' else None,
-                    "timestamp": datetime.now().isoformat(),
-                    "probabilities": {
-                        str(cls): float(prob) 
-                        for cls, prob in zip(model.classes_, proba_row)
-                    }
+                    "confidence": confidences[i],
+                    "threat_type": THREAT_TYPES.get(pred_label, "Unknown") if pred_label != 'BENIGN' else None,
+                    "timestamp": timestamp,
+                    "probabilities": dict(zip(class_names, proba_row))
                 }
                 
                 # Add important features for display
-                if i < len(df):
-                    for col in ['Flow Duration', 'Total Fwd Packets', 'Total Backward Packets']:
-                        if col in df.columns:
-                            col_name = col.replace(' ', '_').lower()
-                            result[col_name] = float(df.iloc[i][col]) if pd.notna(df.iloc[i][col]) else 0
+                for col_name, values in display.items():
+                    result[col_name] = values[i]
                 
                 results.append(result)
             
@@ -124,6 +436,15 @@ class PredictionService:
             counts = pd.Series(y_pred_labels).value_counts().to_dict()
             total_malicious = sum(v for k, v in counts.items() if k != 'BENIGN')
             
+            labelled = correct = 0
+            if 'Label' in df.columns:
+                truth = df['Label'].to_numpy()
+                known = pd.notna(truth)
+                labelled = int(known.sum())
+                correct = int((truth[known] == y_pred_labels[known]).sum())
+            get_live_metrics().record_batch(source, len(df), counts, labelled, correct)
+            observe_stage(source, "build", time.perf_counter() - build_start)
+            
             return {
                 "summary": {
                     "total_samples": len(df),
@@ -131,14 +452,40 @@ class PredictionService:
                     "total_benign": int(counts.get('BENIGN', 0)),
                     "detection_rate": float(total_malicious / len(df) * 100) if len(df) > 0 else 0,
                     "by_label": {str(k): int(v) for k, v in counts.items()},
+                    "inference": inference,
+                    "data_quality": {
+                        "replaced_values": int(sum(replaced.values())),
+                        "replaced_by_feature": replaced
+                    },
                     "processed_at": datetime.now().isoformat()
                 },
-                "results": results[:100],  # Limit to first 100 for display
+                "results": results,
                 "model_metrics": MODEL_METRICS
             }
         except Exception as e:
             logger.error(f"Error in predict_batch: {e}")
             raise
+    
+    def _fill_columns(
+        self,
+        columns: Dict[str, Any],
+        df: pd.DataFrame,
+        y_pred: np.ndarray,
+        y_proba: np.ndarray,
+        probabilities: bool
+    ) -> None:
+        """Result columns as arrays (labels as categoricals: codes + class names)"""
+        label_names = self.model_loader.encoder.classes_
+        columns["prediction"] = y_pred
+        columns["prediction_label"] = pd.Categorical.from_codes(y_pred, categories=label_names)
+        columns["confidence"] = y_proba.max(axis=1)
+        if probabilities:
+            # One contiguous copy, then each class column is a view
+            by_class = np.ascontiguousarray(y_proba.T)
+            for j, cls in enumerate(self.model_loader.classes_):
+                columns[f"proba_{label_names[cls]}"] = by_class[j]
+        if 'Label' in df.columns:
+            columns["label"] = pd.Categorical(df['Label'])
 
 
 # Global prediction service instance
@@ -152,3 +499,8 @@ def get_prediction_service() -> PredictionService:
         _prediction_service = PredictionService()
     return _prediction_service
 
+
+def get_loaded_prediction_service() -> Optional[PredictionService]:
+    """Return the global prediction service if it exists, without creating it"""
+    return _prediction_service
+
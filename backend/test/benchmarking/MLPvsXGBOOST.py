@@ -115,9 +115,8 @@ def predict_with_both_models(X_data):
 
     # Prédiction XGBoost
     print("\n🌳 Prédiction avec XGBoost...")
-    X_scaled_xgb = xgb_scaler.transform(X_data)
-    dmatrix = xgb.DMatrix(X_scaled_xgb)
-    xgb_proba = xgb_model.predict(dmatrix)
+    X_scaled_xgb = np.ascontiguousarray(xgb_scaler.transform(X_data), dtype=np.float32)
+    xgb_proba = xgb_model.inplace_predict(X_scaled_xgb, validate_features=False)
     xgb_pred_encoded = np.argmax(xgb_proba, axis=1)
     xgb_pred = xgb_encoder.inverse_transform(xgb_pred_encoded)
     xgb_confidence = np.max(xgb_proba, axis=1)
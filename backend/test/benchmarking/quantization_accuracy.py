@@ -0,0 +1,172 @@
+"""
+Measure the accuracy cost of reduced-precision MLP variants per attack class
+
+Builds every serving variant from the production Keras MLP (float16 weights
+for the NumPy engine, float32 and int8 dynamically quantized ONNX graphs,
+with and without the scaler folded into the first layer) and compares them with the float32 Keras model on a labelled CSV: per-class
+recall, agreement with the baseline, max probability drift, throughput and
+weight size.
+
+Usage:
+    python test/benchmarking/quantization_accuracy.py --csv path/to/labelled.csv
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import numpy as np
+import pandas as pd
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, BACKEND_DIR)
+
+from common.config import MLP_MODEL_PATH, TEST_CSV_PATH  # noqa: E402
+from common.preprocessing import preprocess_array  # noqa: E402
+from model_management.mlp_loader import MLPModelLoader  # noqa: E402
+from model_management.mlp_export import extract_dense_layers  # noqa: E402
+from model_management.mlp_numpy import NumpyMLP  # noqa: E402
+
+
+def rows_per_second(fn, X: np.ndarray, repeats: int = 3) -> float:
+    """Best-of-n throughput"""
+    best = np.inf
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(X)
+        best = min(best, time.perf_counter() - start)
+    return len(X) / best
+
+
+def build_variants(layers, scaler, workdir: str):
+    """
+    Yield (name, predict function, weight bytes, takes scaled input) for each
+    reduced-precision variant
+
+    The int8 graph with the scaler folded in is measured too, although
+    quantize_int8 and OnnxModelLoader refuse it, to show why they do.
+    """
+    half = [
+        {**layer, "kernel": layer["kernel"].astype(np.float16), "bias": layer["bias"].astype(np.float16)}
+        for layer in layers
+    ]
+    numpy_fp16 = NumpyMLP(half)
+    yield "numpy fp16 weights", numpy_fp16.predict, sum(l["kernel"].nbytes + l["bias"].nbytes for l in half), True
+
+    try:
+        import onnx
+        import onnxruntime as ort
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        from model_management.onnx_export import mlp_to_onnx, quantize_int8
+    except ImportError:
+        print("onnx/onnxruntime not installed, skipping ONNX variants")
+        return
+
+    fp32_path = os.path.join(workdir, "mlp.onnx")
+    onnx.save(mlp_to_onnx(layers), fp32_path)
+    graphs = [("onnx fp32", fp32_path, True)]
+    for per_channel in (True, False):
+        path = os.path.join(workdir, f"mlp_int8_{'channel' if per_channel else 'tensor'}.onnx")
+        quantize_int8(fp32_path, path, per_channel=per_channel)
+        graphs.append((f"onnx int8 per-{'channel' if per_channel else 'tensor'}", path, True))
+
+    folded_path = os.path.join(workdir, "mlp_folded.onnx")
+    onnx.save(mlp_to_onnx(layers, scaler), folded_path)
+    folded_int8_path = os.path.join(workdir, "mlp_folded_int8.onnx")
+    quantize_dynamic(folded_path, folded_int8_path, per_channel=True,
+                     weight_type=QuantType.QInt8, op_types_to_quantize=["MatMul"])
+    graphs += [
+        ("onnx fp32 folded", folded_path, False),
+        ("onnx int8 folded (refused)", folded_int8_path, False)
+    ]
+
+    for name, path, scaled in graphs:
+        session = ort.InferenceSession(path, providers=["CPUExecutionProvider"])
+        input_name = session.get_inputs()[0].name
+        yield name, (lambda X, s=session, i=input_name: s.run(None, {i: X})[0]), os.path.getsize(path), scaled
+
+
+def evaluate(proba, baseline, y_true, labels):
+    """Accuracy, baseline agreement and per-class recall for one variant"""
+    pred = proba.argmax(axis=1)
+    known = y_true >= 0
+    per_class = {}
+    for index, label in enumerate(labels):
+        rows = y_true == index
+        if rows.any():
+            per_class[str(label)] = float((pred[rows] == index).mean())
+    return {
+        "accuracy": float((pred[known] == y_true[known]).mean()) if known.any() else None,
+        "agreement": float((pred == baseline.argmax(axis=1)).mean()),
+        "max_proba_diff": float(np.abs(proba - baseline).max()),
+        "per_class_recall": per_class
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Accuracy of reduced-precision MLP variants")
+    parser.add_argument("--csv", default=TEST_CSV_PATH, help="Labelled CSV (with a Label column)")
+    parser.add_argument("--output", default=None, help="Optional JSON report path")
+    args = parser.parse_args()
+
+    import tensorflow as tf
+
+    baseline_loader = MLPModelLoader(backend="keras", precision="float32")
+    encoder, scaler = baseline_loader.encoder, baseline_loader.scaler
+    layers = extract_dense_layers(tf.keras.models.load_model(MLP_MODEL_PATH, compile=False))
+
+    df = pd.read_csv(args.csv)
+    print(f"Loaded {len(df)} rows from {args.csv}")
+    labels = list(encoder.classes_)
+    y_true = np.full(len(df), -1)
+    if "Label" in df.columns:
+        known = df["Label"].isin(labels).to_numpy()
+        y_true[known] = encoder.transform(df.loc[known, "Label"])
+
+    X_served = preprocess_array(df.copy(), encoder, scaler, None, scale=baseline_loader.input_scaled)
+    X_scaled = preprocess_array(df.copy(), encoder, scaler, None)
+    X_raw = preprocess_array(df.copy(), encoder, scaler, None, scale=False)
+
+    baseline = baseline_loader.predict_proba(X_served)
+    report = {
+        "keras fp32": {
+            **evaluate(baseline, baseline, y_true, labels),
+            "rows_per_second": rows_per_second(baseline_loader.predict_proba, X_served),
+            "weight_bytes": int(sum(l["kernel"].astype(np.float32).nbytes + l["bias"].astype(np.float32).nbytes
+                                    for l in layers))
+        }
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        for name, predict, size, scaled in build_variants(layers, scaler, workdir):
+            X = X_scaled if scaled else X_raw
+            proba = predict(X)
+            report[name] = {
+                **evaluate(proba, baseline, y_true, labels),
+                "rows_per_second": rows_per_second(predict, X),
+                "weight_bytes": int(size)
+            }
+
+    print(f"\n{'variant':<26} {'accuracy':>9} {'agree':>8} {'max diff':>9} {'rows/s':>10} {'bytes':>9}")
+    for name, stats in report.items():
+        accuracy = f"{stats['accuracy']:.4%}" if stats["accuracy"] is not None else "-"
+        print(
+            f"{name:<26} {accuracy:>9} {stats['agreement']:>8.4%} {stats['max_proba_diff']:>9.2e} "
+            f"{stats['rows_per_second']:>10.0f} {stats['weight_bytes']:>9}"
+        )
+
+    print("\nPer-class recall change vs keras fp32")
+    reference = report["keras fp32"]["per_class_recall"]
+    print(f"{'class':<24}" + "".join(f"{name:>28}" for name in list(report)[1:]))
+    for label, recall in reference.items():
+        deltas = [report[name]["per_class_recall"].get(label, np.nan) - recall for name in list(report)[1:]]
+        print(f"{label:<24}" + "".join(f"{delta:>+28.4%}" for delta in deltas))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Train the binary benign/malicious gate and report its recall cost
+
+The gate is a small XGBoost model trained on the same preprocessed features
+(encoder, scaler and feature_columns) as the multi-class model. Its threshold
+is the highest one that keeps --target-recall of the malicious rows on a
+held-out validation split; the report shows which attack classes lose rows
+and how much of the traffic would still reach the full classifier.
+
+Usage:
+    python test/benchmarking/train_gate.py --csv path/to/labelled.csv
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, BACKEND_DIR)
+
+from common.config import GATE_MODEL_PATH, GATE_META_PATH, TEST_CSV_PATH  # noqa: E402
+from common.preprocessing import preprocess_array  # noqa: E402
+from model_management.services import ModelLoader  # noqa: E402
+
+
+def pick_threshold(p_malicious: np.ndarray, is_malicious: np.ndarray, target_recall: float) -> float:
+    """Highest threshold whose recall on malicious rows is at least target_recall"""
+    scores = np.sort(p_malicious[is_malicious])
+    if scores.size == 0:
+        raise ValueError("No malicious rows to calibrate the gate on")
+    # Allow at most (1 - target_recall) of the malicious rows below the threshold
+    allowed_misses = int(np.floor((1.0 - target_recall) * scores.size))
+    return float(np.nextafter(scores[allowed_misses], -np.inf))
+
+
+def time_per_row(fn, X: np.ndarray, repeats: int = 3) -> float:
+    """Best-of-n wall time per row in microseconds"""
+    best = np.inf
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(X)
+        best = min(best, time.perf_counter() - start)
+    return best / len(X) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Train the binary benign/malicious gate")
+    parser.add_argument("--csv", default=TEST_CSV_PATH, help="Labelled CSV (with a Label column)")
+    parser.add_argument("--benign-label", default="BENIGN", help="Label of benign traffic")
+    parser.add_argument("--target-recall", type=float, default=0.999, help="Required recall on malicious rows")
+    parser.add_argument("--n-estimators", type=int, default=30, help="Boosting rounds of the gate")
+    parser.add_argument("--max-depth", type=int, default=4, help="Tree depth of the gate")
+    parser.add_argument("--validation-fraction", type=float, default=0.3, help="Share of rows held out")
+    parser.add_argument("--output", default=GATE_MODEL_PATH, help="Where to save the gate model")
+    parser.add_argument("--meta-output", default=GATE_META_PATH, help="Where to save threshold and report")
+    parser.add_argument("--dry-run", action="store_true", help="Report only, do not write the gate")
+    args = parser.parse_args()
+
+    loader = ModelLoader()
+    df = pd.read_csv(args.csv)
+    if "Label" not in df.columns:
+        raise SystemExit("The gate needs a labelled CSV (Label column)")
+    print(f"Loaded {len(df)} rows from {args.csv}")
+
+    labels = df["Label"].astype(str).to_numpy()
+    is_malicious = labels != args.benign_label
+    X = preprocess_array(df, loader.encoder, loader.scaler, loader.feature_columns)
+
+    rng = np.random.default_rng(42)
+    validation = rng.random(len(X)) < args.validation_fraction
+    train = ~validation
+
+    gate = xgb.XGBClassifier(
+        n_estimators=args.n_estimators,
+        max_depth=args.max_depth,
+        learning_rate=0.3,
+        objective="binary:logistic",
+        tree_method="hist",
+        random_state=42
+    )
+    gate.fit(X[train], is_malicious[train].astype(int))
+    booster = gate.get_booster()
+    booster.feature_names = list(loader.feature_columns)
+
+    p_malicious = booster.inplace_predict(X, validate_features=False)
+    threshold = pick_threshold(p_malicious[validation], is_malicious[validation], args.target_recall)
+    suspicious = p_malicious >= threshold
+
+    val_mal = validation & is_malicious
+    missed = val_mal & ~suspicious
+    per_class = {
+        label: {
+            "rows": int((labels[val_mal] == label).sum()),
+            "missed": int((labels[missed] == label).sum())
+        }
+        for label in np.unique(labels[val_mal])
+    }
+
+    full_cost = time_per_row(loader.predict_proba, X)
+    gate_cost = time_per_row(lambda rows: booster.inplace_predict(rows, validate_features=False), X)
+    pass_rate = float(suspicious[validation].mean())
+
+    report = {
+        "threshold": threshold,
+        "benign_label": args.benign_label,
+        "target_recall": args.target_recall,
+        "validation": {
+            "rows": int(validation.sum()),
+            "malicious_recall": float(1.0 - missed.sum() / max(val_mal.sum(), 1)),
+            "pass_rate": pass_rate,
+            "per_class": per_class
+        },
+        "cost_us_per_row": {
+            "full": full_cost,
+            "gate": gate_cost,
+            "gated_pipeline": gate_cost + pass_rate * full_cost
+        },
+        "n_estimators": args.n_estimators,
+        "max_depth": args.max_depth
+    }
+
+    print(f"\nThreshold: P(malicious) >= {threshold:.6f}")
+    print(f"Validation recall on malicious rows: {report['validation']['malicious_recall']:.4%}")
+    print(f"Rows reaching the full model: {pass_rate:.2%}")
+    print(f"\n{'class':<30} {'rows':>8} {'missed':>8}")
+    for label, stats in per_class.items():
+        print(f"{label:<30} {stats['rows']:>8} {stats['missed']:>8}")
+    print(
+        f"\nCost per row: full {full_cost:.2f}us, gate {gate_cost:.2f}us, "
+        f"gated pipeline {report['cost_us_per_row']['gated_pipeline']:.2f}us"
+    )
+
+    if not args.dry_run:
+        booster.save_model(args.output)
+        with open(args.meta_output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Gate written to {args.output} and {args.meta_output}")
+
+
+if __name__ == "__main__":
+    main()
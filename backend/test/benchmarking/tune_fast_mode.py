@@ -0,0 +1,133 @@
+"""
+Tune and validate the XGBoost fast-mode thresholds on a labelled CSV
+
+For each candidate prefix length, the script finds the smallest top-2
+probability margin threshold that keeps agreement with the full ensemble
+above --min-agreement on a tuning split, then checks the chosen setting on
+a held-out validation split. The cheapest setting (in boosting rounds per
+row) is written to FAST_MODE_CONFIG_PATH, which ModelLoader picks up.
+
+Usage:
+    python test/benchmarking/tune_fast_mode.py --csv path/to/labelled.csv
+"""
+import os
+import sys
+import json
+import argparse
+import numpy as np
+import pandas as pd
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, BACKEND_DIR)
+
+from common.config import FAST_MODE_CONFIG_PATH, TEST_CSV_PATH  # noqa: E402
+from common.preprocessing import preprocess_array  # noqa: E402
+from model_management.services import ModelLoader  # noqa: E402
+
+
+def top2_margin(proba: np.ndarray) -> np.ndarray:
+    """Gap between the two most likely classes per row"""
+    top2 = np.partition(proba, -2, axis=1)[:, -2:]
+    return top2[:, 1] - top2[:, 0]
+
+
+def evaluate(prefix_proba, full_pred, margin, threshold, y_true):
+    """Agreement, accuracy and escalation rate for one threshold"""
+    escalated = margin < threshold
+    pred = np.where(escalated, full_pred, prefix_proba.argmax(axis=1))
+    result = {
+        "agreement": float((pred == full_pred).mean()),
+        "escalation_rate": float(escalated.mean())
+    }
+    if y_true is not None:
+        known = y_true >= 0
+        result["accuracy"] = float((pred[known] == y_true[known]).mean())
+        result["full_accuracy"] = float((full_pred[known] == y_true[known]).mean())
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Tune XGBoost fast-mode thresholds")
+    parser.add_argument("--csv", default=TEST_CSV_PATH, help="Labelled CSV (with a Label column)")
+    parser.add_argument("--iterations", default="50,100,200,300", help="Comma-separated prefix lengths to try")
+    parser.add_argument("--min-agreement", type=float, default=0.999, help="Required agreement with the full model")
+    parser.add_argument("--validation-fraction", type=float, default=0.5, help="Share of rows held out for validation")
+    parser.add_argument("--output", default=FAST_MODE_CONFIG_PATH, help="Where to write the tuned thresholds")
+    parser.add_argument("--dry-run", action="store_true", help="Report only, do not write the config")
+    args = parser.parse_args()
+
+    loader = ModelLoader()
+    df = pd.read_csv(args.csv)
+    print(f"Loaded {len(df)} rows from {args.csv}")
+
+    y_true = None
+    if "Label" in df.columns:
+        known = df["Label"].isin(loader.encoder.classes_)
+        y_true = np.full(len(df), -1)
+        y_true[known.to_numpy()] = loader.encoder.transform(df.loc[known, "Label"])
+
+    X = preprocess_array(df, loader.encoder, loader.scaler, loader.feature_columns)
+    full_pred = loader.predict_proba(X).argmax(axis=1)
+    total_iterations = loader.model.get_booster().num_boosted_rounds()
+
+    rng = np.random.default_rng(42)
+    validation = rng.random(len(X)) < args.validation_fraction
+    tuning = ~validation
+
+    thresholds = np.linspace(0.0, 1.0, 201)
+    best = None
+    print(f"\n{'rounds':>7} {'threshold':>10} {'escalated':>10} {'agreement':>10} {'cost/row':>9}")
+    for iterations in (int(i) for i in args.iterations.split(",")):
+        if iterations >= total_iterations:
+            continue
+        prefix_proba = loader.predict_proba(X, iteration_range=(0, iterations))
+        margin = top2_margin(prefix_proba)
+
+        chosen = None
+        for threshold in thresholds:
+            stats = evaluate(
+                prefix_proba[tuning], full_pred[tuning], margin[tuning], threshold,
+                None if y_true is None else y_true[tuning]
+            )
+            if stats["agreement"] >= args.min_agreement:
+                chosen = (threshold, stats)
+                break
+        if chosen is None:
+            print(f"{iterations:>7} {'-':>10} {'-':>10} {'-':>10} {'-':>9}")
+            continue
+
+        threshold, stats = chosen
+        cost = iterations + stats["escalation_rate"] * total_iterations
+        print(
+            f"{iterations:>7} {threshold:>10.3f} {stats['escalation_rate']:>10.2%} "
+            f"{stats['agreement']:>10.4%} {cost:>9.1f}"
+        )
+        if best is None or cost < best["cost_rounds_per_row"]:
+            validated = evaluate(
+                prefix_proba[validation], full_pred[validation], margin[validation], threshold,
+                None if y_true is None else y_true[validation]
+            )
+            best = {
+                "iterations": iterations,
+                "margin_threshold": float(threshold),
+                "cost_rounds_per_row": float(cost),
+                "full_rounds": int(total_iterations),
+                "tuning": stats,
+                "validation": validated,
+                "rows": {"tuning": int(tuning.sum()), "validation": int(validation.sum())}
+            }
+
+    if best is None:
+        print("\nNo prefix reached the required agreement, fast mode config not written")
+        return
+
+    print(f"\nSelected: {best['iterations']} rounds, margin < {best['margin_threshold']:.3f} escalates")
+    print(f"Validation: {json.dumps(best['validation'], indent=2)}")
+    if not args.dry_run:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(best, f, indent=2)
+        print(f"Written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
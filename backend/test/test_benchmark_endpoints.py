@@ -0,0 +1,76 @@
+"""
+Endpoint tests for the XGBoost vs MLP comparison
+"""
+import io
+import json
+import pytest
+import numpy as np
+import pandas as pd
+from unittest.mock import Mock, patch
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+from benchmarking import endpoints
+from benchmarking.services import BenchmarkingService
+
+
+CSV = b"Flow Duration,Label\n10,BENIGN\n20,DDoS\n30,BENIGN\n40,DDoS\n"
+
+
+def _loader(probabilities):
+    loader = Mock()
+    loader.classes_ = np.array([0, 1])
+    loader.encoder = LabelEncoder().fit(['BENIGN', 'DDoS'])
+    loader.scaler = StandardScaler().fit(pd.DataFrame({'Flow Duration': [10.0, 20.0, 30.0, 40.0]}))
+    loader.feature_columns = ['Flow Duration']
+    loader.input_scaled = True
+    loader.predict_proba.side_effect = lambda X: np.asarray(probabilities[:len(X)])
+    return loader
+
+
+@pytest.fixture
+def client():
+    """Benchmark router over two mocked models that disagree on the last row"""
+    xgboost = _loader([[0.9, 0.1], [0.2, 0.8], [0.7, 0.3], [0.4, 0.6]])
+    mlp = _loader([[0.8, 0.2], [0.1, 0.9], [0.6, 0.4], [0.7, 0.3]])
+    with patch('benchmarking.services.get_model_loader', return_value=xgboost), \
+            patch('benchmarking.services.get_mlp_model_loader', return_value=mlp):
+        service = BenchmarkingService()
+
+    app = FastAPI()
+    app.include_router(endpoints.router)
+    with patch('benchmarking.endpoints.get_benchmarking_service', return_value=service):
+        yield TestClient(app)
+
+
+def test_compare_json_keeps_per_row_results(client):
+    """JSON results list every row for both models"""
+    response = client.post('/benchmark/compare', files={'file': ('flows.csv', CSV)})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert len(body['xgboost']['results']) == len(body['mlp']['results']) == 4
+    assert body['comparison']['agreements'] == 3
+
+
+def test_compare_npz_returns_columns_without_row_results(client):
+    """Binary formats carry each row as columns and drop the per-row result lists"""
+    response = client.post('/benchmark/compare?format=npz', files={'file': ('flows.csv', CSV)})
+
+    assert response.status_code == 200
+    assert response.headers['content-type'] == 'application/x-npz'
+    archive = np.load(io.BytesIO(response.content))
+    assert sorted(archive.files) == sorted([
+        'xgboost_prediction', 'xgboost_prediction_label', 'xgboost_confidence',
+        'mlp_prediction', 'mlp_prediction_label', 'mlp_confidence',
+        'label', 'agree', 'summary'
+    ])
+    assert len(archive['xgboost_prediction']) == 4
+    assert archive['agree'].tolist() == [True, True, True, False]
+    assert list(archive['label']) == ['BENIGN', 'DDoS', 'BENIGN', 'DDoS']
+
+    summary = json.loads(str(archive['summary']))
+    assert 'results' not in summary['xgboost'] and 'results' not in summary['mlp']
+    assert summary['comparison']['total_samples'] == 4
+    assert summary['file_info']['analyzed_rows'] == 4
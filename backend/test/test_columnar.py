@@ -0,0 +1,74 @@
+"""
+Unit tests for columnar result formats and content negotiation
+"""
+import io
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from common import columnar
+from common.columnar import encode_columns, negotiate_format
+
+
+COLUMNS = {
+    'prediction': np.array([0, 2, 1]),
+    'prediction_label': pd.Categorical.from_codes([0, 2, 1], categories=['BENIGN', 'DDoS', 'PortScan']),
+    'confidence': np.array([0.9, 0.6, 0.75], dtype=np.float32),
+    'label': pd.Categorical(['BENIGN', None, 'PortScan'])
+}
+SUMMARY = {'total_samples': 3, 'by_label': {'BENIGN': 1, 'DDoS': 1, 'PortScan': 1}}
+
+
+def test_negotiate_format():
+    """?format= wins, then the most preferred known Accept type, else JSON"""
+    assert negotiate_format(None) == 'json'
+    assert negotiate_format('application/json, text/plain, */*') == 'json'
+    assert negotiate_format('text/csv') == 'json'
+    assert negotiate_format('application/x-npz') == 'npz'
+    assert negotiate_format('application/json;q=0.5, application/x-npz') == 'npz'
+    assert negotiate_format('application/x-npz;q=0, */*;q=0.1') == 'json'
+    assert negotiate_format('application/x-npz', 'JSON') == 'json'
+
+    with pytest.raises(ValueError, match='Unknown result format'):
+        negotiate_format(None, 'xml')
+
+
+def test_arrow_formats_need_pyarrow(monkeypatch):
+    monkeypatch.setattr(columnar, 'pa', None)
+
+    assert columnar.available_formats() == ['json', 'npz']
+    with pytest.raises(ValueError, match='require pyarrow'):
+        negotiate_format('application/vnd.apache.arrow.stream')
+    with pytest.raises(ValueError, match='require pyarrow'):
+        negotiate_format(None, 'parquet')
+
+
+def test_npz_round_trip():
+    """Categoricals become plain strings; the summary travels as JSON"""
+    data = np.load(io.BytesIO(encode_columns(COLUMNS, 'npz', SUMMARY)))
+
+    assert data['prediction'].tolist() == [0, 2, 1]
+    assert data['prediction_label'].tolist() == ['BENIGN', 'PortScan', 'DDoS']
+    assert data['confidence'].dtype == np.float32
+    assert data['label'].tolist() == ['BENIGN', '', 'PortScan']
+    assert json.loads(str(data['summary'])) == SUMMARY
+
+
+@pytest.mark.parametrize('fmt', ['arrow', 'parquet'])
+def test_arrow_round_trip(fmt):
+    pa = pytest.importorskip('pyarrow')
+    body = encode_columns(COLUMNS, fmt, SUMMARY)
+
+    if fmt == 'arrow':
+        table = pa.ipc.open_stream(body).read_all()
+    else:
+        import pyarrow.parquet as pq
+        table = pq.read_table(io.BytesIO(body))
+    df = table.to_pandas()
+
+    assert df['prediction'].tolist() == [0, 2, 1]
+    assert df['prediction_label'].tolist() == ['BENIGN', 'PortScan', 'DDoS']
+    assert df['label'].isna().tolist() == [False, True, False]
+    assert json.loads(table.schema.metadata[b'summary']) == SUMMARY
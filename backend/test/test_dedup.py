@@ -0,0 +1,31 @@
+"""
+Unit tests for row deduplication
+"""
+import numpy as np
+
+import common.dedup as dedup
+from common.dedup import deduplicate, row_hashes
+
+
+def test_deduplicate_round_trips_rows():
+    """Distinct rows are kept once and the inverse restores the original order"""
+    rng = np.random.default_rng(0)
+    distinct = rng.normal(size=(5, 8)).astype(np.float32)
+    X = distinct[rng.integers(0, 5, size=100)]
+
+    index, inverse = deduplicate(X)
+
+    assert index.size == 5
+    np.testing.assert_array_equal(X[index][inverse], X)
+    assert len(set(row_hashes(X[index]).tolist())) == 5
+
+
+def test_deduplicate_survives_hash_collisions(monkeypatch):
+    """Rows sharing a hash are only merged when they are really equal"""
+    monkeypatch.setattr(dedup, 'row_hashes', lambda X: np.zeros(X.shape[0], dtype=np.uint64))
+    X = np.array([[1.0, 2.0], [3.0, 4.0], [1.0, 2.0]], dtype=np.float32)
+
+    index, inverse = deduplicate(X)
+
+    assert index.size == 2
+    np.testing.assert_array_equal(X[index][inverse], X)
@@ -0,0 +1,143 @@
+"""
+Unit tests for liveness/readiness probes and cached deep health checks
+"""
+import threading
+from unittest.mock import Mock, patch
+
+from model_management.health import CachedHealthCheck, HealthMonitor
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_deep_check_is_cached_and_refreshed_in_background():
+    """Within the TTL no check runs; after it the stale result is served while one refresh runs"""
+    clock = FakeClock()
+    release = threading.Event()
+    calls = []
+
+    def check():
+        calls.append(clock.now)
+        if len(calls) > 1:
+            release.wait(5)
+        return {"status": "healthy", "run": len(calls)}
+
+    cached = CachedHealthCheck("xgboost", check, ttl=30, clock=clock)
+    assert cached.get()["run"] == 1
+    clock.now = 10
+    assert cached.get()["check_age_seconds"] == 10
+    assert len(calls) == 1
+
+    clock.now = 31
+    stale = cached.get()
+    assert stale["run"] == 1 and stale["refreshing"]
+    assert cached.get()["run"] == 1
+    release.set()
+    for thread in threading.enumerate():
+        if thread.name == "health-xgboost":
+            thread.join()
+
+    assert len(calls) == 2
+    assert cached.get()["run"] == 2
+    assert cached.age() == 0
+
+
+def test_failing_check_reports_unhealthy():
+    """Exceptions from the check are cached as an unhealthy result"""
+    cached = CachedHealthCheck("mlp", Mock(side_effect=RuntimeError("boom")), ttl=30)
+
+    result = cached.get()
+    assert result["status"] == "unhealthy"
+    assert result["error"] == "boom"
+
+
+def _join_model_load():
+    for thread in threading.enumerate():
+        if thread.name == "health-model-load":
+            thread.join()
+
+
+def test_readiness_follows_loaded_models_without_loading():
+    """Readiness only reads the model registry and the last deep status"""
+    loader = Mock()
+    loader.is_loaded.return_value = True
+    with patch('model_management.health.get_loaded_model_loader', return_value=None), \
+            patch('model_management.health.get_loaded_mlp_model_loader', return_value=None), \
+            patch('model_management.health.get_model_loader'):
+        monitor = HealthMonitor(ttl=30)
+        assert monitor.readiness()["status"] == "not ready"
+        _join_model_load()
+        assert monitor.liveness()["deep_check_age_seconds"] == {"xgboost": None, "mlp": None}
+
+    with patch('model_management.health.get_loaded_model_loader', return_value=loader), \
+            patch('model_management.health.get_loaded_mlp_model_loader', return_value=None):
+        ready = monitor.readiness()
+        assert ready["status"] == "ready"
+        assert ready["models"]["mlp"]["loaded"] is False
+        loader.health_check.assert_not_called()
+
+
+def test_readiness_loads_model_in_background_once():
+    """Without warmup, a not-ready probe starts one background load and does not wait for it"""
+    release = threading.Event()
+    load = Mock(side_effect=lambda: release.wait(5))
+    with patch('model_management.health.get_loaded_model_loader', return_value=None), \
+            patch('model_management.health.get_loaded_mlp_model_loader', return_value=None), \
+            patch('model_management.health.get_model_loader', load):
+        monitor = HealthMonitor(ttl=30)
+        first = monitor.readiness()
+        second = monitor.readiness()
+        assert first["status"] == second["status"] == "not ready"
+        assert first["loading"] and second["loading"]
+        release.set()
+        _join_model_load()
+
+    assert load.call_count == 1
+    assert monitor._loading is False
+
+
+def test_readiness_retries_a_loader_that_failed_to_load():
+    """An existing but unloaded loader is reloaded rather than returned as is"""
+    loader = Mock()
+    loader.is_loaded.return_value = False
+    with patch('model_management.health.get_loaded_model_loader', return_value=loader), \
+            patch('model_management.health.get_loaded_mlp_model_loader', return_value=None), \
+            patch('model_management.health.get_model_loader') as get_loader:
+        monitor = HealthMonitor(ttl=30)
+        assert monitor.readiness()["loading"]
+        _join_model_load()
+
+    loader.load_model.assert_called_once()
+    get_loader.assert_not_called()
+
+
+def test_readiness_recovers_after_a_failed_deep_check():
+    """A stale unhealthy result is refreshed by readiness, which turns ready again"""
+    clock = FakeClock()
+    loader = Mock()
+    loader.is_loaded.return_value = True
+    loader.health_check.side_effect = [{"status": "unhealthy"}, {"status": "healthy"}]
+    with patch('model_management.health.get_loaded_model_loader', return_value=loader), \
+            patch('model_management.health.get_loaded_mlp_model_loader', return_value=None), \
+            patch('model_management.health.get_model_loader', return_value=loader):
+        monitor = HealthMonitor(ttl=30)
+        monitor.deep_checks["xgboost"]._clock = clock
+        assert monitor.deep("xgboost")["status"] == "unhealthy"
+
+        clock.now = 10
+        assert monitor.readiness()["status"] == "not ready"
+        assert loader.health_check.call_count == 1
+
+        clock.now = 31
+        monitor.readiness()
+        for thread in threading.enumerate():
+            if thread.name == "health-xgboost":
+                thread.join()
+        assert monitor.readiness()["status"] == "ready"
+
+    assert loader.health_check.call_count == 2
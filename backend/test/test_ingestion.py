@@ -0,0 +1,129 @@
+"""
+Unit tests for dataset ingestion
+"""
+import gzip
+import lzma
+import numpy as np
+import pytest
+from io import BytesIO
+from tempfile import SpooledTemporaryFile
+
+from common.ingestion import read_csv, read_upload, upload_format, frame_from_json
+
+
+CSV = b"Flow Duration,Total Fwd Packets,Label\n10,1.5,BENIGN\n20,inf,DDoS\n30,,BENIGN\n"
+
+
+def test_read_csv_float32_parses_numeric_columns_directly():
+    """Numeric columns come out as float32, text columns are untouched"""
+    df = read_csv(BytesIO(CSV), float32=True)
+
+    assert df['Flow Duration'].dtype == np.float32
+    assert df['Total Fwd Packets'].dtype == np.float32
+    assert np.isinf(df['Total Fwd Packets'][1]) and np.isnan(df['Total Fwd Packets'][2])
+    assert list(df['Label']) == ['BENIGN', 'DDoS', 'BENIGN']
+    assert read_csv(BytesIO(CSV), float32=False)['Flow Duration'].dtype == np.int64
+
+
+def test_read_csv_float32_falls_back_when_sniffing_is_wrong(monkeypatch):
+    """A column that looks numeric in the first rows but is not still parses"""
+    import common.ingestion as ingestion
+
+    monkeypatch.setattr(ingestion, '_SNIFF_ROWS', 1)
+    data = b"a,b\n1,2\nx,3\n"
+
+    df = read_csv(BytesIO(data), float32=True)
+
+    assert list(df['a']) == ['1', 'x']
+    assert df['b'].dtype == np.float32
+
+
+def test_upload_format_from_file_name():
+    assert upload_format('flows.CSV') == 'csv'
+    assert upload_format('flows.csv.gz') == 'csv'
+    assert upload_format('flows.parquet') == 'parquet'
+    assert upload_format('flows.feather') == 'arrow'
+    assert upload_format('flows.txt') is None
+    assert upload_format('flows.gz') is None
+
+
+@pytest.mark.parametrize('name, compress', [('flows.csv.gz', gzip.compress), ('flows.csv.xz', lzma.compress)])
+def test_read_upload_decompresses_and_projects_columns(name, compress):
+    """Compressed CSVs are parsed as a stream; projection ignores case and unknown names"""
+    df = read_upload(
+        BytesIO(compress(CSV)),
+        name,
+        float32=True,
+        columns=['flow duration', 'Label', 'Not In File']
+    )
+
+    assert list(df.columns) == ['Flow Duration', 'Label']
+    assert df['Flow Duration'].dtype == np.float32
+    assert list(df['Label']) == ['BENIGN', 'DDoS', 'BENIGN']
+
+
+def test_read_upload_rejects_unknown_types():
+    with pytest.raises(ValueError, match='Unsupported file type'):
+        read_upload(BytesIO(CSV), 'flows.txt')
+
+
+@pytest.mark.parametrize('suffix', ['.parquet', '.arrow', '.arrows'])
+def test_read_upload_columnar(tmp_path, suffix):
+    """Parquet and Arrow IPC (file and stream) uploads, from disk and from memory"""
+    pa = pytest.importorskip('pyarrow')
+    import pyarrow.parquet as pq
+
+    table = pa.table({
+        'Flow Duration': [10, 20, 30],
+        'Unused': [1.0, 2.0, 3.0],
+        'Label': ['BENIGN', 'DDoS', 'BENIGN']
+    })
+    path = tmp_path / f'flows{suffix}'
+    if suffix == '.parquet':
+        pq.write_table(table, path)
+    else:
+        new_writer = pa.ipc.new_file if suffix == '.arrow' else pa.ipc.new_stream
+        with new_writer(str(path), table.schema) as writer:
+            writer.write_table(table)
+
+    # Uploads arrive as SpooledTemporaryFiles, in memory or rolled to disk
+    spooled = [SpooledTemporaryFile(max_size=max_size) for max_size in (1 << 20, 1)]
+    for upload in spooled:
+        upload.write(path.read_bytes())
+        upload.seek(0)
+
+    with open(path, 'rb') as f:
+        for source in (path, BytesIO(path.read_bytes()), f, *spooled):
+            df = read_upload(source, path.name, float32=True, columns=['flow duration', 'label'])
+
+            assert list(df.columns) == ['Flow Duration', 'Label']
+            assert df['Flow Duration'].dtype == np.float32
+            assert list(df['Label']) == ['BENIGN', 'DDoS', 'BENIGN']
+            assert not getattr(source, 'closed', False)
+
+
+@pytest.mark.parametrize('payload', [
+    [{'Flow Duration': 10, 'Label': 'BENIGN'}, {'Flow Duration': 20.5, 'Label': 'DDoS'}],
+    {'Flow Duration': [10, 20.5], 'Label': ['BENIGN', 'DDoS']},
+    {'columns': ['Flow Duration', 'Label'], 'rows': [[10, 'BENIGN'], [20.5, 'DDoS']]}
+])
+def test_frame_from_json_layouts(payload):
+    """Records, columns and header + rows all give the same frame"""
+    df = frame_from_json(payload, float32=True)
+
+    assert list(df.columns) == ['Flow Duration', 'Label']
+    assert df['Flow Duration'].dtype == np.float32
+    assert df['Flow Duration'].tolist() == [10.0, 20.5]
+    assert list(df['Label']) == ['BENIGN', 'DDoS']
+
+
+@pytest.mark.parametrize('payload, message', [
+    ([1, 2], 'JSON objects'),
+    ({'a': 1}, 'Expected a list of records'),
+    ({'a': [1], 'b': [1, 2]}, 'same length'),
+    ({'columns': ['a'], 'rows': [[1, 2]]}, 'columns'),
+    ({'columns': ['a'], 'rows': []}, 'no samples')
+])
+def test_frame_from_json_rejects_invalid_payloads(payload, message):
+    with pytest.raises(ValueError, match=message):
+        frame_from_json(payload)
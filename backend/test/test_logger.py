@@ -0,0 +1,48 @@
+"""
+Unit tests for rate-limited and queued logging
+"""
+import queue
+import logging
+
+from common.logger import RateLimitFilter, DeferredQueueHandler
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _record(msg='scored %d rows', level=logging.INFO, lineno=10):
+    return logging.LogRecord('test', level, 'services.py', lineno, msg, (5,), None)
+
+
+def test_rate_limit_per_call_site_reports_suppressed():
+    """Each call site gets its own budget; warnings are never limited"""
+    clock = FakeClock()
+    limit = RateLimitFilter(rate=1, burst=2, clock=clock)
+
+    assert [limit.filter(_record()) for _ in range(4)] == [True, True, False, False]
+    assert limit.filter(_record(lineno=11))
+    assert limit.filter(_record(level=logging.WARNING))
+
+    clock.now = 1.0
+    record = _record()
+    assert limit.filter(record)
+    assert record.getMessage() == 'scored 5 rows (2 similar messages suppressed)'
+
+
+def test_queue_handler_defers_formatting_and_drops_on_overflow():
+    """Records are queued unformatted; a full queue drops instead of blocking"""
+    handler = DeferredQueueHandler(queue.Queue(1))
+    record = _record()
+
+    handler.emit(record)
+    handler.emit(_record())
+
+    queued = handler.queue.get_nowait()
+    assert queued is record
+    assert queued.msg == 'scored %d rows' and queued.args == (5,)
+    assert handler.dropped == 1
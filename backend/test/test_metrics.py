@@ -0,0 +1,39 @@
+"""
+Unit tests for the Prometheus metrics registry
+"""
+from monitoring.metrics import Counter, Gauge, Histogram, MetricsRegistry
+
+
+def test_histogram_renders_cumulative_buckets():
+    """Bucket counts are cumulative and end with +Inf, sum and count"""
+    registry = MetricsRegistry()
+    histogram = registry.register(Histogram('latency_seconds', 'Latency', ('stage',), buckets=(0.1, 1)))
+
+    for value in (0.05, 0.1, 0.5, 3):
+        histogram.observe('infer', value=value)
+
+    lines = registry.render().splitlines()
+    assert lines[:2] == ['# HELP latency_seconds Latency', '# TYPE latency_seconds histogram']
+    assert lines[2:] == [
+        'latency_seconds_bucket{stage="infer",le="0.1"} 2',
+        'latency_seconds_bucket{stage="infer",le="1"} 3',
+        'latency_seconds_bucket{stage="infer",le="+Inf"} 4',
+        'latency_seconds_sum{stage="infer"} 3.65',
+        'latency_seconds_count{stage="infer"} 4',
+    ]
+
+
+def test_counters_and_callback_gauges():
+    """Direct and scrape-time values render with escaped labels"""
+    registry = MetricsRegistry()
+    rows = registry.register(Counter('rows_total', 'Rows', ('model',)))
+    registry.register(Gauge('queue', 'Queue', ('state',), callback=lambda: {('waiting',): 3}))
+
+    rows.inc('xgboost', amount=10)
+    rows.inc('xgboost', amount=5)
+    rows.inc('m"lp')
+
+    text = registry.render()
+    assert 'rows_total{model="xgboost"} 15' in text
+    assert 'rows_total{model="m\\"lp"} 1' in text
+    assert 'queue{state="waiting"} 3' in text
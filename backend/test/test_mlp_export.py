@@ -0,0 +1,81 @@
+"""
+Unit tests for MLP export (scaler / BatchNorm folding)
+"""
+import pytest
+import numpy as np
+from sklearn.preprocessing import StandardScaler, MinMaxScaler
+
+from model_management.mlp_export import scaler_affine, extract_dense_layers, fold_scaler, build_folded_model
+
+tf = pytest.importorskip("tensorflow")
+keras = tf.keras
+
+
+@pytest.fixture
+def raw_features():
+    """Raw, unscaled features with very different magnitudes per column"""
+    rng = np.random.default_rng(0)
+    return rng.normal(size=(64, 6)) * np.array([1, 10, 100, 1e3, 1e4, 0.1]) + 50
+
+
+@pytest.fixture
+def mlp_model():
+    """Small MLP mixing Dense, BatchNormalization and Dropout layers"""
+    keras.utils.set_random_seed(0)
+    model = keras.Sequential([
+        keras.Input(shape=(6,)),
+        keras.layers.Dense(16),
+        keras.layers.BatchNormalization(),
+        keras.layers.Activation("relu"),
+        keras.layers.Dropout(0.2),
+        keras.layers.Dense(8, activation="relu"),
+        keras.layers.BatchNormalization(),
+        keras.layers.Dense(4, activation="softmax")
+    ])
+    # Give BatchNorm non-trivial statistics
+    rng = np.random.default_rng(1)
+    for layer in model.layers:
+        if isinstance(layer, keras.layers.BatchNormalization):
+            n = layer.get_weights()[0].shape[0]
+            layer.set_weights([
+                rng.uniform(0.5, 2.0, n),
+                rng.normal(size=n),
+                rng.normal(size=n),
+                rng.uniform(0.5, 3.0, n)
+            ])
+    return model
+
+
+def test_scaler_affine_matches_transform(raw_features):
+    """Affine form reproduces the scalers it supports"""
+    for scaler in (StandardScaler(), MinMaxScaler()):
+        scaler.fit(raw_features)
+        a, c = scaler_affine(scaler)
+        np.testing.assert_allclose(raw_features * a + c, scaler.transform(raw_features), rtol=1e-10, atol=1e-10)
+
+
+def test_extract_dense_layers_folds_batch_norm(mlp_model):
+    """BatchNorm and Dropout layers disappear after extraction"""
+    layers = extract_dense_layers(mlp_model)
+
+    assert [layer["activation"] for layer in layers] == ["relu", "relu", "softmax"]
+    assert layers[0]["kernel"].shape == (6, 16)
+
+
+def test_folded_model_matches_scaled_original(mlp_model, raw_features):
+    """Folded model on raw features matches the original on scaled features"""
+    scaler = StandardScaler().fit(raw_features)
+
+    expected = mlp_model.predict(scaler.transform(raw_features), verbose=0)
+    folded = build_folded_model(mlp_model, scaler)
+    actual = folded.predict(raw_features, verbose=0)
+
+    np.testing.assert_allclose(actual, expected, atol=1e-5)
+
+
+def test_fold_scaler_rejects_mismatched_width(mlp_model, raw_features):
+    """Scaler and first layer must agree on the number of features"""
+    scaler = StandardScaler().fit(raw_features[:, :4])
+
+    with pytest.raises(ValueError):
+        fold_scaler(extract_dense_layers(mlp_model), scaler)
@@ -0,0 +1,82 @@
+"""
+Unit tests for the NumPy MLP inference engine
+"""
+import pytest
+import numpy as np
+from sklearn.preprocessing import StandardScaler
+
+from model_management.mlp_numpy import NumpyMLP
+from model_management.mlp_export import extract_dense_layers, export_npz
+
+tf = pytest.importorskip("tensorflow")
+keras = tf.keras
+
+
+@pytest.fixture
+def keras_mlp():
+    """Small softmax classifier with BatchNorm and Dropout"""
+    keras.utils.set_random_seed(0)
+    return keras.Sequential([
+        keras.Input(shape=(10,)),
+        keras.layers.Dense(32, activation="relu"),
+        keras.layers.BatchNormalization(),
+        keras.layers.Dropout(0.3),
+        keras.layers.Dense(16, activation="tanh"),
+        keras.layers.Dense(5, activation="softmax")
+    ])
+
+
+@pytest.fixture
+def features():
+    rng = np.random.default_rng(42)
+    return rng.normal(size=(200, 10)) * 5 + 3
+
+
+def test_numpy_engine_matches_keras(keras_mlp, features):
+    """Forward pass matches Keras within float32 tolerance"""
+    engine = NumpyMLP(extract_dense_layers(keras_mlp))
+
+    expected = keras_mlp.predict(features, verbose=0)
+    actual = engine.predict(features)
+
+    assert actual.dtype == np.float32
+    np.testing.assert_allclose(actual, expected, atol=1e-5)
+
+
+def test_npz_roundtrip_with_folded_scaler(keras_mlp, features, tmp_path):
+    """Exported archive with folded scaler reproduces model(scaler(x))"""
+    scaler = StandardScaler().fit(features)
+    path = tmp_path / "mlp.npz"
+
+    export_npz(keras_mlp, str(path), scaler)
+    engine = NumpyMLP.load(str(path))
+
+    assert engine.input_scaled is False
+    assert engine.input_dim == 10 and engine.output_dim == 5
+    expected = keras_mlp.predict(scaler.transform(features), verbose=0)
+    np.testing.assert_allclose(engine.predict(features), expected, atol=1e-5)
+
+
+def test_rejects_wrong_input_width(keras_mlp):
+    """Inputs with the wrong number of features are refused"""
+    engine = NumpyMLP(extract_dense_layers(keras_mlp))
+
+    with pytest.raises(ValueError):
+        engine.predict(np.zeros((2, 3)))
+
+
+def test_float16_archive_keeps_predictions(keras_mlp, features, tmp_path):
+    """Half-precision weights halve the archive and stay close to float32"""
+    scaled = StandardScaler().fit_transform(features)
+    full_path, half_path = tmp_path / "mlp.npz", tmp_path / "mlp_fp16.npz"
+
+    export_npz(keras_mlp, str(full_path))
+    export_npz(keras_mlp, str(half_path), dtype=np.float16)
+
+    assert half_path.stat().st_size < full_path.stat().st_size
+    expected = NumpyMLP.load(str(full_path)).predict(scaled)
+    actual = NumpyMLP.load(str(half_path)).predict(scaled)
+    assert actual.dtype == np.float32
+    np.testing.assert_allclose(actual, expected, atol=5e-3)
+    with pytest.raises(ValueError):
+        export_npz(keras_mlp, str(half_path), StandardScaler().fit(features), dtype=np.float16)
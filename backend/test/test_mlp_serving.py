@@ -0,0 +1,47 @@
+"""
+Unit tests for the fixed-shape MLP serving functions
+"""
+import pytest
+import numpy as np
+
+from model_management.mlp_serving import BucketedPredictor
+
+tf = pytest.importorskip("tensorflow")
+keras = tf.keras
+
+
+@pytest.fixture
+def keras_mlp():
+    keras.utils.set_random_seed(0)
+    return keras.Sequential([
+        keras.Input(shape=(10,)),
+        keras.layers.Dense(16, activation="relu"),
+        keras.layers.Dense(5, activation="softmax")
+    ])
+
+
+def test_any_batch_size_reuses_bucket_functions(keras_mlp):
+    """Padding and splitting onto buckets matches model.predict without retracing"""
+    features = np.random.default_rng(0).normal(size=(200, 10))
+    predictor = BucketedPredictor(keras_mlp, 10, [1, 8, 64])
+    predictor.warmup()
+    traced = predictor.trace_count
+
+    for n_rows in (1, 3, 8, 9, 50, 64, 200, 0):
+        actual = predictor.predict(features[:n_rows])
+        assert actual.shape == (n_rows, 5)
+        if n_rows:
+            np.testing.assert_allclose(actual, keras_mlp.predict(features[:n_rows], verbose=0), atol=1e-5)
+
+    assert traced == 3
+    assert predictor.trace_count == traced
+
+
+def test_plan_limits_padding(keras_mlp):
+    """Tails are padded at most 2x, otherwise split onto smaller buckets"""
+    predictor = BucketedPredictor(keras_mlp, 10, [1, 8, 64, 512])
+
+    assert predictor._plan(1100) == [512, 512, 64, 8, 4]
+    assert predictor._plan(5) == [5]
+    assert predictor._plan(3) == [1, 1, 1]
+    assert sum(predictor._plan(777)) == 777
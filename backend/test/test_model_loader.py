@@ -0,0 +1,145 @@
+"""
+Unit tests for the XGBoost model loader inference backends
+"""
+import json
+import pytest
+import joblib
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from sklearn.preprocessing import StandardScaler, LabelEncoder
+
+import model_management.services as services
+from model_management.services import ModelLoader
+
+
+@pytest.fixture
+def model_artifacts(tmp_path, monkeypatch):
+    """Train a tiny model and point the loader's paths at it"""
+    rng = np.random.default_rng(0)
+    columns = [f'feature_{i}' for i in range(6)]
+    X = pd.DataFrame(rng.normal(size=(400, 6)), columns=columns)
+    labels = rng.choice(['BENIGN', 'DDoS', 'PortScan'], 400)
+
+    encoder = LabelEncoder().fit(labels)
+    scaler = StandardScaler().fit(X)
+    model = xgb.XGBClassifier(n_estimators=15, max_depth=3)
+    model.fit(pd.DataFrame(scaler.transform(X), columns=columns), encoder.transform(labels))
+
+    paths = {
+        'MODEL_PATH': tmp_path / 'model.json',
+        'ENCODER_PATH': tmp_path / 'encoder.pkl',
+        'SCALER_PATH': tmp_path / 'scaler.pkl',
+        'FEATURE_COLUMNS_PATH': tmp_path / 'feature_columns.json',
+        'FAST_MODE_CONFIG_PATH': tmp_path / 'fast_mode.json',
+        'GATE_MODEL_PATH': tmp_path / 'gate.json',
+        'GATE_META_PATH': tmp_path / 'gate_meta.json'
+    }
+    model.save_model(str(paths['MODEL_PATH']))
+    joblib.dump(encoder, paths['ENCODER_PATH'])
+    joblib.dump(scaler, paths['SCALER_PATH'])
+    paths['FEATURE_COLUMNS_PATH'].write_text(json.dumps(columns))
+    for name, path in paths.items():
+        monkeypatch.setattr(services, name, str(path))
+
+    return model, scaler.transform(X).astype(np.float32)
+
+
+@pytest.fixture
+def gate_artifacts(model_artifacts, tmp_path):
+    """Train a binary gate next to the model and return its booster"""
+    model, X = model_artifacts
+    malicious = (model.predict(X) != 0).astype(int)
+    gate = xgb.XGBClassifier(n_estimators=10, max_depth=3).fit(X, malicious)
+    booster = gate.get_booster()
+    booster.feature_names = [f'feature_{i}' for i in range(6)]
+    booster.save_model(str(tmp_path / 'gate.json'))
+    (tmp_path / 'gate_meta.json').write_text(json.dumps({'threshold': 0.5}))
+    return model, X, booster
+
+
+def test_native_backend_matches_sklearn(model_artifacts, monkeypatch):
+    """inplace_predict on float32 arrays matches the sklearn wrapper"""
+    model, X = model_artifacts
+    monkeypatch.setattr(services, 'XGB_FOREST_MAX_ROWS', 0)
+
+    loader = ModelLoader(backend='native')
+
+    assert loader.booster is not None
+    np.testing.assert_allclose(loader.predict_proba(X), model.predict_proba(X), atol=1e-6)
+    np.testing.assert_allclose(
+        loader.predict_proba(X, iteration_range=(0, 5)),
+        model.predict_proba(X, iteration_range=(0, 5)),
+        atol=1e-6
+    )
+
+
+def test_small_batches_use_forest_evaluator(model_artifacts, monkeypatch):
+    """Batches up to XGB_FOREST_MAX_ROWS bypass the xgboost wrapper"""
+    model, X = model_artifacts
+    monkeypatch.setattr(services, 'XGB_FOREST_MAX_ROWS', 4)
+
+    loader = ModelLoader(backend='sklearn')
+    loader.model.predict_proba = None  # would fail if called
+
+    np.testing.assert_allclose(loader.predict_proba(X[:3]), model.predict_proba(X[:3]), atol=1e-6)
+
+
+def test_health_check_reports_backend(model_artifacts):
+    """Health check runs a real prediction through the configured backend"""
+    result = ModelLoader(backend='native').health_check()
+
+    assert result['status'] == 'healthy'
+    assert result['backend'] == 'native'
+
+
+def test_tiered_prediction_escalates_low_margin_rows(model_artifacts, monkeypatch):
+    """Escalated rows get full-model scores, the rest keep prefix scores"""
+    model, X = model_artifacts
+    monkeypatch.setattr(services, 'XGB_FOREST_MAX_ROWS', 0)
+    loader = ModelLoader(backend='native')
+
+    proba, escalated = loader.predict_proba_tiered(X, iterations=3, margin_threshold=0.2)
+
+    prefix = model.predict_proba(X, iteration_range=(0, 3))
+    full = model.predict_proba(X)
+    assert 0 < escalated.sum() < len(X)
+    np.testing.assert_allclose(proba[escalated], full[escalated], atol=1e-6)
+    np.testing.assert_allclose(proba[~escalated], prefix[~escalated], atol=1e-6)
+    assert loader.fast_mode_stats == {'rows': len(X), 'escalated': int(escalated.sum())}
+
+
+def test_gate_filter_marks_benign_rows(gate_artifacts, monkeypatch):
+    """Rows under the gate threshold get BENIGN-dominated probabilities"""
+    model, X, booster = gate_artifacts
+    monkeypatch.setattr(services, 'XGB_FOREST_MAX_ROWS', 4)
+    loader = ModelLoader(backend='native')
+
+    proba, suspicious = loader.gate_filter(X)
+
+    p_malicious = booster.inplace_predict(X)
+    np.testing.assert_array_equal(suspicious, p_malicious >= 0.5)
+    np.testing.assert_allclose(proba[:, 0], 1.0 - p_malicious, atol=1e-6)
+    np.testing.assert_allclose(proba.sum(axis=1), 1.0, atol=1e-6)
+    np.testing.assert_allclose(loader.predict_gate(X[:2]), p_malicious[:2], atol=1e-6)
+    assert loader.gate_stats == {'rows': len(X), 'passed': int(suspicious.sum())}
+
+
+def test_sparse_input_matches_dense(gate_artifacts, monkeypatch):
+    """CSR rows score like their dense form although absent entries read as missing"""
+    import scipy.sparse as sp
+
+    model, X, booster = gate_artifacts
+    X = np.where(np.abs(X) < 0.7, 0, X).astype(np.float32)
+    monkeypatch.setattr(services, 'XGB_FOREST_MAX_ROWS', 4)
+    loader = ModelLoader(backend='native')
+
+    X_sparse = sp.csr_matrix(X)
+    np.testing.assert_allclose(loader.predict_proba(X_sparse), model.predict_proba(X), atol=1e-6)
+    np.testing.assert_allclose(loader.predict_proba(X_sparse[:2]), model.predict_proba(X[:2]), atol=1e-6)
+    np.testing.assert_allclose(
+        loader.predict_proba(X_sparse, iteration_range=(0, 5)),
+        model.predict_proba(X, iteration_range=(0, 5)),
+        atol=1e-6
+    )
+    np.testing.assert_allclose(loader.predict_gate(X_sparse), booster.inplace_predict(X), atol=1e-6)
@@ -0,0 +1,89 @@
+"""
+Unit tests for the live metrics behind /realtime-metrics
+"""
+import timeit
+import numpy as np
+import pandas as pd
+from unittest.mock import Mock, patch
+
+from benchmarking.services import BenchmarkingService
+from monitoring.services import LiveMetrics
+
+
+class FakeClock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_throughput_windows_drop_old_batches():
+    """Rows leave each rolling window once they are older than it"""
+    clock = FakeClock()
+    metrics = LiveMetrics(clock=clock)
+
+    metrics.record_batch('prediction', 600)
+    clock.now += 120
+    metrics.record_batch('analysis', 300)
+
+    assert metrics.throughput(60) == 300 / 60
+    assert metrics.throughput(300) == 900 / 300
+    clock.now += 900
+    assert metrics.throughput(900) == 0
+    assert metrics.rows_total == 900
+
+
+def test_snapshot_reports_detections_and_events():
+    """Threats are grouped by label and type; BENIGN rows only count as samples"""
+    clock = FakeClock()
+    metrics = LiveMetrics(max_events=2, clock=clock)
+
+    metrics.record_batch('prediction', 10, {'BENIGN': 7, 'DDoS': 3}, labelled=10, correct=9)
+    metrics.record_batch('analysis', 5, {'BENIGN': 5})
+    metrics.record_batch('analysis', 4, {'PortScan': 4})
+    metrics.record_batch('benchmark', 2, {'DoS Hulk': 2})
+
+    snapshot = metrics.snapshot({'xgboost': {'loaded': True}, 'mlp': {'loaded': False}})
+    current = snapshot['current_metrics']
+
+    assert current['samples_processed'] == 21
+    assert current['threats_detected'] == 9
+    assert current['accuracy_current'] == 90.0
+    assert current['samples_by_source'] == {'prediction': 10, 'analysis': 9, 'benchmark': 2}
+    assert snapshot['detections']['by_label'] == {'DDoS': 3, 'PortScan': 4, 'DoS Hulk': 2}
+    assert snapshot['system_status']['model_status'] == 'active'
+    # Bounded event log, newest first
+    assert [e['source'] for e in snapshot['recent_activity']] == ['benchmark', 'analysis']
+    assert snapshot['recent_activity'][0]['counts'] == {'DoS Hulk': 2}
+
+
+def test_record_batch_is_cheap():
+    """Recording a batch stays in the low-microsecond range"""
+    metrics = LiveMetrics()
+    per_call = min(timeit.repeat(lambda: metrics.record_batch('prediction', 100), number=2000, repeat=3)) / 2000
+
+    assert per_call < 50e-6
+
+
+def test_benchmark_compare_counts_rows_once():
+    """The XGBoost and MLP passes over the same upload record one batch"""
+    labels = np.array(['BENIGN', 'DDoS'])
+    loaders = []
+    for _ in range(2):
+        loader = Mock()
+        loader.classes_ = np.array([0, 1])
+        loader.input_scaled = True
+        loader.encoder.inverse_transform.side_effect = lambda y: labels[np.asarray(y)]
+        loader.predict_proba.return_value = np.array([[0.9, 0.1], [0.2, 0.8], [0.6, 0.4]])
+        loaders.append(loader)
+    metrics = LiveMetrics()
+
+    with patch('benchmarking.services.get_model_loader', return_value=loaders[0]), \
+            patch('benchmarking.services.get_mlp_model_loader', return_value=loaders[1]), \
+            patch('benchmarking.services.preprocess_array', return_value=np.zeros((3, 1), dtype=np.float32)), \
+            patch('benchmarking.services.get_live_metrics', return_value=metrics):
+        BenchmarkingService().compare_models(pd.DataFrame({'feature_0': [1.0, 2.0, 3.0]}))
+
+    assert metrics.rows_total == 3
+    assert metrics.rows_by_source == {'benchmark': 3}
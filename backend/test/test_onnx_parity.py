@@ -0,0 +1,167 @@
+"""
+Parity tests for the ONNX exports and OnnxModelLoader
+"""
+import os
+import json
+import pytest
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from sklearn.preprocessing import StandardScaler
+
+onnx = pytest.importorskip("onnx")
+ort = pytest.importorskip("onnxruntime")
+
+from common.config import TEST_CSV_PATH, MODEL_PATH, MLP_MODEL_PATH  # noqa: E402
+from common.preprocessing import preprocess_array  # noqa: E402
+from onnxruntime.quantization import quantize_dynamic, QuantType  # noqa: E402
+from model_management import onnx_loader  # noqa: E402
+from model_management.onnx_export import xgboost_to_onnx, mlp_to_onnx, quantize_int8  # noqa: E402
+from model_management.onnx_loader import OnnxModelLoader  # noqa: E402
+from model_management.mlp_numpy import NumpyMLP  # noqa: E402
+
+
+def run(model, X):
+    session = ort.InferenceSession(model.SerializeToString(), providers=["CPUExecutionProvider"])
+    return session.run(None, {"input": np.ascontiguousarray(X, dtype=np.float32)})[0]
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(300, 6)) * 4 + 2
+    X[::17, 2] = np.nan  # exercise default directions
+    y = (np.nan_to_num(X[:, 0]) + X[:, 1] > 2).astype(int) + (X[:, 3] > 3)
+    return X, y
+
+
+@pytest.mark.parametrize("objective", ["multi:softprob", "binary:logistic"])
+def test_xgboost_export_matches_booster(data, objective):
+    """Tree ensemble graph reproduces predict_proba, including missing values"""
+    X, y = data
+    if objective == "binary:logistic":
+        y = (y > 0).astype(int)
+    model = xgb.XGBClassifier(n_estimators=20, max_depth=4, objective=objective).fit(X, y)
+
+    exported = xgboost_to_onnx(json.loads(model.get_booster().save_raw("json")))
+
+    np.testing.assert_allclose(run(exported, X), model.predict_proba(X), atol=1e-5)
+
+
+def test_mlp_export_with_folded_scaler(data):
+    """MLP graph with the scaler folded in takes raw features"""
+    X, _ = data
+    X = np.nan_to_num(X)
+    rng = np.random.default_rng(1)
+    layers = [
+        {"kernel": rng.normal(size=(6, 16)), "bias": rng.normal(size=16), "activation": "relu"},
+        {"kernel": rng.normal(size=(16, 8)), "bias": rng.normal(size=8), "activation": "swish"},
+        {"kernel": rng.normal(size=(8, 3)), "bias": rng.normal(size=3), "activation": "softmax"}
+    ]
+    scaler = StandardScaler().fit(X)
+
+    exported = mlp_to_onnx(layers, scaler)
+
+    expected = NumpyMLP(layers).predict(scaler.transform(X))
+    np.testing.assert_allclose(run(exported, X), expected, atol=1e-5)
+
+
+def test_int8_quantized_mlp_agrees_with_float32(data, tmp_path, monkeypatch):
+    """Per-channel int8 graph is served by OnnxModelLoader with small drift"""
+    X, _ = data
+    X = np.nan_to_num(X)
+    rng = np.random.default_rng(2)
+    layers = [
+        {"kernel": rng.normal(size=(6, 32)), "bias": rng.normal(size=32), "activation": "relu"},
+        {"kernel": rng.normal(size=(32, 4)) * 0.3, "bias": np.zeros(4), "activation": "softmax"}
+    ]
+    X_scaled = StandardScaler().fit_transform(X)
+    float_path, int8_path = str(tmp_path / "mlp.onnx"), str(tmp_path / "mlp_int8.onnx")
+    onnx.save(mlp_to_onnx(layers), float_path)
+    quantize_int8(float_path, int8_path)
+
+    monkeypatch.setitem(onnx_loader._ARTIFACTS, "mlp", (float_path, None, None, None))
+    monkeypatch.setitem(onnx_loader._PRECISION_PATHS, ("mlp", "int8"), int8_path)
+    monkeypatch.setattr(OnnxModelLoader, "_load_preprocessing_components", lambda self: None)
+    loader = OnnxModelLoader("mlp", precision="int8")
+
+    assert loader.model_path == int8_path
+    assert loader.input_scaled is True
+    expected = run(onnx.load(float_path), X_scaled)
+    actual = loader.predict_proba(X_scaled)
+    assert np.abs(actual - expected).max() < 0.1
+    assert (actual.argmax(axis=1) == expected.argmax(axis=1)).mean() > 0.95
+    with pytest.raises(ValueError):
+        OnnxModelLoader("xgboost", precision="int8")
+
+
+def test_int8_refuses_folded_scaler(data, tmp_path, monkeypatch):
+    """Graphs with the scaler folded in are neither quantized nor served as int8"""
+    X, _ = data
+    rng = np.random.default_rng(3)
+    layers = [{"kernel": rng.normal(size=(6, 4)), "bias": np.zeros(4), "activation": "softmax"}]
+    float_path, int8_path = str(tmp_path / "mlp.onnx"), str(tmp_path / "mlp_int8.onnx")
+    onnx.save(mlp_to_onnx(layers, StandardScaler().fit(np.nan_to_num(X))), float_path)
+
+    with pytest.raises(ValueError, match="without the scaler"):
+        quantize_int8(float_path, int8_path)
+
+    # A graph quantized by other means is refused at load time
+    quantize_dynamic(float_path, int8_path, weight_type=QuantType.QInt8, op_types_to_quantize=["MatMul"])
+    monkeypatch.setitem(onnx_loader._PRECISION_PATHS, ("mlp", "int8"), int8_path)
+    monkeypatch.setattr(OnnxModelLoader, "_load_preprocessing_components", lambda self: None)
+    with pytest.raises(ValueError, match="scaler folded in"):
+        OnnxModelLoader("mlp", precision="int8")
+
+
+@pytest.mark.skipif(
+    not (os.path.exists(TEST_CSV_PATH) and os.path.exists(MODEL_PATH)),
+    reason="test_api.csv or XGBoost model not available"
+)
+def test_onnx_loader_matches_xgboost_on_test_csv(tmp_path):
+    """OnnxModelLoader scores test_api.csv like ModelLoader"""
+    from model_management.services import ModelLoader
+
+    reference = ModelLoader(backend="native")
+    booster_json = json.loads(reference.model.get_booster().save_raw("json"))
+    df = pd.read_csv(TEST_CSV_PATH)
+    X = preprocess_array(df.copy(), reference.encoder, reference.scaler, reference.feature_columns)
+    expected = reference.predict_proba(X)
+
+    plain_path = str(tmp_path / "xgb.onnx")
+    onnx.save(xgboost_to_onnx(booster_json, None, reference.feature_columns), plain_path)
+    loader = OnnxModelLoader("xgboost", model_path=plain_path, intra_op_threads=1)
+    np.testing.assert_allclose(loader.predict_proba(X), expected, atol=1e-5)
+    assert loader.health_check()["status"] == "healthy"
+
+    # Scaler in the graph: inputs are rounded to float32 before scaling
+    scaled_path = str(tmp_path / "xgb_scaled.onnx")
+    onnx.save(xgboost_to_onnx(booster_json, reference.scaler, reference.feature_columns), scaled_path)
+    loader = OnnxModelLoader("xgboost", model_path=scaled_path)
+    raw = preprocess_array(df.copy(), loader.encoder, loader.scaler, loader.feature_columns, scale=loader.input_scaled)
+    assert loader.input_scaled is False
+    agreement = (loader.predict_proba(raw).argmax(axis=1) == expected.argmax(axis=1)).mean()
+    assert agreement >= 0.99
+
+
+@pytest.mark.skipif(
+    not (os.path.exists(TEST_CSV_PATH) and os.path.exists(MLP_MODEL_PATH)),
+    reason="test_api.csv or MLP model not available"
+)
+def test_onnx_loader_matches_mlp_on_test_csv(tmp_path, monkeypatch):
+    """OnnxModelLoader scores test_api.csv like the Keras MLP"""
+    pytest.importorskip("tensorflow")
+    import model_management.mlp_loader as mlp_loader
+    from model_management.mlp_export import extract_dense_layers
+
+    monkeypatch.setattr(mlp_loader, "MLP_FOLD_SCALER", False)
+    reference = mlp_loader.MLPModelLoader(backend="keras")
+    df = pd.read_csv(TEST_CSV_PATH)
+    X = preprocess_array(df.copy(), reference.encoder, reference.scaler, None)
+
+    path = str(tmp_path / "mlp.onnx")
+    onnx.save(mlp_to_onnx(extract_dense_layers(reference.model), reference.scaler), path)
+    loader = OnnxModelLoader("mlp", model_path=path)
+    raw = preprocess_array(df.copy(), loader.encoder, loader.scaler, None, scale=loader.input_scaled)
+
+    np.testing.assert_allclose(loader.predict_proba(raw), reference.predict_proba(X), atol=1e-4)
@@ -0,0 +1,61 @@
+"""
+Unit tests for the single-prediction LRU cache
+"""
+import pytest
+
+from prediction.cache import PredictionCache, feature_key
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_feature_key_normalizes_equivalent_submissions():
+    """Key order, name case and int/float spelling do not change the key"""
+    a = feature_key({'Flow Duration': 10, 'Total Fwd Packets': None}, 'v1')
+    b = feature_key({'total fwd packets': float('nan'), 'flow duration': 10.0}, 'v1')
+
+    assert a == b
+    assert a != feature_key({'Flow Duration': 11, 'Total Fwd Packets': None}, 'v1')
+    assert a != feature_key({'Flow Duration': 10, 'Total Fwd Packets': None}, 'v2')
+
+
+def test_lru_eviction_ttl_and_counters():
+    """Least recently used entries go first; expired entries count as misses"""
+    clock = FakeClock()
+    cache = PredictionCache(2, ttl=10, clock=clock)
+
+    cache.put('a', 'v', {'p': 1})
+    cache.put('b', 'v', {'p': 2})
+    assert cache.get('a', 'v') == {'p': 1}
+    cache.put('c', 'v', {'p': 3})
+
+    assert cache.get('b', 'v') is None
+    assert cache.get('c', 'v') == {'p': 3}
+    clock.now = 11
+    assert cache.get('a', 'v') is None
+
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['evictions'], stats['expirations']) == (2, 2, 1, 1)
+
+
+def test_memory_limit_and_model_swap():
+    """Entries are evicted to fit max_bytes and dropped on a version change"""
+    cache = PredictionCache(100, max_bytes=2000)
+    for i in range(50):
+        cache.put(str(i), 'v1', {'probabilities': {'0': 0.5, '1': 0.5}})
+
+    assert 0 < cache.stats()['entries'] < 50
+    assert cache.bytes <= 2000
+
+    assert cache.get('49', 'v2') is None
+    assert cache.stats()['entries'] == 0 and cache.invalidations == 1
+
+
+def test_cache_requires_an_entry():
+    with pytest.raises(ValueError):
+        PredictionCache(0)
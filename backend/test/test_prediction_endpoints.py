@@ -0,0 +1,110 @@
+"""
+Endpoint tests for bulk JSON scoring
+"""
+import json
+import pytest
+import numpy as np
+import pandas as pd
+from unittest.mock import Mock, patch
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+from prediction import endpoints
+from prediction.services import PredictionService
+from model_management.services import ModelLoader
+
+
+FEATURES = ['Flow Duration', 'Total Fwd Packets']
+RECORDS = [
+    {'Flow Duration': 10, 'Total Fwd Packets': 1},
+    {'Flow Duration': 20, 'Total Fwd Packets': 2},
+    {'Flow Duration': 30, 'Total Fwd Packets': 3}
+]
+
+
+@pytest.fixture
+def client():
+    """Prediction router served by a PredictionService over a mocked model"""
+    loader = Mock(spec=ModelLoader)
+    loader.model = Mock()
+    loader.classes_ = np.array([0, 1])
+    loader.predict_proba.side_effect = lambda X: np.tile([0.9, 0.1], (len(X), 1))
+    loader.encoder = LabelEncoder().fit(['BENIGN', 'DDoS'])
+    loader.scaler = StandardScaler().fit(pd.DataFrame(RECORDS))
+    loader.feature_columns = FEATURES
+    loader.input_scaled = True
+    with patch('prediction.services.get_model_loader', return_value=loader):
+        service = PredictionService()
+
+    app = FastAPI()
+    app.include_router(endpoints.router)
+    with patch('prediction.endpoints.get_prediction_service', return_value=service):
+        yield TestClient(app)
+
+
+def test_bulk_scores_records(client):
+    """A list of records comes back as JSON result columns"""
+    response = client.post('/predict/bulk', json=RECORDS)
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body['summary']['total_samples'] == 3
+    assert body['columns']['prediction_label'] == ['BENIGN'] * 3
+    assert body['columns']['confidence'] == pytest.approx([0.9] * 3)
+
+
+@pytest.mark.parametrize('payload, message', [
+    (b'[{"Flow Duration": 1', 'Invalid bulk payload'),
+    (json.dumps([{'foo': 1}]).encode(), 'No model features'),
+    (json.dumps([{'Flow Duration': 'abc', 'Total Fwd Packets': 1}]).encode(), 'non-numeric')
+])
+def test_bulk_rejects_invalid_payloads(client, payload, message):
+    """Malformed JSON, missing features and non-numeric values are client errors"""
+    response = client.post('/predict/bulk', content=payload, headers={'content-type': 'application/json'})
+
+    assert response.status_code == 400
+    assert message in response.json()['detail']
+
+
+def test_bulk_internal_errors_are_server_errors(client):
+    """A ValueError from scoring a valid payload is not blamed on the client"""
+    with patch.object(PredictionService, 'predict_batch', side_effect=ValueError('model broke')):
+        response = client.post('/predict/bulk', json=RECORDS)
+
+    assert response.status_code == 500
+
+
+def test_bulk_row_limit(client, monkeypatch):
+    """More than BULK_MAX_ROWS samples are refused"""
+    monkeypatch.setattr(endpoints, 'BULK_MAX_ROWS', 2)
+
+    response = client.post('/predict/bulk', json=RECORDS)
+
+    assert response.status_code == 413
+    assert '3 samples' in response.json()['detail']
+
+
+def test_bulk_byte_limit_from_content_length(client, monkeypatch):
+    """A declared body over BULK_MAX_BYTES is refused before it is read"""
+    monkeypatch.setattr(endpoints, 'BULK_MAX_BYTES', 16)
+
+    response = client.post('/predict/bulk', json=RECORDS)
+
+    assert int(response.request.headers['content-length']) > 16
+    assert response.status_code == 413
+
+
+def test_bulk_byte_limit_while_streaming(client, monkeypatch):
+    """A chunked body without Content-Length is cut off once over BULK_MAX_BYTES"""
+    monkeypatch.setattr(endpoints, 'BULK_MAX_BYTES', 16)
+    body = json.dumps(RECORDS).encode()
+
+    def chunks():
+        for start in range(0, len(body), 8):
+            yield body[start:start + 8]
+
+    response = client.post('/predict/bulk', content=chunks(), headers={'content-type': 'application/json'})
+
+    assert 'content-length' not in response.request.headers
+    assert response.status_code == 413
@@ -13,16 +13,18 @@ from model_management.services import ModelLoader
 @pytest.fixture
 def mock_model_loader():
     """Mock model loader for testing"""
+    labels = np.array(['BENIGN', 'DDoS', 'PortScan'])
     loader = Mock(spec=ModelLoader)
     loader.model = Mock()
-    loader.model.classes_ = np.array(['BENIGN', 'DDoS', 'PortScan'])
-    loader.model.predict_proba.return_value = np.array([
+    loader.classes_ = np.array([0, 1, 2])
+    loader.predict_proba.return_value = np.array([
         [0.8, 0.1, 0.1]  # High confidence for BENIGN
     ])
-    loader.model.predict.return_value = np.array(['BENIGN'])
     loader.encoder = Mock()
+    loader.encoder.inverse_transform.side_effect = lambda y: labels[np.asarray(y)]
     loader.scaler = Mock()
     loader.feature_columns = [f'feature_{i}' for i in range(10)]
+    loader.input_scaled = True
     return loader
 
 
@@ -38,11 +40,8 @@ def test_predict_single(prediction_service, mock_model_loader):
     """Test single prediction"""
     features = {f'feature_{i}': 0.5 for i in range(10)}
     
-    with patch('prediction.services.preprocess_dataframe') as mock_preprocess:
-        mock_preprocess.return_value = pd.DataFrame(
-            np.zeros((1, 10)), 
-            columns=[f'feature_{i}' for i in range(10)]
-        )
+    with patch('prediction.services.preprocess_array') as mock_preprocess:
+        mock_preprocess.return_value = np.zeros((1, 10), dtype=np.float32)
         
         result = prediction_service.predict_single(features)
         
@@ -59,16 +58,10 @@ def test_predict_batch(prediction_service, mock_model_loader):
         for i in range(10)
     })
     
-    with patch('prediction.services.preprocess_dataframe') as mock_preprocess:
-        mock_preprocess.return_value = pd.DataFrame(
-            np.zeros((5, 10)), 
-            columns=[f'feature_{i}' for i in range(10)]
-        )
+    with patch('prediction.services.preprocess_array') as mock_preprocess:
+        mock_preprocess.return_value = np.zeros((5, 10), dtype=np.float32)
         
-        mock_model_loader.model.predict.return_value = np.array(
-            ['BENIGN'] * 5
-        )
-        mock_model_loader.model.predict_proba.return_value = np.array([
+        mock_model_loader.predict_proba.return_value = np.array([
             [0.8, 0.1, 0.1] for _ in range(5)
         ])
         
@@ -79,3 +72,151 @@ def test_predict_batch(prediction_service, mock_model_loader):
         assert 'model_metrics' in result
         assert len(result['results']) == 5
 
+
+def test_predict_batch_cascade(prediction_service, mock_model_loader):
+    """Only low-confidence rows are sent to the MLP and blended by label"""
+    df = pd.DataFrame({
+        f'feature_{i}': np.random.rand(3) 
+        for i in range(10)
+    })
+    mock_model_loader.predict_proba.return_value = np.array([
+        [0.95, 0.03, 0.02],
+        [0.40, 0.35, 0.25],
+        [0.02, 0.96, 0.02]
+    ])
+    
+    mlp_loader = Mock()
+    mlp_loader.input_scaled = True
+    mlp_loader.encoder.classes_ = np.array(['PortScan', 'DDoS', 'BENIGN'])
+    mlp_loader.predict_proba.return_value = np.array([[0.0, 1.0, 0.0]])
+    
+    with patch('prediction.services.preprocess_array') as mock_preprocess, \
+            patch('prediction.services.get_mlp_model_loader', return_value=mlp_loader):
+        mock_preprocess.return_value = np.arange(30, dtype=np.float32).reshape(3, 10)
+        
+        result = prediction_service.predict_batch(df, cascade=True)
+    
+    cascade = result['summary']['inference']['cascade']
+    assert cascade['rows_sent_to_mlp'] == 1
+    assert cascade['changed_predictions'] == 1
+    assert len(mock_preprocess.call_args_list[-1][0][0]) == 1
+    assert [r['prediction'] for r in result['results']] == ['0', '1', '1']
+    assert result['summary']['by_label'] == {'DDoS': 2, 'BENIGN': 1}
+
+
+def test_predict_batch_scores_duplicate_rows_once(prediction_service, mock_model_loader):
+    """Identical feature rows reach the model once and share its result"""
+    df = pd.DataFrame({'feature_0': [1.0, 2.0, 1.0, 1.0]})
+    X = np.array([[1.0], [2.0], [1.0], [1.0]], dtype=np.float32)
+    mock_model_loader.predict_proba.side_effect = lambda rows: np.column_stack([
+        rows[:, 0] == 1.0, rows[:, 0] == 2.0, np.zeros(len(rows))
+    ]).astype(float)
+    
+    with patch('prediction.services.preprocess_array', return_value=X):
+        result = prediction_service.predict_batch(df)
+    
+    assert len(mock_model_loader.predict_proba.call_args[0][0]) == 2
+    assert [r['prediction'] for r in result['results']] == ['0', '1', '0', '0']
+    assert result['summary']['inference']['dedup'] == {
+        'unique_rows': 2, 'duplicate_rows': 2, 'dedup_ratio': 2.0
+    }
+
+
+def test_predict_batch_cascade_scores_rows_that_differ_only_for_the_mlp(prediction_service, mock_model_loader):
+    """With the cascade, rows identical to XGBoost keep their own MLP inputs"""
+    df = pd.DataFrame({'feature_0': [1.0, 1.0], 'mlp_only': [0.0, 1.0]})
+    X = np.array([[1.0], [1.0]], dtype=np.float32)
+    mock_model_loader.predict_proba.side_effect = lambda rows: np.tile([0.4, 0.35, 0.25], (len(rows), 1))
+    
+    mlp_loader = Mock()
+    mlp_loader.input_scaled = True
+    mlp_loader.encoder.classes_ = np.array(['BENIGN', 'DDoS', 'PortScan'])
+    # MLP input: the raw mlp_only column, which separates the two rows
+    mlp_loader.predict_proba.side_effect = lambda rows: np.eye(3)[rows[:, 0].astype(int)]
+    
+    def preprocess(frame, encoder, *args, **kwargs):
+        return frame[['mlp_only']].to_numpy() if encoder is mlp_loader.encoder else X[:len(frame)]
+    
+    with patch('prediction.services.preprocess_array', side_effect=preprocess), \
+            patch('prediction.services.get_mlp_model_loader', return_value=mlp_loader), \
+            patch('prediction.services.DEDUP_MODE', True):
+        result = prediction_service.predict_batch(df, cascade=True)
+    
+    assert [r['prediction'] for r in result['results']] == ['0', '1']
+    assert 'dedup' not in result['summary']['inference']
+
+
+def test_predict_batch_reports_unavailable_gate(prediction_service, mock_model_loader):
+    """Requesting the gate without a gate model scores every row and says so"""
+    df = pd.DataFrame({'feature_0': [1.0, 2.0]})
+    mock_model_loader.gate = None
+    mock_model_loader.predict_proba.return_value = np.array([[0.8, 0.1, 0.1], [0.1, 0.8, 0.1]])
+    
+    with patch('prediction.services.preprocess_array', return_value=np.array([[1.0], [2.0]], dtype=np.float32)):
+        gated = prediction_service.predict_batch(df, gate=True)
+        plain = prediction_service.predict_batch(df, gate=False)
+    
+    assert gated['summary']['inference']['gate_applied'] is False
+    assert 'gate_applied' not in plain['summary']['inference']
+    assert [r['prediction'] for r in gated['results']] == ['0', '1']
+
+
+def test_predict_batch_fills_result_columns(prediction_service, mock_model_loader):
+    """Binary result formats get every row as arrays instead of row dicts"""
+    df = pd.DataFrame({'feature_0': [1.0, 2.0, 3.0], 'Label': ['BENIGN', 'DDoS', None]})
+    mock_model_loader.encoder.classes_ = np.array(['BENIGN', 'DDoS', 'PortScan'])
+    mock_model_loader.predict_proba.return_value = np.array([
+        [0.8, 0.1, 0.1],
+        [0.2, 0.7, 0.1],
+        [0.1, 0.3, 0.6]
+    ])
+    
+    columns = {}
+    with patch('prediction.services.preprocess_array') as mock_preprocess:
+        mock_preprocess.return_value = np.arange(3, dtype=np.float32).reshape(3, 1)
+        
+        result = prediction_service.predict_batch(df, columns=columns, probabilities=True)
+    
+    assert result['results'] == []
+    assert result['summary']['total_samples'] == 3
+    assert columns['prediction'].tolist() == [0, 1, 2]
+    assert list(columns['prediction_label']) == ['BENIGN', 'DDoS', 'PortScan']
+    np.testing.assert_allclose(columns['confidence'], [0.8, 0.7, 0.6])
+    np.testing.assert_allclose(columns['proba_DDoS'], [0.1, 0.7, 0.3])
+    assert columns['label'].codes.tolist() == [0, 1, -1]
+
+
+def test_predict_single_uses_cache(prediction_service, mock_model_loader):
+    """Resubmitted feature vectors skip preprocessing and the model"""
+    features = {f'feature_{i}': 0.5 for i in range(10)}
+    
+    with patch('prediction.services.preprocess_array') as mock_preprocess:
+        mock_preprocess.return_value = np.zeros((1, 10), dtype=np.float32)
+        
+        first = prediction_service.predict_single(features)
+        second = prediction_service.predict_single(dict(reversed(list(features.items()))))
+        prediction_service.predict_single({**features, 'feature_0': 0.6})
+    
+    assert mock_preprocess.call_count == 2
+    assert {k: v for k, v in first.items() if k != 'timestamp'} == \
+        {k: v for k, v in second.items() if k != 'timestamp'}
+    assert prediction_service.cache.stats()['hits'] == 1
+
+
+def test_predict_single_cache_hits_are_independent_copies(prediction_service, mock_model_loader):
+    """Mutating a returned result does not change the cached entry"""
+    features = {f'feature_{i}': 0.5 for i in range(10)}
+    
+    with patch('prediction.services.preprocess_array') as mock_preprocess:
+        mock_preprocess.return_value = np.zeros((1, 10), dtype=np.float32)
+        
+        miss = prediction_service.predict_single(features)
+        miss['probabilities']['0'] = -1.0
+        hit = prediction_service.predict_single(features)
+        hit['probabilities']['1'] = -1.0
+        hit['confidence'] = 0.0
+        again = prediction_service.predict_single(features)
+    
+    assert prediction_service.cache.stats()['hits'] == 2
+    assert again['probabilities'] == {'0': 0.8, '1': 0.1, '2': 0.1}
+    assert again['confidence'] == 0.8
@@ -4,9 +4,12 @@ Unit tests for preprocessing functions
 import pytest
 import pandas as pd
 import numpy as np
+import scipy.sparse as sp
 from unittest.mock import Mock
 
-from common.preprocessing import split_columns, preprocess_dataframe
+from common.preprocessing import (
+    split_columns, preprocess_dataframe, preprocess_array, preprocess_sparse, sanitize_numeric
+)
 
 
 def test_split_columns():
@@ -31,3 +34,137 @@ def test_split_columns():
     assert 'num1' in num_cols
     assert 'num2' in num_cols
 
+
+def test_preprocess_array_matches_dataframe():
+    """Array path aligns columns exactly like the DataFrame reindex"""
+    from sklearn.preprocessing import StandardScaler, OneHotEncoder
+
+    df = pd.DataFrame({
+        'proto': ['tcp', 'udp', 'tcp', None],
+        'num1': [1.0, np.inf, 3.0, 4.0],
+        'num2': [0.1, 0.2, np.nan, 0.4],
+        'Label': ['BENIGN', 'DDoS', 'BENIGN', 'BENIGN']
+    })
+    encoder = OneHotEncoder(handle_unknown='ignore').fit(pd.DataFrame({'proto': ['tcp', 'udp', 'missing']}))
+    scaler = StandardScaler().fit(pd.DataFrame({'num1': [1.0, 2.0, 3.0], 'num2': [0.1, 0.2, 0.3]}))
+    feature_columns = ['proto_udp', 'num2', 'extra', 'num1', 'proto_tcp']
+
+    expected = preprocess_dataframe(df, encoder, scaler, feature_columns)
+    actual = preprocess_array(df, encoder, scaler, feature_columns)
+
+    assert actual.dtype == np.float32 and actual.flags['C_CONTIGUOUS']
+    np.testing.assert_allclose(actual, expected.to_numpy(), rtol=1e-6)
+
+
+def test_preprocess_sparse_matches_array():
+    """Sparse path keeps one-hot columns as CSR with the same values"""
+    from sklearn.preprocessing import StandardScaler, OneHotEncoder
+
+    ports = [str(p) for p in range(1000)]
+    df = pd.DataFrame({
+        'port': ['80', '443', '22', None, '8080'],
+        'num1': [1.0, np.inf, 0.0, 4.0, 2.0],
+        'Label': ['BENIGN'] * 5
+    })
+    encoder = OneHotEncoder(handle_unknown='ignore').fit(pd.DataFrame({'port': ports + ['missing']}))
+    scaler = StandardScaler().fit(pd.DataFrame({'num1': [1.0, 2.0, 3.0]}))
+    feature_columns = ['num1', 'extra'] + list(encoder.get_feature_names_out())
+
+    expected = preprocess_array(df, encoder, scaler, feature_columns)
+    actual = preprocess_sparse(df, encoder, scaler, feature_columns)
+
+    assert sp.isspmatrix_csr(actual) and actual.dtype == np.float32
+    assert actual.shape == expected.shape
+    assert actual.nnz == np.count_nonzero(expected)
+    np.testing.assert_allclose(actual.toarray(), expected, rtol=1e-6)
+
+
+def test_sanitize_numeric_replaces_in_place_and_counts():
+    """NaN and infinities get their own fill values and per-feature counts"""
+    X = np.array([
+        [1.0, np.nan, np.inf],
+        [-np.inf, 2.0, np.nan],
+        [3.0, np.nan, 4.0]
+    ])
+
+    counts = sanitize_numeric(X, nan=-1.0, posinf=99.0, neginf=-99.0)
+
+    np.testing.assert_array_equal(counts, [1, 2, 2])
+    np.testing.assert_array_equal(X, [[1.0, -1.0, 99.0], [-99.0, 2.0, -1.0], [3.0, -1.0, 4.0]])
+
+
+def test_preprocess_array_reports_replaced_values():
+    """Replacement counts are accumulated per numeric feature"""
+    from sklearn.preprocessing import StandardScaler
+
+    df = pd.DataFrame({'num1': [1.0, np.inf, np.nan], 'num2': [0.1, 0.2, 0.3]})
+    scaler = StandardScaler().fit(pd.DataFrame({'num1': [1.0, 2.0, 3.0], 'num2': [0.1, 0.2, 0.3]}))
+    replaced = {}
+
+    X = preprocess_array(df, None, scaler, ['num1', 'num2'], scale=False, replaced=replaced)
+
+    assert replaced == {'num1': 2}
+    np.testing.assert_array_equal(X[:, 0], [1.0, 0.0, 0.0])
+
+
+def test_preprocess_array_float32_mode_matches_float64():
+    """float32 cleaning and scaling stays float32 and close to the float64 path"""
+    from sklearn.preprocessing import StandardScaler
+
+    rng = np.random.default_rng(0)
+    columns = ['num1', 'num2', 'num3']
+    df = pd.DataFrame(rng.normal(size=(50, 3)) * 100, columns=columns)
+    df.loc[3, 'num2'] = np.inf
+    scaler = StandardScaler().fit(df.replace(np.inf, 0))
+    feature_columns = ['num3', 'num1', 'num2']
+
+    expected = preprocess_array(df, None, scaler, feature_columns, float32=False)
+    replaced = {}
+    actual = preprocess_array(df.astype(np.float32), None, scaler, feature_columns, replaced=replaced, float32=True)
+    aligned = preprocess_array(df, None, scaler, columns, float32=True)
+
+    assert actual.dtype == np.float32 and actual.flags['C_CONTIGUOUS']
+    np.testing.assert_allclose(actual, expected, rtol=1e-5, atol=1e-6)
+    np.testing.assert_allclose(aligned[:, [2, 0, 1]], expected, rtol=1e-5, atol=1e-6)
+    assert replaced == {'num2': 1}
+
+
+@pytest.mark.parametrize('float32', [False, True])
+def test_preprocess_array_parses_numeric_strings(float32):
+    """Scaler inputs sent as strings (JSON, object CSV columns) are parsed, not dropped"""
+    from sklearn.preprocessing import StandardScaler
+
+    numbers = pd.DataFrame({'num1': [1.0, 2.0, 3.0], 'num2': [0.1, 0.2, 0.3]})
+    scaler = StandardScaler().fit(numbers)
+    as_text = pd.DataFrame({'num1': ['1', '2.0', 'inf'], 'num2': ['0.1', None, '0.3']})
+    feature_columns = ['num1', 'num2']
+
+    expected = preprocess_array(
+        pd.DataFrame({'num1': [1.0, 2.0, np.inf], 'num2': [0.1, np.nan, 0.3]}),
+        None, scaler, feature_columns, float32=float32
+    )
+    actual = preprocess_array(as_text, None, scaler, feature_columns, float32=float32)
+
+    np.testing.assert_allclose(actual, expected, rtol=1e-6)
+    with pytest.raises(ValueError, match="'num1' has non-numeric values"):
+        preprocess_array(pd.DataFrame({'num1': ['x'], 'num2': ['0.1']}), None, scaler, feature_columns)
+
+
+@pytest.mark.parametrize('name, options', [
+    ('StandardScaler', {'with_mean': False}),
+    ('StandardScaler', {'with_std': False}),
+    ('RobustScaler', {'with_centering': False}),
+    ('RobustScaler', {'with_scaling': False})
+])
+def test_float32_scaling_matches_transform_without_centering(name, options):
+    """Precomputed float32 parameters apply only what transform() applies"""
+    import sklearn.preprocessing
+
+    rng = np.random.default_rng(1)
+    df = pd.DataFrame(rng.normal(loc=50, scale=10, size=(40, 2)), columns=['num1', 'num2'])
+    scaler = getattr(sklearn.preprocessing, name)(**options).fit(df)
+
+    expected = scaler.transform(df)
+    actual = preprocess_array(df, None, scaler, ['num1', 'num2'], float32=True)
+
+    np.testing.assert_allclose(actual, expected, rtol=1e-5, atol=1e-5)
@@ -0,0 +1,80 @@
+"""
+Unit tests for the sampling profiler
+"""
+import time
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from monitoring import profiler as profiling
+from monitoring.endpoints import require_admin
+from monitoring.profiler import SamplingProfiler, profile_request
+
+
+def _spin(stop: threading.Event):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_collapsed_stacks_include_busy_thread():
+    """Samples are aggregated per stack, root (thread name) first"""
+    stop = threading.Event()
+    worker = threading.Thread(target=_spin, args=(stop,), name='busy-worker')
+    worker.start()
+    sampler = SamplingProfiler(interval=0.002, max_overhead=0.5)
+    sampler.start()
+    time.sleep(0.2)
+    sampler.stop()
+    stop.set()
+    worker.join()
+
+    lines = sampler.collapsed().splitlines()
+    busy = [line for line in lines if line.startswith('busy-worker;')]
+    assert busy
+    stack, count = busy[0].rsplit(' ', 1)
+    assert '_spin (test/test_profiler.py:' in stack
+    assert int(count) > 0
+    assert sampler.stats()['samples'] > 0
+
+
+def test_request_profile_claims_only_target_route():
+    """Only the next `count` requests to the target route join the profile"""
+    session = profiling.start_request_profile('/predict/one', 2, 0.01, 0.02)
+    try:
+        seen = []
+        for route in ('/predict/csv', '/predict/one', '/predict/one', '/predict/one'):
+            with profile_request(route):
+                seen.append(threading.get_ident() in session.profiler.threads)
+        assert seen == [False, True, True, False]
+        assert session.done.is_set()
+        assert not session.profiler.threads
+    finally:
+        profiling.stop_request_profile(session)
+
+
+def test_overlapping_requests_on_one_thread_stay_profiled():
+    """Requests sharing the event loop thread keep it sampled until the last one ends"""
+    session = profiling.start_request_profile('/predict/bulk', 2, 0.01, 0.02)
+    ident = threading.get_ident()
+    try:
+        first, second = profile_request('/predict/bulk'), profile_request('/predict/bulk')
+        first.__enter__()
+        second.__enter__()
+        first.__exit__(None, None, None)
+        assert ident in session.profiler.threads
+        second.__exit__(None, None, None)
+        assert ident not in session.profiler.threads
+        assert session.done.is_set()
+    finally:
+        profiling.stop_request_profile(session)
+
+
+def test_admin_token_rejects_non_ascii_tokens(monkeypatch):
+    """A non-ASCII token is refused with 403 instead of failing the comparison"""
+    monkeypatch.setattr('monitoring.endpoints.ADMIN_TOKEN', 'secret')
+
+    with pytest.raises(HTTPException) as error:
+        require_admin('sécret')
+    assert error.value.status_code == 403
+    require_admin('secret')
@@ -0,0 +1,43 @@
+"""
+Unit tests for the fast JSON response encoder
+"""
+import json
+
+import numpy as np
+import pandas as pd
+
+from common import serialization
+from common.serialization import FastJSONResponse, dumps
+
+
+PAYLOAD = {
+    'summary': {'total_samples': np.int64(3), 'detection_rate': np.float32(0.5)},
+    'probabilities': np.array([[0.25, 0.75], [1.0, 0.0]], dtype=np.float32),
+    'by_label': {'BENIGN': 2, 'DDoS': 1},
+    'missing': float('nan'),
+    'labels': pd.Categorical(['BENIGN', None, 'DDoS']),
+    1: 'non-string key'
+}
+EXPECTED = {
+    'summary': {'total_samples': 3, 'detection_rate': 0.5},
+    'probabilities': [[0.25, 0.75], [1.0, 0.0]],
+    'by_label': {'BENIGN': 2, 'DDoS': 1},
+    'missing': None,
+    'labels': ['BENIGN', None, 'DDoS'],
+    '1': 'non-string key'
+}
+
+
+def test_dumps_handles_numpy_and_non_finite_values():
+    """Arrays and scalars are written as JSON numbers, categoricals as labels; NaN becomes null"""
+    assert json.loads(dumps(PAYLOAD)) == EXPECTED
+
+
+def test_stdlib_fallback_matches(monkeypatch):
+    """Without orjson the standard encoder produces the same document"""
+    monkeypatch.setattr(serialization, 'orjson', None)
+
+    assert json.loads(dumps(PAYLOAD)) == EXPECTED
+    response = FastJSONResponse({'ok': np.bool_(True)})
+    assert response.body == b'{"ok":true}'
+    assert response.media_type == 'application/json'
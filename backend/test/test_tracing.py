@@ -0,0 +1,63 @@
+"""
+Unit tests for per-request stage breakdown and Server-Timing headers
+"""
+from fastapi import FastAPI, APIRouter
+from fastapi.testclient import TestClient
+
+from monitoring import middleware
+from monitoring.metrics import stage, count_rows
+from monitoring.middleware import MetricsMiddleware, TimedRoute
+from monitoring.tracing import RequestTrace
+
+
+def _app() -> FastAPI:
+    router = APIRouter(route_class=TimedRoute)
+
+    @router.get("/score")
+    def score():
+        with stage("scoring", "preprocess"):
+            pass
+        with stage("scoring", "infer"):
+            count_rows("xgboost", 42)
+        return {"ok": True}
+
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+    app.include_router(router)
+    return app
+
+
+def test_server_timing_accumulates_repeated_spans():
+    """Spans of the same stage are summed; rows and total come last"""
+    trace = RequestTrace()
+    trace.add_span('prediction', 'infer', 0.010)
+    trace.add_span('prediction', 'infer', 0.005)
+    trace.add_rows('mlp', 7)
+
+    entries = trace.server_timing().split(', ')
+    assert entries[0] == 'infer;dur=15.00;desc="prediction"'
+    assert entries[1] == 'rows.mlp;desc="7"'
+    assert entries[2].startswith('total;dur=')
+    assert trace.breakdown()['stages'][0]['count'] == 2
+
+
+def test_middleware_sets_header_and_debug_body(monkeypatch):
+    """Every response carries Server-Timing; debug_timing adds it to the body when enabled"""
+    client = TestClient(_app())
+
+    response = client.get('/score')
+    timing = response.headers['server-timing']
+    assert response.json() == {'ok': True}
+    for entry in ('preprocess;dur=', 'infer;dur=', 'serialize;dur=', 'rows.xgboost;desc="42"', 'total;dur='):
+        assert entry in timing
+
+    # Debug bodies are off unless the server opts in
+    assert client.get('/score?debug_timing=true').json() == {'ok': True}
+
+    monkeypatch.setattr(middleware, 'SERVER_TIMING_DEBUG', True)
+    response = client.get('/score?debug_timing=true')
+    body = response.json()
+    assert body['ok'] is True
+    assert [s['stage'] for s in body['timing']['stages']] == ['preprocess', 'infer', 'serialize']
+    assert body['timing']['rows'] == {'xgboost': 42}
+    assert int(response.headers['content-length']) == len(response.content)
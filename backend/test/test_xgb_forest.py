@@ -0,0 +1,71 @@
+"""
+Unit tests for the array-backed XGBoost forest evaluator
+"""
+import pytest
+import numpy as np
+import xgboost as xgb
+
+from model_management.xgb_forest import ForestEvaluator
+
+
+@pytest.fixture
+def training_data():
+    """Features with missing values and four classes"""
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(500, 8)).astype(np.float32)
+    X[rng.random(X.shape) < 0.1] = np.nan
+    y = rng.integers(0, 4, 500)
+    return X, y
+
+
+def test_multiclass_matches_xgboost(training_data):
+    """Softmax probabilities match predict_proba, including missing values"""
+    X, y = training_data
+    model = xgb.XGBClassifier(n_estimators=20, max_depth=4).fit(X, y)
+    forest = ForestEvaluator.from_booster(model.get_booster())
+
+    np.testing.assert_allclose(forest.predict_proba(X), model.predict_proba(X), atol=1e-6)
+
+
+def test_iteration_range_matches_xgboost(training_data):
+    """Truncated ensembles match predict_proba(iteration_range=...)"""
+    X, y = training_data
+    model = xgb.XGBClassifier(n_estimators=20, max_depth=4).fit(X, y)
+    forest = ForestEvaluator.from_booster(model.get_booster())
+
+    np.testing.assert_allclose(
+        forest.predict_proba(X, iteration_range=(0, 5)),
+        model.predict_proba(X, iteration_range=(0, 5)),
+        atol=1e-6
+    )
+
+
+def test_binary_matches_xgboost(training_data):
+    """Binary logistic models return [P(0), P(1)] like the sklearn wrapper"""
+    X, y = training_data
+    model = xgb.XGBClassifier(n_estimators=20, max_depth=3).fit(X, y % 2)
+    forest = ForestEvaluator.from_booster(model.get_booster())
+
+    np.testing.assert_allclose(forest.predict_proba(X), model.predict_proba(X), atol=1e-6)
+
+
+def test_load_from_json_file(training_data, tmp_path):
+    """Models saved with save_model('*.json') can be loaded directly"""
+    X, y = training_data
+    model = xgb.XGBClassifier(n_estimators=5, max_depth=3).fit(X, y)
+    path = tmp_path / "model.json"
+    model.save_model(str(path))
+
+    forest = ForestEvaluator.load(str(path))
+
+    np.testing.assert_allclose(forest.predict_proba(X[:3]), model.predict_proba(X[:3]), atol=1e-6)
+
+
+def test_rejects_wrong_feature_count(training_data):
+    """Inputs must have the model's number of features"""
+    X, y = training_data
+    model = xgb.XGBClassifier(n_estimators=2, max_depth=2).fit(X, y)
+    forest = ForestEvaluator.from_booster(model.get_booster())
+
+    with pytest.raises(ValueError):
+        forest.predict_proba(X[:, :5])